@@ -0,0 +1,182 @@
+import os
+import re
+import threading
+import unicodedata
+from typing import Dict, Any, FrozenSet, Iterable, Optional, Set, Tuple
+
+# Default typo tolerance; a solution can override it with "max_edit_distance"
+DEFAULT_MAX_EDIT_DISTANCE = int(os.getenv('ANSWER_MAX_EDIT_DISTANCE', '1'))
+
+# Answers shorter than this only tolerate swapped adjacent letters, since an
+# added, dropped or changed letter in a short word ("base" -> "vase", "bass")
+# is usually a different word
+TYPO_MIN_LENGTH = int(os.getenv('ANSWER_TYPO_MIN_LENGTH', '6'))
+
+_NON_ALPHANUMERIC = re.compile(r'[^0-9a-z]+')
+
+def _singularize(word: str) -> str:
+    # Deliberately conservative English plural stripping
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'y'
+    if len(word) > 4 and word.endswith(('sses', 'xes', 'ches', 'shes', 'zzes')):
+        return word[:-2]
+    if len(word) > 3 and word.endswith('s') and not word.endswith(('ss', 'us', 'is')):
+        return word[:-1]
+    return word
+
+def normalize_answer(text: str, singularize: bool = True) -> str:
+    """
+    Normalize an answer or guess for comparison.
+
+    Strips accents, folds case, collapses punctuation and whitespace to single
+    spaces and, by default, reduces each word to its singular form.
+
+    Args:
+        text (str): The raw answer or guess
+        singularize (bool): Whether to strip plural endings
+
+    Returns:
+        str: The normalized form
+    """
+    decomposed = unicodedata.normalize('NFKD', text)
+    stripped = ''.join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+    words = _NON_ALPHANUMERIC.sub(' ', stripped).split()
+    if singularize:
+        words = [_singularize(word) for word in words]
+    return ' '.join(words)
+
+def _deletes(word: str, max_distance: int) -> Set[str]:
+    # Every string reachable from word by removing up to max_distance characters
+    variants = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        variants |= frontier
+    return variants
+
+def _is_adjacent_swap(a: str, b: str) -> bool:
+    # True if b is a with exactly one pair of neighbouring characters swapped
+    if len(a) != len(b):
+        return False
+    diffs = [i for i in range(len(a)) if a[i] != b[i]]
+    return len(diffs) == 2 and diffs[1] == diffs[0] + 1 and a[diffs[0]] == b[diffs[1]] and a[diffs[1]] == b[diffs[0]]
+
+def bounded_edit_distance(a: str, b: str, max_distance: int) -> Optional[int]:
+    """
+    Optimal string alignment distance between a and b, giving up early once it
+    must exceed max_distance.
+
+    Args:
+        a (str): First string
+        b (str): Second string
+        max_distance (int): Largest distance of interest
+
+    Returns:
+        Optional[int]: The distance, or None if it exceeds max_distance
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return None
+
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous_previous is not None and i > 1 and j > 1
+                    and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        if min(current) > max_distance:
+            return None
+        previous_previous, previous = previous, current
+
+    return previous[-1] if previous[-1] <= max_distance else None
+
+class AnswerIndex:
+    """
+    Precomputed index of normalized answers with a SymSpell-style deletion
+    index for typo-tolerant matching.
+
+    Each puzzle's accepted answers are normalized once when the puzzle is
+    added. Near misses are found by intersecting the deletion variants of the
+    guess with those of the answers, and only those candidates are checked
+    with a bounded edit distance.
+
+    Entries are replaced rather than changed in place, so match can read the
+    index without the lock while other threads add puzzles.
+    """
+
+    def __init__(self):
+        self._answers: Dict[str, Tuple[FrozenSet[str], int]] = {}
+        self._deletes: Dict[str, FrozenSet[str]] = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, puzzle_id: str) -> bool:
+        return puzzle_id in self._answers
+
+    def add(self, puzzle_id: str, answers: Iterable[str], max_edit_distance: Optional[int] = None):
+        """
+        Index the accepted answers for a puzzle.
+
+        Args:
+            puzzle_id (str): The puzzle ID
+            answers (Iterable[str]): The target word and any accepted alternatives
+            max_edit_distance (int, optional): Typo tolerance for this puzzle
+        """
+        distance = DEFAULT_MAX_EDIT_DISTANCE if max_edit_distance is None else max_edit_distance
+        normalized = frozenset(normalize_answer(answer) for answer in answers if answer) - {''}
+
+        with self._lock:
+            self._answers[puzzle_id] = (normalized, distance)
+            for answer in normalized:
+                for variant in _deletes(answer, distance):
+                    self._deletes[variant] = self._deletes.get(variant, frozenset()) | {answer}
+
+    def add_solution(self, puzzle_id: str, solution_data: Dict[str, Any]):
+        """
+        Index a puzzle from its solution record.
+
+        Solutions may set "accepted_answers" (a list of alternatives) and
+        "max_edit_distance" to tune matching for that puzzle.
+
+        Args:
+            puzzle_id (str): The puzzle ID
+            solution_data (Dict[str, Any]): The solution JSON
+        """
+        answers = [solution_data.get('target_word', '')] + list(solution_data.get('accepted_answers', []))
+        self.add(puzzle_id, answers, solution_data.get('max_edit_distance'))
+
+    def match(self, puzzle_id: str, guess: str) -> bool:
+        """
+        Check a guess against a puzzle's indexed answers.
+
+        Args:
+            puzzle_id (str): The puzzle ID
+            guess (str): The user's guess
+
+        Returns:
+            bool: True if the guess is accepted
+        """
+        answers, distance = self._answers.get(puzzle_id, (frozenset(), 0))
+        normalized = normalize_answer(guess)
+        if not normalized:
+            return False
+        if normalized in answers:
+            return True
+        if distance <= 0:
+            return False
+
+        # A typo can look like a plural ending ("baes"), so try the guess both
+        # with and without plural stripping
+        for form in {normalized, normalize_answer(guess, singularize=False)}:
+            for variant in _deletes(form, distance):
+                for candidate in self._deletes.get(variant, ()):
+                    if candidate not in answers:
+                        continue
+                    if len(candidate) < TYPO_MIN_LENGTH:
+                        if _is_adjacent_swap(form, candidate):
+                            return True
+                    elif bounded_edit_distance(form, candidate, distance) is not None:
+                        return True
+        return False
@@ -1,7 +1,12 @@
 import streamlit as st
 import time
 import game_logic
+import guess_limiter
+import hedged_read
+import metrics
+import render_profiler
 import s3_utils
+import session_trace
 from typing import Dict, Any
 
 # Set page configuration
@@ -13,6 +18,7 @@ st.set_page_config(
 )
 
 # Custom CSS for styling
+@render_profiler.span('load_css')
 def load_css():
     st.markdown("""
     <style>
@@ -241,11 +247,21 @@ def load_css():
     """, unsafe_allow_html=True)
 
 # Initialize session state
+@hedged_read.interaction_deadline()
+@render_profiler.span('initialize_session_state')
 def initialize_session_state():
     if 'game_state' not in st.session_state:
-        st.session_state.game_state = game_logic.initialize_game_state()
-        st.session_state.game_state['current_puzzle'] = game_logic.load_new_puzzle()
-        st.session_state.game_state['player_name'] = None
+        # Resume saved progress when the URL carries a profile key
+        resumed = None
+        if st.query_params.get('profile'):
+            resumed = game_logic.resume_game_state(st.query_params['profile'])
+        
+        if resumed:
+            st.session_state.game_state = resumed
+        else:
+            st.session_state.game_state = game_logic.initialize_game_state()
+            st.session_state.game_state['current_puzzle'] = game_logic.load_next_puzzle(st.session_state.game_state)
+            st.session_state.game_state['player_name'] = None
         st.session_state.game_state['is_first_puzzle'] = True
     
     if 'user_guess' not in st.session_state:
@@ -255,20 +271,32 @@ def initialize_session_state():
         st.session_state.timer_active = True
 
 # Handle user's guess submission
+@hedged_read.interaction_deadline()
 def submit_guess():
     user_guess = st.session_state.user_guess.strip()
     game_state = st.session_state.game_state
     
+    # Enter in the text field and the Submit button can both fire for the
+    # same guess; once the puzzle is solved, ignore the second one
+    if game_state['show_rating_ui']:
+        return
+    
     if not user_guess:
         game_state['feedback_message'] = "Please enter a guess!"
         game_state['feedback_type'] = "error"
         return
     
     # Check if the answer is correct
-    is_correct, _ = game_logic.check_answer(
-        game_state['current_puzzle']['id'], 
-        user_guess
-    )
+    try:
+        is_correct, _ = game_logic.check_answer(
+            game_state['current_puzzle']['id'], 
+            user_guess,
+            game_state['session_id']
+        )
+    except guess_limiter.GuessRateLimitedError:
+        game_state['feedback_message'] = "You're guessing too fast. Wait a moment and try again."
+        game_state['feedback_type'] = "error"
+        return
     
     if is_correct:
         # Update game state with the solved puzzle
@@ -283,11 +311,33 @@ def show_hints():
     st.session_state.game_state = game_logic.reveal_hints(st.session_state.game_state)
 
 # Handle skip button
+@hedged_read.interaction_deadline()
 def skip_puzzle():
     game_state, correct_answer = game_logic.skip_puzzle(st.session_state.game_state)
     st.session_state.game_state = game_state
 
+# The stats bar, image grid and choice between the input and rating areas are
+# rendered from these values. Fragment reruns only redraw the fragment, so a
+# callback that changes any of them has to trigger a full app rerun.
+def page_view_key() -> tuple:
+    game_state = st.session_state.game_state
+    puzzle = game_state['current_puzzle']
+    return (
+        puzzle['id'] if puzzle else None,
+        game_state['show_rating_ui'],
+        game_state['show_hints'],
+        game_state['score'],
+        game_state['puzzles_solved'],
+        game_state['puzzles_skipped']
+    )
+
+def rerun_app_if_page_changed():
+    if st.session_state.get('page_view_key') != page_view_key():
+        st.rerun()
+
 # Display the puzzle images in a 2x2 grid
+@st.fragment
+@render_profiler.span('display_puzzle_images')
 def display_puzzle_images(puzzle: Dict[str, Any]):
     st.markdown("""
     <div class="image-grid">
@@ -322,6 +372,7 @@ def display_puzzle_images(puzzle: Dict[str, Any]):
         )
 
 # Display game statistics
+@render_profiler.span('display_game_stats')
 def display_game_stats():
     game_state = st.session_state.game_state
     
@@ -347,6 +398,7 @@ def display_game_stats():
     ), unsafe_allow_html=True)
 
 # Display feedback to the user
+@render_profiler.span('display_feedback')
 def display_feedback():
     game_state = st.session_state.game_state
     
@@ -369,7 +421,11 @@ def display_feedback():
             st.info(game_state['feedback_message'])
 
 # Display rating UI for a solved puzzle
+@st.fragment
+@render_profiler.span('display_rating_ui')
 def display_rating_ui():
+    rerun_app_if_page_changed()
+    
     if not st.session_state.game_state['show_rating_ui']:
         return
     
@@ -433,8 +489,9 @@ def display_rating_ui():
     
     st.markdown('</div>', unsafe_allow_html=True)
 
+@hedged_read.interaction_deadline()
 def submit_rating():
-    # If ratings are selected, submit them
+    # If ratings are selected, submit them (this also loads the next puzzle)
     if st.session_state.get('difficulty_rating') or st.session_state.get('issue_rating'):
         # Update game state with ratings
         st.session_state.game_state = game_logic.submit_rating(
@@ -446,16 +503,56 @@ def submit_rating():
         # Set a thank you message if ratings were provided
         st.session_state.game_state['feedback_message'] = "Thank you for your feedback!"
         st.session_state.game_state['feedback_type'] = "success"
+    else:
+        st.session_state.game_state = game_logic.skip_rating(st.session_state.game_state)
     
     # Clear the ratings
     if 'difficulty_rating' in st.session_state:
         del st.session_state.difficulty_rating
     if 'issue_rating' in st.session_state:
         del st.session_state.issue_rating
+
+# Display the guess input, action buttons and feedback. A wrong guess only
+# reruns this fragment; anything that changes the rest of the page reruns the app.
+@st.fragment
+@render_profiler.span('display_input_area')
+def display_input_area():
+    rerun_app_if_page_changed()
     
-    # Reset rating UI and load new puzzle immediately
-    st.session_state.game_state['show_rating_ui'] = False
-    st.session_state.game_state['current_puzzle'] = game_logic.load_new_puzzle()
+    # Display feedback if there is any
+    display_feedback()
+    
+    with st.container():
+        st.markdown('<div class="input-area">', unsafe_allow_html=True)
+        
+        # Label for the input
+        st.markdown('<p>What\'s the word that connects all these images?</p>', unsafe_allow_html=True)
+        
+        # Create a row with input field and button
+        input_col, button_col = st.columns([4, 1])
+        
+        # User input in first column
+        with input_col:
+            user_input = st.text_input("", key="user_guess_input", label_visibility="collapsed", on_change=handle_text_input)
+        
+        # Submit button in second column
+        with button_col:
+            if st.button("Submit Guess", type="primary", on_click=submit_guess):
+                if 'user_guess_input' in st.session_state and st.session_state.user_guess_input:
+                    st.session_state.user_guess = st.session_state.user_guess_input
+        
+        # Action buttons
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            if st.button("Show Hints", on_click=show_hints):
+                pass
+        
+        with col2:
+            if st.button("Skip Puzzle", on_click=skip_puzzle):
+                pass
+        
+        st.markdown('</div>', unsafe_allow_html=True)
 
 # Handle text input when Enter is pressed
 def handle_text_input():
@@ -500,12 +597,25 @@ def submit_name():
         st.session_state.game_state['is_first_puzzle'] = False
 
 # Main app
+@render_profiler.span('main')
 def main():
+    # Record game_logic and S3 time in the render profiler (RENDER_PROFILER=true)
+    render_profiler.instrument(game_logic, 'game_logic')
+    render_profiler.instrument(s3_utils, 's3_utils')
+    render_profiler.render_sidebar()
+    
+    # Record each session's game_logic calls for replay (SESSION_TRACE=true)
+    session_trace.instrument(game_logic)
+    
+    # Print counters and latencies to the log every METRICS_LOG_SECONDS
+    metrics.start_report_thread()
+    
     # Load CSS
     load_css()
     
     # Initialize session state
     initialize_session_state()
+    st.session_state.page_view_key = page_view_key()
     
     # Display the title
     st.markdown('<h1 class="title">Quadrality 🧩</h1>', unsafe_allow_html=True)
@@ -524,49 +634,22 @@ def main():
         # Display the puzzle images
         display_puzzle_images(current_puzzle)
         
-        # Display feedback if there is any
-        display_feedback()
-        
         # Check if we should show rating UI
         if st.session_state.game_state['show_rating_ui']:
+            display_feedback()
             display_rating_ui()
         else:
-            # User input area
-            with st.container():
-                st.markdown('<div class="input-area">', unsafe_allow_html=True)
-                
-                # Label for the input
-                st.markdown('<p>What\'s the word that connects all these images?</p>', unsafe_allow_html=True)
-                
-                # Create a row with input field and button
-                input_col, button_col = st.columns([4, 1])
-                
-                # User input in first column
-                with input_col:
-                    user_input = st.text_input("", key="user_guess_input", label_visibility="collapsed", on_change=handle_text_input)
-                
-                # Submit button in second column
-                with button_col:
-                    if st.button("Submit Guess", type="primary", on_click=submit_guess):
-                        if 'user_guess_input' in st.session_state and st.session_state.user_guess_input:
-                            st.session_state.user_guess = st.session_state.user_guess_input
-                
-                # Action buttons
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    if st.button("Show Hints", on_click=show_hints):
-                        pass
-                
-                with col2:
-                    if st.button("Skip Puzzle", on_click=skip_puzzle):
-                        pass
-                
-                st.markdown('</div>', unsafe_allow_html=True)
+            display_input_area()
     except Exception as e:
         st.error(f"Error loading puzzle: {str(e)}\nPlease check your configuration and refresh the page.")
         st.exception(e)  # This will display the full traceback for debugging
     
+    # Save progress and keep the profile key in the URL, so a reload or a new
+    # worker after a deploy resumes the same game
+    profile_key = game_logic.save_progress(st.session_state.game_state)
+    if st.query_params.get('profile') != profile_key:
+        st.query_params['profile'] = profile_key
+    
     # About section in expander
     with st.expander("About This Game"):
         st.markdown("""
@@ -0,0 +1,40 @@
+import atexit
+import threading
+import time
+from typing import Any, Callable, Dict
+
+# Periodic background work shared by the app's modules: rating flushes,
+# profile flushes, trace flushes, the ratings export and the metrics log.
+# Each task runs in its own daemon thread, started once per process however
+# often it is requested, and runs once more when the process exits.
+
+_lock = threading.Lock()
+_threads: Dict[str, threading.Thread] = {}
+
+def start_periodic(name: str, interval: float, task: Callable[..., Any], *args: Any):
+    """
+    Run task(*args) every interval seconds in a daemon thread, once per
+    process per name, and once more at exit. Errors are printed and the next
+    run goes ahead. Safe to call on every rerun.
+
+    Args:
+        name (str): The thread name, e.g. 'ratings-flush'
+        interval (float): Seconds between runs
+        task (Callable): The work to run
+        *args: Arguments for task
+    """
+    with _lock:
+        if name in _threads:
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    task(*args)
+                except Exception as e:
+                    print(f"Error in {name}: {type(e).__name__}: {str(e)}")
+
+        thread = _threads[name] = threading.Thread(target=run, name=name, daemon=True)
+        thread.start()
+        atexit.register(task, *args)
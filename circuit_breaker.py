@@ -0,0 +1,136 @@
+import os
+import threading
+import time
+from typing import Any, Callable, Optional
+import metrics
+
+# Defaults for every breaker. A call slower than BREAKER_SLOW_CALL_SECONDS
+# counts as a failure even if it eventually succeeds, so a degraded backend
+# trips the breaker as well as a failing one.
+BREAKER_FAILURE_THRESHOLD = int(os.getenv('BREAKER_FAILURE_THRESHOLD', '5'))
+BREAKER_SLOW_CALL_SECONDS = float(os.getenv('BREAKER_SLOW_CALL_SECONDS', '2.0'))
+BREAKER_RESET_SECONDS = float(os.getenv('BREAKER_RESET_SECONDS', '30'))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the backend while a breaker is open."""
+
+class CircuitBreaker:
+    """
+    Fails calls fast after repeated backend failures.
+
+    Closed: calls go through; BREAKER_FAILURE_THRESHOLD consecutive failures
+    or slow calls open the breaker. Open: calls raise CircuitOpenError at once
+    so callers fall back to caches. After BREAKER_RESET_SECONDS the breaker
+    half-opens and lets a single probe call through; its outcome closes or
+    re-opens the breaker.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 slow_call_seconds: float = BREAKER_SLOW_CALL_SECONDS,
+                 reset_seconds: float = BREAKER_RESET_SECONDS,
+                 is_failure: Optional[Callable[[Exception], bool]] = None):
+        """
+        Args:
+            name (str): Operation class, used in metric names
+            failure_threshold (int): Consecutive failures that open the breaker
+            slow_call_seconds (float): Calls at least this slow count as failures
+            reset_seconds (float): How long to stay open before probing
+            is_failure (Callable, optional): Whether an exception means the backend
+                is unhealthy; expected errors such as a missing key should not count.
+                Defaults to every exception.
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.reset_seconds = reset_seconds
+        self.is_failure = is_failure or (lambda error: True)
+
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def is_open(self) -> bool:
+        """
+        Whether calls would currently be rejected, without claiming a probe.
+
+        Returns:
+            bool: True while open and not yet due for a probe, or while a probe is in flight
+        """
+        with self._lock:
+            if self._state == OPEN:
+                return time.monotonic() - self._opened_at < self.reset_seconds
+            return self._state == HALF_OPEN and self._probing
+
+    def _allow(self) -> bool:
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+                self._state = HALF_OPEN
+            if self._state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def _open(self):
+        # Caller holds the lock
+        if self._state != OPEN:
+            metrics.increment(f'breaker.{self.name}.opened')
+            print(f"Circuit breaker '{self.name}' opened after {self._failures} failures")
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._probing = False
+
+    def _record(self, failed: bool):
+        with self._lock:
+            if failed:
+                self._failures += 1
+                if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                    self._open()
+            else:
+                if self._state != CLOSED:
+                    print(f"Circuit breaker '{self.name}' closed")
+                self._state = CLOSED
+                self._failures = 0
+                self._probing = False
+
+    def call(self, fn: Callable[[], Any]) -> Any:
+        """
+        Call fn through the breaker.
+
+        Args:
+            fn (Callable): The backend call
+
+        Returns:
+            Any: Whatever fn returns
+
+        Raises:
+            CircuitOpenError: If the breaker is open
+        """
+        if not self._allow():
+            metrics.increment(f'breaker.{self.name}.rejected')
+            raise CircuitOpenError(f"Circuit breaker '{self.name}' is open")
+
+        start = time.monotonic()
+        try:
+            result = fn()
+        except Exception as e:
+            self._record(self.is_failure(e))
+            raise
+        finally:
+            elapsed = time.monotonic() - start
+            metrics.observe(f'breaker.{self.name}', elapsed)
+
+        self._record(elapsed >= self.slow_call_seconds)
+        return result
@@ -0,0 +1,284 @@
+import argparse
+import datetime
+import os
+import random
+import statistics
+import threading
+import time
+from array import array
+from typing import Dict, Any, List, Optional
+import json_codec
+import s3_utils
+import ratings_log_reader
+from rating_aggregates import DIFFICULTY_KEYS
+
+# A tier per difficulty rating
+TIERS = DIFFICULTY_KEYS
+
+# The tier of every puzzle, built by one job (python difficulty_tiers.py
+# --every 900) from the ratings snapshot and the recent ratings logs and
+# published as ratings/_tiers in the webapp bucket, so workers do not each
+# re-read a week of logs. Workers revalidate it by ETag at most once per
+# TIER_REFRESH_SECONDS.
+TIER_INDEX_KEY = 'ratings/_tiers'
+TIER_INDEX_FORMAT = 1
+TIER_REFRESH_SECONDS = float(os.getenv('TIER_REFRESH_SECONDS', '60'))
+TIER_LOG_HOURS = int(os.getenv('TIER_LOG_HOURS', '168'))
+
+# Solve times at or above this many seconds count as maximally hard
+SLOW_SOLVE_SECONDS = 120
+
+# How many recent puzzles decide a player's tier
+PLAYER_HISTORY_WINDOW = 5
+
+def load_solve_times(hours: int = TIER_LOG_HOURS) -> Dict[str, List[float]]:
+    """
+    Collect observed solve times per puzzle from the recent ratings logs.
+
+    Skipped puzzles are recorded as SLOW_SOLVE_SECONDS so that puzzles players
+    give up on rank as hard.
+
+    Args:
+        hours (int): How many hourly log files to read, counting back from now
+
+    Returns:
+        Dict[str, List[float]]: Solve times in seconds keyed by puzzle ID
+    """
+    solve_times: Dict[str, List[float]] = {}
+    now = datetime.datetime.utcnow()
+
+    for entry in ratings_log_reader.iter_rating_events(now - datetime.timedelta(hours=hours - 1), now):
+        metadata = entry.get('metadata', {})
+        seconds = SLOW_SOLVE_SECONDS if metadata.get('was_skipped') else metadata.get('time_to_solve')
+        if seconds is not None:
+            solve_times.setdefault(entry.get('puzzle_id'), []).append(float(seconds))
+
+    return solve_times
+
+def puzzle_difficulty_score(ratings: Optional[Dict[str, Any]], solve_times: Optional[List[float]]) -> float:
+    """
+    Score a puzzle's difficulty on a 0 (easy) to 2 (hard) scale.
+
+    The score averages the smoothed difficulty votes with the median observed
+    solve time, using whichever signals exist. Puzzles with neither score 1.
+
+    Args:
+        ratings (Dict[str, Any]): The puzzle's aggregate ratings, if any
+        solve_times (List[float]): Observed solve times in seconds, if any
+
+    Returns:
+        float: The difficulty score
+    """
+    signals = []
+
+    counts = (ratings or {}).get('difficulty', {})
+    votes = [counts.get(tier, 0) for tier in TIERS]
+    if sum(votes):
+        # One pseudo-vote for "medium" keeps single votes from dominating
+        signals.append((votes[1] + 2 * votes[2] + 1) / (sum(votes) + 1))
+
+    if solve_times:
+        signals.append(2 * min(statistics.median(solve_times), SLOW_SOLVE_SECONDS) / SLOW_SOLVE_SECONDS)
+
+    return sum(signals) / len(signals) if signals else 1.0
+
+def tier_for_score(score: float) -> str:
+    """
+    Map a 0-2 difficulty score onto a tier name.
+
+    Args:
+        score (float): The difficulty score
+
+    Returns:
+        str: One of TIERS
+    """
+    if score < 2 / 3:
+        return "easy"
+    if score < 4 / 3:
+        return "medium"
+    return "hard"
+
+def assign_tiers(puzzle_ids: List[str], ratings_by_id: Dict[str, Dict[str, Any]],
+                 solve_times: Dict[str, List[float]]) -> Dict[str, List[str]]:
+    """
+    Assign every puzzle to a tier.
+
+    Args:
+        puzzle_ids (List[str]): The puzzles to assign
+        ratings_by_id (Dict[str, Dict[str, Any]]): Aggregate ratings keyed by puzzle ID
+        solve_times (Dict[str, List[float]]): Observed solve times keyed by puzzle ID
+
+    Returns:
+        Dict[str, List[str]]: Puzzle IDs keyed by tier
+    """
+    tiers: Dict[str, List[str]] = {tier: [] for tier in TIERS}
+    for puzzle_id in sorted(puzzle_ids):
+        score = puzzle_difficulty_score(ratings_by_id.get(puzzle_id), solve_times.get(puzzle_id))
+        tiers[tier_for_score(score)].append(puzzle_id)
+    return tiers
+
+class DifficultyTierIndex:
+    """
+    Catalog indices bucketed by difficulty tier, drawable in O(1).
+    """
+
+    def __init__(self, buckets: Optional[Dict[str, array]] = None, catalog_size: int = 0):
+        self.buckets = buckets or {tier: array('I') for tier in TIERS}
+        self.catalog_size = catalog_size
+
+    @classmethod
+    def from_tiers(cls, tiers: Dict[str, List[str]], catalog: List[str]) -> 'DifficultyTierIndex':
+        """
+        Map published tiers of puzzle IDs onto this worker's catalog positions.
+        Puzzles not in the catalog are left out.
+
+        Args:
+            tiers (Dict[str, List[str]]): Puzzle IDs keyed by tier
+            catalog (List[str]): Puzzle IDs indexed by catalog position
+
+        Returns:
+            DifficultyTierIndex: The new index
+        """
+        positions = {puzzle_id: index for index, puzzle_id in enumerate(catalog)}
+        buckets = {
+            tier: array('I', sorted(positions[puzzle_id] for puzzle_id in tiers.get(tier, ()) if puzzle_id in positions))
+            for tier in TIERS
+        }
+        return cls(buckets, len(catalog))
+
+    def draw(self, tier: str, rng: random.Random = random) -> Optional[int]:
+        """
+        Draw a catalog index from a tier, falling back to the nearest
+        non-empty tier.
+
+        Args:
+            tier (str): The preferred tier
+            rng (random.Random): Random generator to use
+
+        Returns:
+            Optional[int]: A catalog index, or None if the index is empty
+        """
+        position = TIERS.index(tier)
+        for distance in range(len(TIERS)):
+            for candidate in (position - distance, position + distance):
+                if 0 <= candidate < len(TIERS):
+                    bucket = self.buckets[TIERS[candidate]]
+                    if bucket:
+                        return bucket[rng.randrange(len(bucket))]
+        return None
+
+def write_tier_index() -> Dict[str, List[str]]:
+    """
+    Build every puzzle's tier and publish it as ratings/_tiers.
+
+    Returns:
+        Dict[str, List[str]]: The published puzzle IDs keyed by tier
+
+    Raises:
+        RuntimeError: If there is no usable ratings snapshot to build from
+    """
+    table = s3_utils.get_ratings_snapshot()
+    if table is None:
+        raise RuntimeError("No ratings snapshot newer than RATINGS_SNAPSHOT_MAX_AGE_SECONDS; run ratings_snapshot.py first")
+    puzzle_ids = s3_utils.get_puzzle_ids()
+    if not puzzle_ids:
+        raise RuntimeError("No puzzles listed")
+
+    tiers = assign_tiers(puzzle_ids, table.as_dict(), load_solve_times())
+    body, headers = json_codec.encode({
+        "format": TIER_INDEX_FORMAT,
+        "generated_at": datetime.datetime.utcnow().isoformat(),
+        "tiers": tiers
+    })
+    s3_utils.s3_client.put_object(Bucket=s3_utils.WEBAPP_BUCKET, Key=TIER_INDEX_KEY, Body=body, **headers)
+    print("Wrote difficulty tier index: " + ", ".join(f"{tier}={len(ids)}" for tier, ids in tiers.items()))
+    return tiers
+
+_tier_index = DifficultyTierIndex()
+_tiers: Dict[str, List[str]] = {}
+_tiers_etag: Optional[str] = None
+_tiers_checked_at = 0.0
+_tiers_lock = threading.Lock()
+
+def get_tier_index() -> DifficultyTierIndex:
+    """
+    Get the published tier index mapped onto this worker's catalog,
+    revalidating ratings/_tiers at most once per TIER_REFRESH_SECONDS. The
+    index is re-mapped when the tiers change or the catalog grows.
+
+    Returns:
+        DifficultyTierIndex: The current index, empty until tiers are published
+    """
+    global _tier_index, _tiers, _tiers_etag, _tiers_checked_at
+    with _tiers_lock:
+        if time.time() - _tiers_checked_at < TIER_REFRESH_SECONDS:
+            return _tier_index
+        _tiers_checked_at = time.time()
+
+        changed = False
+        try:
+            result = s3_utils.fetch_json_object(
+                s3_utils.ratings_breaker, s3_utils.WEBAPP_BUCKET, TIER_INDEX_KEY, _tiers_etag)
+            if result is not None:
+                _tiers, _tiers_etag = result[0], result[1]
+                changed = True
+        except Exception as e:
+            # No tiers published yet, or S3 is down: keep the last index
+            if s3_utils.is_s3_outage(e):
+                print(f"Error loading difficulty tier index: {type(e).__name__}: {str(e)}")
+
+        catalog = s3_utils.get_puzzle_catalog()
+        if _tiers and (changed or len(catalog) != _tier_index.catalog_size):
+            _tier_index = DifficultyTierIndex.from_tiers(_tiers['tiers'], catalog)
+        return _tier_index
+
+def choose_player_tier(game_history: List[Dict[str, Any]]) -> str:
+    """
+    Pick the tier for a player's next puzzle from their recent results.
+
+    Fast, hint-free solves push the player towards harder puzzles; skips,
+    hints and slow solves push them towards easier ones.
+
+    Args:
+        game_history (List[Dict[str, Any]]): The session's game history
+
+    Returns:
+        str: One of TIERS
+    """
+    recent = game_history[-PLAYER_HISTORY_WINDOW:]
+    if not recent:
+        return "medium"
+
+    points = 0.0
+    for entry in recent:
+        time_taken = entry.get('time_taken', SLOW_SOLVE_SECONDS)
+        if entry.get('result') == 'skipped':
+            points -= 1
+        elif entry.get('hints_used'):
+            points -= 0.5
+        elif time_taken < SLOW_SOLVE_SECONDS / 4:
+            points += 1
+        elif time_taken >= SLOW_SOLVE_SECONDS * 3 / 4:
+            points -= 0.5
+    average = points / len(recent)
+
+    if average >= 0.5:
+        return "hard"
+    if average <= -0.5:
+        return "easy"
+    return "medium"
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Write ratings/_tiers from the ratings snapshot and the recent ratings logs.")
+    parser.add_argument('--every', type=float, default=None, help="Keep running, writing the tiers every this many seconds")
+    args = parser.parse_args()
+
+    while True:
+        try:
+            write_tier_index()
+        except Exception as e:
+            print(f"Error writing difficulty tier index: {type(e).__name__}: {str(e)}")
+        if args.every is None:
+            break
+        time.sleep(args.every)
@@ -0,0 +1,138 @@
+import functools
+import io
+import json
+import os
+import random
+import textwrap
+import threading
+from typing import Dict, Any, Optional
+from PIL import Image, ImageDraw, ImageFont
+
+# Puzzles served while the puzzle bucket is unavailable. The corpus ships with
+# the app and is read once per process; its images are drawn locally with
+# Pillow and kept as PNG bytes, so degraded mode needs no disk reads per
+# guess and no external image service.
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fallback_puzzles.json')
+IMAGE_SIZE = 300
+
+# Used only if the corpus file itself cannot be read
+DUMMY_PUZZLE = {
+    "id": "dummy-puzzle",
+    "target_word": "apple",
+    "descriptions": {
+        "1": "A round fruit with red or green skin",
+        "2": "A tech company with a fruit logo",
+        "3": "A famous city nicknamed 'The Big Apple'",
+        "4": "The fruit mentioned in the story of Adam and Eve"
+    },
+    "labels": {"1": "Fruit", "2": "Company", "3": "New York", "4": "Garden of Eden"}
+}
+
+# Background colours for the generated images, light enough for dark text
+PALETTE = [
+    (255, 214, 165), (253, 255, 182), (202, 255, 191), (155, 246, 255),
+    (160, 196, 255), (189, 178, 255), (255, 198, 255), (255, 173, 173)
+]
+
+_lock = threading.Lock()
+_corpus: Optional[Dict[str, Dict[str, Any]]] = None
+
+def _load_corpus() -> Dict[str, Dict[str, Any]]:
+    global _corpus
+    with _lock:
+        if _corpus is None:
+            try:
+                with open(CORPUS_PATH, 'r') as f:
+                    puzzles = json.load(f)
+                print(f"Loaded {len(puzzles)} fallback puzzles")
+            except Exception as e:
+                print(f"Error loading fallback puzzles: {type(e).__name__}: {str(e)}")
+                puzzles = [DUMMY_PUZZLE]
+            _corpus = {puzzle['id']: puzzle for puzzle in puzzles}
+        return _corpus
+
+def _font(size: int):
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        # Pillow < 10.1 only has the small fixed-size bitmap font
+        return ImageFont.load_default()
+
+@functools.lru_cache(maxsize=None)
+def render_image(text: str, colour_index: int) -> bytes:
+    """
+    Draw a fallback puzzle image: the text, wrapped and centred on a coloured tile.
+
+    Args:
+        text (str): The text to draw
+        colour_index (int): Index into PALETTE for the background
+
+    Returns:
+        bytes: The image as PNG
+    """
+    image = Image.new('RGB', (IMAGE_SIZE, IMAGE_SIZE), PALETTE[colour_index % len(PALETTE)])
+    draw = ImageDraw.Draw(image)
+    font = _font(32)
+    lines = textwrap.wrap(text, width=14) or [""]
+
+    heights = [draw.textbbox((0, 0), line, font=font)[3] for line in lines]
+    spacing = 10
+    y = (IMAGE_SIZE - sum(heights) - spacing * (len(lines) - 1)) / 2
+    for line, height in zip(lines, heights):
+        width = draw.textlength(line, font=font)
+        draw.text(((IMAGE_SIZE - width) / 2, y), line, fill=(40, 40, 40), font=font)
+        y += height + spacing
+
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+def get_puzzle(puzzle_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Get a fallback puzzle with its images.
+
+    Args:
+        puzzle_id (str): The puzzle ID
+
+    Returns:
+        Dict[str, Any]: The puzzle, with PNG bytes in 'image_urls' (st.image
+            accepts either), or None if it is not a fallback puzzle
+    """
+    puzzle = _load_corpus().get(puzzle_id)
+    if puzzle is None:
+        return None
+
+    offset = sum(map(ord, puzzle_id))
+    labels = puzzle.get('labels', {})
+    return {
+        "id": puzzle_id,
+        "descriptions": dict(puzzle['descriptions']),
+        "image_urls": {
+            key: render_image(labels.get(key, f"Picture {key}"), offset + int(key))
+            for key in puzzle['descriptions']
+        }
+    }
+
+def random_puzzle() -> Dict[str, Any]:
+    """
+    Get a random fallback puzzle.
+
+    Returns:
+        Dict[str, Any]: The puzzle, as from get_puzzle
+    """
+    return get_puzzle(random.choice(list(_load_corpus())))
+
+def get_solution(puzzle_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Get a fallback puzzle's solution record.
+
+    Args:
+        puzzle_id (str): The puzzle ID
+
+    Returns:
+        Dict[str, Any]: The solution data, or None if it is not a fallback puzzle
+    """
+    puzzle = _load_corpus().get(puzzle_id)
+    if puzzle is None:
+        return None
+    return {key: puzzle[key] for key in ('target_word', 'accepted_answers', 'max_edit_distance') if key in puzzle}
@@ -2,6 +2,10 @@ import time
 import uuid
 from typing import Dict, Any, List, Optional, Tuple
 import s3_utils
+import difficulty_tiers
+import guess_limiter
+import player_profiles
+from puzzle_deck import PuzzleDeck
 
 def initialize_game_state() -> Dict[str, Any]:
     """
@@ -26,21 +30,95 @@ def initialize_game_state() -> Dict[str, Any]:
         'feedback_message': None,
         'feedback_type': None,  # 'success', 'error', or None
         'session_id': session_id,
+        'deck': PuzzleDeck(),
+        'selection_mode': s3_utils.SELECTION_MODE,  # 'deck', 'weighted' or 'adaptive'
+        'difficulty_tier': None,
         'show_rating_ui': False,
         'last_solved_puzzle': None,
         'current_ratings': None,
+        'seen_puzzles': set(),  # Puzzle IDs, saved in the player's profile
+        'profile_key': player_profiles.new_profile_key(),
         'is_first_puzzle': False  # Changed to False since we don't need name input
     }
 
-def load_new_puzzle() -> Optional[Dict[str, Any]]:
+def resume_game_state(key: str) -> Optional[Dict[str, Any]]:
+    """
+    Rebuild a game state from a saved player profile.
+    
+    Puzzles the player has seen are moved out of the new deck, and the puzzle
+    they were on is reloaded (usually from the host's shared cache). The state
+    gets a new session ID, so tabs resuming one profile are rate limited
+    separately.
+    
+    Args:
+        key (str): The profile key, see player_profiles.new_profile_key
+        
+    Returns:
+        Dict[str, Any]: The resumed state, or None if there is no profile
+    """
+    profile = player_profiles.load_profile(key)
+    if not profile:
+        return None
+    
+    state = initialize_game_state()
+    state['profile_key'] = key
+    state['player_name'] = profile.get('player_name')
+    for field in ('score', 'puzzles_solved', 'puzzles_skipped', 'hints_used'):
+        state[field] = profile.get(field, 0)
+    state['seen_puzzles'] = player_profiles.decode_seen(profile.get('seen'))
+    
+    # Deck indices are this worker's catalog positions, so map the IDs here
+    catalog_size = len(s3_utils.get_puzzle_catalog())
+    state['deck'].extend(catalog_size)
+    positions = (s3_utils.get_catalog_position(puzzle_id) for puzzle_id in state['seen_puzzles'])
+    state['deck'].mark_drawn(i for i in positions if i is not None and i < catalog_size)
+    
+    if profile.get('current_puzzle_id'):
+        state['current_puzzle'] = s3_utils.get_puzzle_by_id(profile['current_puzzle_id'])
+    if not state['current_puzzle']:
+        state['current_puzzle'] = load_next_puzzle(state)
+    return state
+
+def save_progress(state: Dict[str, Any]) -> str:
+    """
+    Queue the player's progress for saving. Cheap to call on every rerun:
+    unchanged progress is not written again.
+    
+    Args:
+        state (Dict[str, Any]): The current game state
+        
+    Returns:
+        str: The profile key the progress is saved under
+    """
+    puzzle = state.get('current_puzzle') or {}
+    if puzzle.get('id') and s3_utils.get_catalog_position(puzzle['id']) is not None:
+        state.setdefault('seen_puzzles', set()).add(puzzle['id'])
+    
+    key = state.setdefault('profile_key', player_profiles.new_profile_key())
+    player_profiles.save_profile(key, {
+        'player_name': state.get('player_name'),
+        'score': state['score'],
+        'puzzles_solved': state['puzzles_solved'],
+        'puzzles_skipped': state['puzzles_skipped'],
+        'hints_used': state['hints_used'],
+        'seen': player_profiles.encode_seen(state['seen_puzzles']),
+        'current_puzzle_id': puzzle.get('id')
+    })
+    return key
+
+def load_new_puzzle(deck: Optional[PuzzleDeck] = None, mode: Optional[str] = None) -> Optional[Dict[str, Any]]:
     """
     Load a new random puzzle.
     
+    Args:
+        deck (PuzzleDeck, optional): The session's deck to draw from
+        mode (str, optional): Selection mode passed to s3_utils.get_random_puzzle
+        
     Returns:
         Dict[str, Any]: The puzzle data
     """
     try:
-        puzzle = s3_utils.get_random_puzzle()
+        puzzle = s3_utils.get_random_puzzle(deck, mode)
         if puzzle:
             # Reset puzzle-specific state
             puzzle['show_hints'] = False
@@ -54,21 +132,89 @@ def load_new_puzzle() -> Optional[Dict[str, Any]]:
         traceback.print_exc()
         return None
 
-def check_answer(puzzle_id: str, user_guess: str) -> Tuple[bool, Optional[str]]:
+def load_next_puzzle(state: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Load the next puzzle for a session using its deck and selection mode.
+    
+    In 'adaptive' mode the puzzle comes from the difficulty tier that matches
+    the player's recent solve times, skips and hint usage.
+    
+    Args:
+        state (Dict[str, Any]): The current game state
+        
+    Returns:
+        Dict[str, Any]: The puzzle data
+    """
+    if state.get('selection_mode') == 'adaptive':
+        puzzle = load_adaptive_puzzle(state)
+        if puzzle:
+            return puzzle
+        # Tier index not built yet; fall back to the session's deck
+        return load_new_puzzle(state.get('deck'), 'deck')
+    return load_new_puzzle(state.get('deck'), state.get('selection_mode'))
+
+def load_adaptive_puzzle(state: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Load a puzzle from the difficulty tier matching the player's recent play.
+    
+    Args:
+        state (Dict[str, Any]): The current game state
+        
+    Returns:
+        Dict[str, Any]: The puzzle data, or None if no tiered puzzle is available
+    """
+    try:
+        state['difficulty_tier'] = difficulty_tiers.choose_player_tier(state['game_history'])
+        index = difficulty_tiers.get_tier_index().draw(state['difficulty_tier'])
+        if index is None:
+            return None
+        
+        puzzle_id = s3_utils.get_puzzle_catalog()[index]
+        if puzzle_id in s3_utils.get_excluded_puzzles():
+            return None
+        
+        puzzle = s3_utils.get_puzzle_by_id(puzzle_id)
+        if puzzle:
+            puzzle['show_hints'] = False
+            puzzle['start_time'] = time.time()
+        return puzzle
+    except Exception as e:
+        print(f"Error in load_adaptive_puzzle: {type(e).__name__}: {str(e)}")
+        return None
+
+def check_answer(puzzle_id: str, user_guess: str, session_id: Optional[str] = None) -> Tuple[bool, Optional[str]]:
     """
     Check if the user's guess is correct.
     
+    With a session ID, guesses are rate limited per session and a repeated
+    guess on the same puzzle is answered without checking it again.
+    
     Args:
         puzzle_id (str): The puzzle ID
         user_guess (str): The user's guess
+        session_id (str, optional): The guessing session
         
     Returns:
         Tuple[bool, Optional[str]]: (is_correct, correct_answer if incorrect)
+        
+    Raises:
+        guess_limiter.GuessRateLimitedError: If the session is guessing too fast
     """
     if not user_guess.strip():
         return False, None
-        
-    is_correct = s3_utils.validate_answer(puzzle_id, user_guess)
+    
+    if session_id is None:
+        is_correct = s3_utils.validate_answer(puzzle_id, user_guess)
+    else:
+        normalized, is_correct = guess_limiter.admit(session_id, puzzle_id, user_guess)
+        if is_correct is None:
+            try:
+                is_correct = s3_utils.validate_answer(puzzle_id, user_guess, strict=True)
+                guess_limiter.remember(session_id, puzzle_id, normalized, is_correct)
+            except Exception as e:
+                # Not remembered, so the guess is checked again when repeated
+                print(f"Error validating answer for puzzle {puzzle_id}: {type(e).__name__}: {str(e)}")
+                is_correct = False
     
     if is_correct:
         return True, None
@@ -128,7 +274,7 @@ def skip_puzzle(state: Dict[str, Any]) -> Tuple[Dict[str, Any], str]:
     state['feedback_type'] = "error"
     
     # Load new puzzle immediately
-    state['current_puzzle'] = load_new_puzzle()
+    state['current_puzzle'] = load_next_puzzle(state)
     state['puzzle_start_time'] = time.time()
     state['show_hints'] = False
     
@@ -179,10 +325,14 @@ def solve_puzzle(state: Dict[str, Any], user_guess: str) -> Dict[str, Any]:
     time_taken = time.time() - state['puzzle_start_time']
     score = calculate_score(time_taken, state['show_hints'])
     
+    # Guesses may differ from the answer by case, plurals or a typo, so record
+    # and show the canonical answer
+    target_word = s3_utils.get_solution(state['current_puzzle']['id']) or user_guess
+    
     # Store the solved puzzle for rating
     state['last_solved_puzzle'] = {
         'id': state['current_puzzle']['id'],
-        'target_word': user_guess,
+        'target_word': target_word,
         'time_to_solve': time_taken,
         'hints_used': state['show_hints'],
         'was_skipped': False
@@ -205,7 +355,7 @@ def solve_puzzle(state: Dict[str, Any], user_guess: str) -> Dict[str, Any]:
     state['show_rating_ui'] = True
     
     # Set feedback message
-    state['feedback_message'] = f"Correct! The answer is '{user_guess}'. +{score} points!"
+    state['feedback_message'] = f"Correct! The answer is '{target_word}'. +{score} points!"
     state['feedback_type'] = "success"
     
     return state
@@ -262,7 +412,7 @@ def submit_rating(state: Dict[str, Any], difficulty_rating: str, issue_rating: s
     state['show_rating_ui'] = False
     
     # Load new puzzle
-    state['current_puzzle'] = load_new_puzzle()
+    state['current_puzzle'] = load_next_puzzle(state)
     state['puzzle_start_time'] = time.time()
     state['show_hints'] = False
     
@@ -286,7 +436,7 @@ def skip_rating(state: Dict[str, Any]) -> Dict[str, Any]:
     state['show_rating_ui'] = False
     
     # Load new puzzle
-    state['current_puzzle'] = load_new_puzzle()
+    state['current_puzzle'] = load_next_puzzle(state)
     state['puzzle_start_time'] = time.time()
     state['show_hints'] = False
     
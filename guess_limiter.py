@@ -0,0 +1,95 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import metrics
+from answer_matching import normalize_answer
+
+# Each session may check GUESS_BURST guesses at once and GUESS_RATE_PER_SECOND
+# on average after that. Repeating a guess on the same puzzle returns the
+# earlier result without checking it again and costs no tokens.
+GUESS_RATE_PER_SECOND = float(os.getenv('GUESS_RATE_PER_SECOND', '1'))
+GUESS_BURST = float(os.getenv('GUESS_BURST', '5'))
+
+# Sessions tracked per process; the least recently active are forgotten first
+MAX_TRACKED_SESSIONS = 10000
+
+class GuessRateLimitedError(Exception):
+    """Raised instead of checking a guess when the session is guessing too fast."""
+
+class _Session:
+    def __init__(self):
+        self.tokens = GUESS_BURST
+        self.updated_at = time.monotonic()
+        self.puzzle_id: Optional[str] = None
+        # Guess, normalized without plural stripping -> is_correct, for puzzle_id.
+        # Matching also tries the unstripped form, so "bae" and "baes" can differ.
+        self.results: Dict[str, bool] = {}
+
+    def take(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(GUESS_BURST, self.tokens + (now - self.updated_at) * GUESS_RATE_PER_SECOND)
+        self.updated_at = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+_lock = threading.Lock()
+_sessions: 'OrderedDict[str, _Session]' = OrderedDict()
+
+def _session(session_id: str) -> _Session:
+    session = _sessions.get(session_id)
+    if session is None:
+        session = _sessions[session_id] = _Session()
+        if len(_sessions) > MAX_TRACKED_SESSIONS:
+            _sessions.popitem(last=False)
+    else:
+        _sessions.move_to_end(session_id)
+    return session
+
+def admit(session_id: str, puzzle_id: str, guess: str) -> Tuple[str, Optional[bool]]:
+    """
+    Decide whether a session's guess should be checked.
+
+    Args:
+        session_id (str): The session ID
+        puzzle_id (str): The puzzle being guessed
+        guess (str): The guess
+
+    Returns:
+        Tuple[str, Optional[bool]]: The normalized guess, and the earlier result
+            if the session already made this guess on this puzzle
+
+    Raises:
+        GuessRateLimitedError: If the session has no tokens left
+    """
+    normalized = normalize_answer(guess, singularize=False)
+    with _lock:
+        session = _session(session_id)
+        if session.puzzle_id != puzzle_id:
+            session.puzzle_id = puzzle_id
+            session.results = {}
+        elif normalized in session.results:
+            metrics.increment('guesses.duplicate')
+            return normalized, session.results[normalized]
+        if not session.take():
+            metrics.increment('guesses.rate_limited')
+            raise GuessRateLimitedError(f"Session {session_id} is guessing too fast")
+    return normalized, None
+
+def remember(session_id: str, puzzle_id: str, normalized: str, is_correct: bool):
+    """
+    Record a checked guess so repeating it is answered from memory.
+
+    Args:
+        session_id (str): The session ID
+        puzzle_id (str): The puzzle guessed
+        normalized (str): The normalized guess from admit
+        is_correct (bool): Whether it was correct
+    """
+    with _lock:
+        session = _sessions.get(session_id)
+        if session is not None and session.puzzle_id == puzzle_id:
+            session.results[normalized] = is_correct
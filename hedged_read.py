@@ -0,0 +1,103 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional
+import metrics
+
+# Tail-latency control for S3 reads. A read that has not answered within the
+# recent HEDGE_PERCENTILE latency of its operation class gets a duplicate
+# request, and whichever answers first wins. Every read also gives up at its
+# deadline: READ_DEADLINE_SECONDS, or sooner if the player interaction it
+# belongs to has less time left.
+HEDGE_ENABLED = os.getenv('HEDGE_ENABLED', 'true').lower() == 'true'
+HEDGE_PERCENTILE = float(os.getenv('HEDGE_PERCENTILE', '95'))
+HEDGE_MIN_DELAY = 0.02
+HEDGE_MAX_DELAY = 1.0
+READ_DEADLINE_SECONDS = float(os.getenv('READ_DEADLINE_SECONDS', '3'))
+INTERACTION_DEADLINE_SECONDS = float(os.getenv('INTERACTION_DEADLINE_SECONDS', '5'))
+
+# Losing requests cannot be cancelled once sent, so the pool is sized for
+# them to finish in the background
+HEDGE_POOL_SIZE = 32
+
+_pool = ThreadPoolExecutor(max_workers=HEDGE_POOL_SIZE, thread_name_prefix="hedged-read")
+_local = threading.local()
+
+@contextmanager
+def interaction_deadline(seconds: float = INTERACTION_DEADLINE_SECONDS) -> Iterator[None]:
+    """
+    Bound the total time reads may take within a block, e.g. one button
+    callback. Nested blocks keep the earlier deadline. Also usable as a
+    decorator.
+
+    Args:
+        seconds (float): The time budget for the block
+    """
+    previous = getattr(_local, 'deadline', None)
+    deadline = time.monotonic() + seconds
+    _local.deadline = deadline if previous is None else min(previous, deadline)
+    try:
+        yield
+    finally:
+        _local.deadline = previous
+
+def _hedge_delay(name: str) -> float:
+    # Until there are samples, the percentile is 0 and we hedge late
+    threshold = metrics.percentile(f'hedge.{name}', HEDGE_PERCENTILE)
+    if threshold <= 0:
+        return HEDGE_MAX_DELAY
+    return min(HEDGE_MAX_DELAY, max(HEDGE_MIN_DELAY, threshold))
+
+def call(name: str, fn: Callable[[], Any], deadline_seconds: Optional[float] = None) -> Any:
+    """
+    Run a read, hedging it if it is slow and bounding it by a deadline.
+
+    fn must be idempotent, since it may run twice.
+
+    Args:
+        name (str): Operation class, used for the adaptive threshold and metrics
+        fn (Callable): The read, e.g. a get_object plus decoding its body
+        deadline_seconds (float, optional): Per-read deadline; defaults to READ_DEADLINE_SECONDS
+
+    Returns:
+        Any: The result of whichever request finished first
+
+    Raises:
+        TimeoutError: If no request finished before the deadline
+    """
+    start = time.monotonic()
+    deadline = start + (deadline_seconds or READ_DEADLINE_SECONDS)
+    interaction = getattr(_local, 'deadline', None)
+    if interaction is not None:
+        deadline = min(deadline, interaction)
+
+    metrics.increment(f'hedge.{name}.calls')
+    primary = _pool.submit(fn)
+    # The threshold follows the primary requests' own latency, hedged or not
+    primary.add_done_callback(lambda _: metrics.observe(f'hedge.{name}', time.monotonic() - start))
+    pending = {primary}
+
+    if HEDGE_ENABLED:
+        done, _ = wait(pending, timeout=max(0.0, min(_hedge_delay(name), deadline - time.monotonic())))
+        if not done and time.monotonic() < deadline:
+            metrics.increment(f'hedge.{name}.hedged')
+            pending.add(_pool.submit(fn))
+
+    error = None
+    while pending:
+        done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+        if not done:
+            break
+        for future in done:
+            if future.exception() is None:
+                if future is not primary:
+                    metrics.increment(f'hedge.{name}.hedge_won')
+                return future.result()
+            error = future.exception()
+
+    if error is not None and not pending:
+        raise error
+    metrics.increment(f'hedge.{name}.deadline_exceeded')
+    raise TimeoutError(f"{name} read did not finish within its deadline")
@@ -0,0 +1,262 @@
+import argparse
+import datetime
+import io
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
+from botocore.exceptions import ClientError
+from PIL import Image, UnidentifiedImageError
+import json_codec
+import s3_utils
+
+# Scans every object under images/ in the puzzle bucket. Each image gets a
+# 64-bit difference hash (dHash) and a status; images that fail to decode or
+# are a flat colour mark their puzzle as excluded from selection, and images
+# that are near-identical across puzzles are listed for review. The index
+# remembers each image's ETag, so later scans only download new or changed
+# images.
+IMAGE_PREFIX = 'images/'
+INDEX_KEY = 'image_index/index.json'
+SCAN_WORKERS = 16
+
+# dHashes at most this many bits apart are treated as the same picture
+DUPLICATE_MAX_DISTANCE = 4
+# Greyscale standard deviation below which an image counts as blank
+BLANK_STDDEV = 3.0
+
+OK, UNREADABLE, TRUNCATED, BLANK = 'ok', 'unreadable', 'truncated', 'blank'
+
+_POPCOUNT = np.array([bin(byte).count('1') for byte in range(256)], dtype=np.uint8)
+
+def popcount(values: np.ndarray) -> np.ndarray:
+    """Count the set bits of each uint64 value."""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(values)
+    # NumPy < 2.0: count per byte with a lookup table
+    return _POPCOUNT[values.view(np.uint8)].reshape(values.shape + (8,)).sum(axis=-1)
+
+def dhash(image: Image.Image) -> int:
+    """
+    Compute an image's 64-bit difference hash: whether each pixel of a 9x8
+    greyscale thumbnail is brighter than its right-hand neighbour.
+
+    Args:
+        image (Image.Image): The decoded image
+
+    Returns:
+        int: The hash
+    """
+    pixels = np.asarray(image.convert('L').resize((9, 8), Image.LANCZOS), dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+def inspect_image(body: bytes) -> Tuple[str, Optional[int]]:
+    """
+    Decode an image fully and hash it.
+
+    Args:
+        body (bytes): The image file
+
+    Returns:
+        Tuple[str, Optional[int]]: The status, and the dHash unless the image
+            could not be decoded
+    """
+    try:
+        image = Image.open(io.BytesIO(body))
+    except (UnidentifiedImageError, ValueError):
+        return UNREADABLE, None
+    try:
+        # Pillow only reads the pixel data here, so this is where truncation shows
+        image.load()
+    except (OSError, SyntaxError, ValueError):
+        return TRUNCATED, None
+
+    grey = np.asarray(image.convert('L').resize((32, 32)), dtype=np.float32)
+    return (BLANK if grey.std() < BLANK_STDDEV else OK), dhash(image)
+
+def image_puzzle_id(image_name: str) -> str:
+    """Get the puzzle an image belongs to from its name, {puzzle_id}_{n}.png."""
+    return image_name.rsplit('_', 1)[0]
+
+def find_duplicates(names: List[str], hashes: np.ndarray,
+                    max_distance: int = DUPLICATE_MAX_DISTANCE) -> List[Tuple[str, str, int]]:
+    """
+    Find pairs of images from different puzzles whose hashes differ in at most
+    max_distance bits.
+
+    The hashes are split into max_distance + 1 bit ranges; two hashes that
+    close must agree exactly on at least one range, so only images sharing a
+    range value are compared.
+
+    Args:
+        names (List[str]): Image names
+        hashes (np.ndarray): Their dHashes, as uint64
+        max_distance (int): Largest Hamming distance to report
+
+    Returns:
+        List[Tuple[str, str, int]]: (image, image, distance), closest first
+    """
+    puzzle_ids = np.array([image_puzzle_id(name) for name in names])
+    boundaries = np.linspace(0, 64, max_distance + 2).astype(np.uint64)
+    pairs: Dict[Tuple[int, int], int] = {}
+
+    for low, high in zip(boundaries[:-1], boundaries[1:]):
+        keys = (hashes >> low) & np.uint64((1 << int(high - low)) - 1)
+        order = np.argsort(keys, kind='stable')
+        starts = np.flatnonzero(np.diff(keys[order])) + 1
+        for group in np.split(order, starts):
+            if len(group) < 2:
+                continue
+            distances = popcount(hashes[group][:, None] ^ hashes[group][None, :])
+            for i, j in zip(*np.nonzero(np.triu(distances <= max_distance, k=1))):
+                a, b = sorted((int(group[i]), int(group[j])))
+                if puzzle_ids[a] != puzzle_ids[b]:
+                    pairs[(a, b)] = int(distances[i, j])
+
+    return sorted(((names[a], names[b], d) for (a, b), d in pairs.items()), key=lambda pair: pair[2])
+
+def load_index() -> Dict[str, Any]:
+    """
+    Load the image index from the webapp bucket.
+
+    Returns:
+        Dict[str, Any]: The index, or an empty one if none has been written
+    """
+    try:
+        response = s3_utils.s3_client.get_object(Bucket=s3_utils.WEBAPP_BUCKET, Key=INDEX_KEY)
+        return json_codec.decode_response(response)
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') not in ('NoSuchKey', '404'):
+            raise
+        return {"images": {}, "duplicates": []}
+
+def check_image(index: Dict[str, Any], body: bytes,
+                max_distance: int = DUPLICATE_MAX_DISTANCE) -> Dict[str, Any]:
+    """
+    Check an image before ingestion: whether it decodes, whether it is blank,
+    and which indexed images it nearly duplicates.
+
+    Args:
+        index (Dict[str, Any]): The index from load_index
+        body (bytes): The new image file
+        max_distance (int): Largest Hamming distance to report
+
+    Returns:
+        Dict[str, Any]: {"status": str, "hash": str or None, "duplicates": [image names]}
+    """
+    status, image_hash = inspect_image(body)
+    result = {"status": status, "hash": None if image_hash is None else f'{image_hash:016x}', "duplicates": []}
+    if image_hash is None:
+        return result
+
+    names = [name for name, entry in index['images'].items() if entry.get('hash')]
+    if names:
+        hashes = np.array([int(index['images'][name]['hash'], 16) for name in names], dtype=np.uint64)
+        distances = popcount(hashes ^ np.uint64(image_hash))
+        result["duplicates"] = [names[i] for i in np.flatnonzero(distances <= max_distance)]
+    return result
+
+def list_images() -> Dict[str, str]:
+    """
+    List every image in the puzzle bucket.
+
+    Returns:
+        Dict[str, str]: ETag per image name
+    """
+    paginator = s3_utils.s3_client.get_paginator('list_objects_v2')
+    images = {}
+    for page in paginator.paginate(Bucket=s3_utils.PUZZLE_BUCKET, Prefix=IMAGE_PREFIX):
+        for obj in page.get('Contents', []):
+            if not obj['Key'].endswith('/'):
+                images[obj['Key'][len(IMAGE_PREFIX):]] = obj['ETag']
+    return images
+
+def scan(index: Dict[str, Any], workers: int = SCAN_WORKERS, full: bool = False,
+         max_distance: int = DUPLICATE_MAX_DISTANCE) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Bring the index up to date with the bucket, downloading and hashing new or
+    changed images in parallel, then recompute the duplicates. Images that
+    fail to download keep their previous result, if any, and are retried by
+    the next scan; only images that fail to decode count as unreadable.
+
+    Args:
+        index (Dict[str, Any]): The previous index from load_index
+        workers (int): Concurrent downloads
+        full (bool): Rescan every image, not just new or changed ones
+        max_distance (int): Largest Hamming distance to report as a duplicate
+
+    Returns:
+        Tuple[Dict[str, Any], List[str]]: The new index, and the puzzles to exclude
+    """
+    listed = list_images()
+    previous = index.get('images', {})
+    entries = {name: previous[name] for name, etag in listed.items()
+               if not full and name in previous and previous[name].get('etag') == etag}
+    pending = sorted(name for name in listed if name not in entries)
+    print(f"{len(listed)} images, {len(pending)} to scan")
+
+    def inspect(name: str) -> Optional[Dict[str, Any]]:
+        try:
+            response = s3_utils.s3_client.get_object(Bucket=s3_utils.PUZZLE_BUCKET, Key=f'{IMAGE_PREFIX}{name}')
+            body = response['Body'].read()
+        except Exception as e:
+            print(f"Error reading image {name}: {type(e).__name__}: {str(e)}")
+            return None
+        status, image_hash = inspect_image(body)
+        return {"etag": listed[name], "status": status, "hash": None if image_hash is None else f'{image_hash:016x}'}
+
+    failed = 0
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image-scan") as pool:
+        for name, entry in zip(pending, pool.map(inspect, pending)):
+            if entry is None:
+                # Keep the last result, without an ETag so the next scan retries
+                failed += 1
+                if name in previous:
+                    entries[name] = dict(previous[name], etag=None)
+                continue
+            entries[name] = entry
+            if entry['status'] != OK:
+                print(f"{name}: {entry['status']}")
+    if failed:
+        print(f"{failed} images could not be downloaded; they will be retried on the next scan")
+
+    names = sorted(name for name, entry in entries.items() if entry['status'] == OK)
+    hashes = np.array([int(entries[name]['hash'], 16) for name in names], dtype=np.uint64)
+    duplicates = find_duplicates(names, hashes, max_distance)
+    excluded = sorted(set(image_puzzle_id(name) for name, entry in entries.items() if entry['status'] != OK))
+
+    new_index = {
+        "generated_at": datetime.datetime.utcnow().isoformat(),
+        "images": dict(sorted(entries.items())),
+        "duplicates": [{"a": a, "b": b, "distance": d} for a, b, d in duplicates]
+    }
+    return new_index, excluded
+
+def write_results(index: Dict[str, Any], excluded: List[str]):
+    """
+    Write the index, and the excluded puzzles that selection skips.
+
+    Args:
+        index (Dict[str, Any]): The index from scan
+        excluded (List[str]): The puzzle IDs to exclude
+    """
+    for key, data in ((INDEX_KEY, index), (s3_utils.EXCLUDED_PUZZLES_KEY, {"puzzle_ids": excluded})):
+        body, headers = json_codec.encode(data)
+        s3_utils.s3_client.put_object(Bucket=s3_utils.WEBAPP_BUCKET, Key=key, Body=body, **headers)
+    print(f"Wrote image index for {len(index['images'])} images; {len(excluded)} puzzles excluded")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hash puzzle images, find near-duplicates and broken images.")
+    parser.add_argument('--workers', type=int, default=SCAN_WORKERS, help="Concurrent image downloads")
+    parser.add_argument('--max-distance', type=int, default=DUPLICATE_MAX_DISTANCE,
+                        help="Largest dHash Hamming distance counted as a duplicate")
+    parser.add_argument('--full', action='store_true', help="Rescan every image, not just new or changed ones")
+    parser.add_argument('--dry-run', action='store_true', help="Report without writing the index")
+    args = parser.parse_args()
+
+    index, excluded = scan(load_index(), args.workers, args.full, args.max_distance)
+    for duplicate in index['duplicates']:
+        print(f"{duplicate['a']} ~ {duplicate['b']} ({duplicate['distance']} bits)")
+    print(f"{len(index['duplicates'])} near-duplicate image pairs; excluded puzzles: {', '.join(excluded) or 'none'}")
+    if not args.dry_run:
+        write_results(index, excluded)
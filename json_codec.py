@@ -0,0 +1,75 @@
+import gzip
+import json
+import os
+from typing import Any, Dict, Optional, Tuple
+
+# Gzip objects written to S3. Readers accept both compressed and plain bodies,
+# so this can be switched on without migrating existing objects.
+COMPRESS_OBJECTS = os.getenv('COMPRESS_OBJECTS', 'false').lower() == 'true'
+
+# Bodies smaller than this are not worth the gzip header and CPU
+GZIP_MIN_BYTES = 512
+
+_GZIP_MAGIC = b'\x1f\x8b'
+_COMPACT_SEPARATORS = (',', ':')
+
+def dumps(data: Any) -> str:
+    """
+    Serialize to JSON without insignificant whitespace.
+
+    Args:
+        data (Any): A JSON-serializable value
+
+    Returns:
+        str: The compact JSON text
+    """
+    return json.dumps(data, separators=_COMPACT_SEPARATORS)
+
+def encode(data: Any, compress: Optional[bool] = None) -> Tuple[bytes, Dict[str, str]]:
+    """
+    Encode a value as an S3 object body.
+
+    Args:
+        data (Any): A JSON-serializable value
+        compress (bool, optional): Whether to gzip; defaults to COMPRESS_OBJECTS
+
+    Returns:
+        Tuple[bytes, Dict[str, str]]: The body and the put_object headers to send with it
+    """
+    body = dumps(data).encode('utf-8')
+    headers = {'ContentType': 'application/json'}
+
+    if (COMPRESS_OBJECTS if compress is None else compress) and len(body) >= GZIP_MIN_BYTES:
+        body = gzip.compress(body, compresslevel=6)
+        headers['ContentEncoding'] = 'gzip'
+
+    return body, headers
+
+def decode(body: bytes) -> Any:
+    """
+    Decode an S3 object body written by encode or by older pretty-printing code.
+
+    Gzip is detected from the magic bytes rather than the Content-Encoding
+    header, which some HTTP layers strip after inflating the body themselves.
+
+    Args:
+        body (bytes): The raw body
+
+    Returns:
+        Any: The parsed value
+    """
+    if body[:2] == _GZIP_MAGIC:
+        body = gzip.decompress(body)
+    return json.loads(body.decode('utf-8'))
+
+def decode_response(response: Dict[str, Any]) -> Any:
+    """
+    Decode the body of a get_object response.
+
+    Args:
+        response (Dict[str, Any]): The boto3 get_object response
+
+    Returns:
+        Any: The parsed value
+    """
+    return decode(response['Body'].read())
@@ -0,0 +1,322 @@
+import argparse
+import contextlib
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
+from botocore.exceptions import ClientError
+
+# Keep the load test's caches and local fallback files away from the real ones.
+# These are read when s3_utils is imported, so set them first.
+_workdir = tempfile.mkdtemp(prefix='quadrality-load-')
+os.environ.setdefault('SHARED_CACHE_PATH', os.path.join(_workdir, 'cache.sqlite3'))
+os.environ.setdefault('RATINGS_STORE_PATH', os.path.join(_workdir, 'ratings.sqlite3'))
+
+import game_logic
+import guess_limiter
+import json_codec
+import metrics
+import rating_buffer
+import ratings_store
+import s3_utils
+
+WRONG_GUESSES = ("apple", "river", "light", "stone", "cloud", "house")
+
+class InMemoryS3:
+    """
+    Thread-safe stand-in for the boto3 S3 client, implementing the calls the
+    app makes. Every request sleeps for an injected latency and fails with an
+    injected 503 at the configured rate.
+    """
+
+    def __init__(self, latency_ms: float = 20.0, tail_ms: float = 500.0, tail_rate: float = 0.01,
+                 error_rate: float = 0.0):
+        self.latency_ms = latency_ms
+        self.tail_ms = tail_ms
+        self.tail_rate = tail_rate
+        self.error_rate = error_rate
+        self.requests = Counter()
+        self._objects: Dict[tuple, tuple] = {}
+        self._lock = threading.Lock()
+        self._versions = 0
+
+    def _request(self, operation: str):
+        with self._lock:
+            self.requests[operation] += 1
+        slow = random.random() < self.tail_rate
+        time.sleep(random.expovariate(1000.0 / (self.tail_ms if slow else self.latency_ms)))
+        if random.random() < self.error_rate:
+            raise ClientError({'Error': {'Code': 'SlowDown'}, 'ResponseMetadata': {'HTTPStatusCode': 503}}, operation)
+
+    def seed(self, bucket: str, key: str, data: Any):
+        body, _ = json_codec.encode(data)
+        with self._lock:
+            self._versions += 1
+            self._objects[(bucket, key)] = (body, f'"{self._versions}"')
+
+    def read(self, bucket: str, key: str) -> Optional[Any]:
+        with self._lock:
+            stored = self._objects.get((bucket, key))
+        return json_codec.decode(stored[0]) if stored else None
+
+    def keys(self, bucket: str, prefix: str) -> List[str]:
+        with self._lock:
+            return sorted(key for b, key in self._objects if b == bucket and key.startswith(prefix))
+
+    def head_bucket(self, Bucket: str):
+        self._request('HeadBucket')
+        return {}
+
+    def get_object(self, Bucket: str, Key: str, **kwargs) -> Dict[str, Any]:
+        self._request('GetObject')
+        with self._lock:
+            stored = self._objects.get((Bucket, Key))
+        if stored is None:
+            raise ClientError({'Error': {'Code': 'NoSuchKey'}, 'ResponseMetadata': {'HTTPStatusCode': 404}}, 'GetObject')
+        body, etag = stored
+        if kwargs.get('IfNoneMatch') == etag:
+            raise ClientError({'Error': {'Code': '304'}, 'ResponseMetadata': {'HTTPStatusCode': 304}}, 'GetObject')
+        return {'Body': _Body(body), 'ETag': etag}
+
+    def put_object(self, Bucket: str, Key: str, Body: Any, **kwargs) -> Dict[str, Any]:
+        self._request('PutObject')
+        if isinstance(Body, str):
+            Body = Body.encode('utf-8')
+        with self._lock:
+            current = self._objects.get((Bucket, Key))
+            if ('IfMatch' in kwargs and (current is None or current[1] != kwargs['IfMatch'])) or \
+                    ('IfNoneMatch' in kwargs and current is not None):
+                raise ClientError({'Error': {'Code': 'PreconditionFailed'}, 'ResponseMetadata': {'HTTPStatusCode': 412}}, 'PutObject')
+            self._versions += 1
+            self._objects[(Bucket, Key)] = (Body, f'"{self._versions}"')
+            return {'ETag': f'"{self._versions}"'}
+
+    def list_objects_v2(self, Bucket: str, Prefix: str = '', StartAfter: str = '', **kwargs) -> Dict[str, Any]:
+        self._request('ListObjectsV2')
+        # The continuation token is simply the last key of the previous page
+        after = max(StartAfter, kwargs.get('ContinuationToken', ''))
+        with self._lock:
+            contents = [
+                {'Key': key, 'ETag': etag}
+                for (bucket, key), (_, etag) in sorted(self._objects.items())
+                if bucket == Bucket and key.startswith(Prefix) and key > after
+            ]
+        page = contents[:kwargs.get('MaxKeys', 1000)]
+        response = {'Contents': page, 'KeyCount': len(page), 'IsTruncated': len(contents) > len(page)}
+        if response['IsTruncated']:
+            response['NextContinuationToken'] = page[-1]['Key']
+        return response
+
+    def get_paginator(self, operation: str):
+        return _Paginator(self)
+
+    def generate_presigned_url(self, operation: str, Params: Dict[str, str], ExpiresIn: int) -> str:
+        return f"https://stand-in.local/{Params['Bucket']}/{Params['Key']}"
+
+class _Body:
+    def __init__(self, data: bytes):
+        self._data = data
+
+    def read(self) -> bytes:
+        return self._data
+
+class _Paginator:
+    def __init__(self, client: InMemoryS3):
+        self._client = client
+
+    def paginate(self, **kwargs):
+        while True:
+            page = self._client.list_objects_v2(**kwargs)
+            yield page
+            if not page['IsTruncated']:
+                return
+            kwargs['ContinuationToken'] = page['NextContinuationToken']
+
+def install_stand_in(puzzles: int, **options) -> Dict[str, Any]:
+    """
+    Replace the app's S3 client with a seeded InMemoryS3.
+
+    Args:
+        puzzles (int): Number of puzzles to create
+        **options: InMemoryS3 latency and error options
+
+    Returns:
+        Dict[str, Any]: {"client": the stand-in, "answers": target words by puzzle ID}
+    """
+    client = InMemoryS3(**options)
+    answers = {}
+    for i in range(puzzles):
+        puzzle_id = f"load-{i:05d}"
+        answers[puzzle_id] = f"word{i}"
+        client.seed(s3_utils.PUZZLE_BUCKET, f'puzzles/{puzzle_id}.json', {
+            "descriptions": {str(n): f"Image {n} of puzzle {i}" for n in range(1, 5)},
+            "image_urls": {str(n): f"{puzzle_id}_{n}.png" for n in range(1, 5)}
+        })
+        client.seed(s3_utils.PUZZLE_BUCKET, f'solutions_by_id/{puzzle_id}.json', {"target_word": f"word{i}"})
+    s3_utils.s3_client = client
+    return {"client": client, "answers": answers}
+
+class LoadStats:
+    """Ratings submitted and actions completed across all simulated players."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.actions = Counter()
+        self.ratings_submitted = 0
+
+    def count(self, action: str):
+        with self.lock:
+            self.actions[action] += 1
+
+def run_player(answers: Dict[str, str], stats: LoadStats, stop_at: float, think_seconds: float):
+    """
+    Play until stop_at like a real player: think, then hint, guess wrong,
+    solve or skip, and rate most solved or skipped puzzles.
+
+    Args:
+        answers (Dict[str, str]): Target words by puzzle ID
+        stats (LoadStats): Shared counters
+        stop_at (float): time.monotonic() at which to stop
+        think_seconds (float): Mean pause between actions
+    """
+    def act(action: str, fn):
+        start = time.perf_counter()
+        result = fn()
+        metrics.observe(f'load.{action}', time.perf_counter() - start)
+        stats.count(action)
+        return result
+
+    def guess(puzzle_id: str, user_guess: str):
+        # Guesses are rate limited per session like a real player's
+        try:
+            return game_logic.check_answer(puzzle_id, user_guess, state['session_id'])
+        except guess_limiter.GuessRateLimitedError:
+            return False, None  # Counted in guesses.rate_limited
+
+    state = game_logic.initialize_game_state()
+    state['current_puzzle'] = act('load', lambda: game_logic.load_next_puzzle(state))
+
+    while time.monotonic() < stop_at and state['current_puzzle']:
+        time.sleep(random.expovariate(1.0 / think_seconds) if think_seconds > 0 else 0)
+        puzzle_id = state['current_puzzle'].get('id', '')
+        roll = random.random()
+
+        if roll < 0.15:
+            act('hint', lambda: game_logic.reveal_hints(state))
+            continue
+        if roll < 0.45:
+            act('guess', lambda: guess(puzzle_id, random.choice(WRONG_GUESSES)))
+            continue
+        if roll < 0.85:
+            answer = answers.get(puzzle_id, 'apple')
+            correct, _ = act('guess', lambda: guess(puzzle_id, answer))
+            if not correct:
+                continue
+            state = act('solve', lambda: game_logic.solve_puzzle(state, answer))
+        else:
+            state, _ = act('skip', lambda: game_logic.skip_puzzle(state))
+
+        time.sleep(random.expovariate(1.0 / think_seconds) if think_seconds > 0 else 0)
+        if random.random() < 0.7:
+            with stats.lock:
+                stats.ratings_submitted += 1
+            state = act('rate', lambda: game_logic.submit_rating(
+                state, random.choice(("easy", "medium", "hard")), random.choice(("no_issues", "bad_images", "bad_puzzle"))
+            ))
+        elif state['show_rating_ui']:
+            state = act('skip_rating', lambda: game_logic.skip_rating(state))
+
+def persisted_ratings(client: InMemoryS3) -> int:
+    """
+    Flush any buffered or locally stored ratings and count those in the stand-in.
+
+    Args:
+        client (InMemoryS3): The stand-in
+
+    Returns:
+        int: Sum of total_ratings over every aggregate object
+    """
+    if s3_utils.RATINGS_STORE == 'buffered':
+        rating_buffer.flush(s3_utils.update_puzzle_ratings)
+    elif s3_utils.RATINGS_STORE == 'sqlite':
+        ratings_store.export_changed_ratings(s3_utils.update_puzzle_ratings)
+
+    total = 0
+    for key in client.keys(s3_utils.WEBAPP_BUCKET, 'ratings/'):
+        ratings = client.read(s3_utils.WEBAPP_BUCKET, key)
+        total += (ratings or {}).get('total_ratings', 0)
+    return total
+
+def print_report(stats: LoadStats, client: InMemoryS3, elapsed: float, persisted: int):
+    total_actions = sum(stats.actions.values())
+    print(f"\nDuration: {elapsed:.1f}s, actions: {total_actions}, throughput: {total_actions / elapsed:.1f} actions/s")
+
+    snapshot = metrics.snapshot()
+    # Percentiles cover each action's most recent metrics.LATENCY_WINDOW samples
+    print("\nLatency (ms)        count      p50      p90      p99")
+    for action in sorted(stats.actions):
+        timing = snapshot['latencies'].get(f'load.{action}')
+        if timing:
+            print(f"  {action:<16}{stats.actions[action]:>7}" +
+                  "".join(f"{timing[f'p{q}'] * 1000:>9.1f}" for q in metrics.LATENCY_PERCENTILES))
+
+    requests = sum(client.requests.values())
+    print(f"\nS3 requests: {requests} ({requests / elapsed:.1f}/s, {requests / max(total_actions, 1):.2f} per action)")
+    for operation, count in sorted(client.requests.items()):
+        print(f"  {operation:<16}{count:>7}")
+
+    lost = stats.ratings_submitted - persisted
+    print(f"\nRatings submitted: {stats.ratings_submitted}, persisted: {persisted}, lost: {lost}")
+
+    counters = {name: value for name, value in snapshot['counters'].items() if not name.startswith('load.')}
+    if counters:
+        print("\nCounters:")
+        for name, value in sorted(counters.items()):
+            print(f"  {name:<40}{value:>7}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate concurrent players against an in-memory S3 stand-in.")
+    parser.add_argument('--players', type=int, default=200, help="Concurrent simulated players")
+    parser.add_argument('--duration', type=float, default=30, help="Seconds to run")
+    parser.add_argument('--think', type=float, default=1.0, help="Mean think time between actions, in seconds")
+    parser.add_argument('--puzzles', type=int, default=500, help="Puzzles in the stand-in bucket")
+    parser.add_argument('--latency-ms', type=float, default=20, help="Mean S3 request latency")
+    parser.add_argument('--tail-ms', type=float, default=500, help="Mean latency of slow S3 requests")
+    parser.add_argument('--tail-rate', type=float, default=0.01, help="Fraction of slow S3 requests")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of S3 requests that fail")
+    parser.add_argument('--ratings-store', choices=('s3', 'buffered', 'sqlite'), default=s3_utils.RATINGS_STORE)
+    parser.add_argument('--seed', type=int, default=None, help="Random seed")
+    parser.add_argument('--verbose', action='store_true', help="Show the app's own output")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    os.chdir(_workdir)  # Local fallback files land here
+    s3_utils.RATINGS_STORE = args.ratings_store
+    stand_in = install_stand_in(
+        args.puzzles, latency_ms=args.latency_ms, tail_ms=args.tail_ms,
+        tail_rate=args.tail_rate, error_rate=args.error_rate
+    )
+    stats = LoadStats()
+
+    print(f"Running {args.players} players for {args.duration:.0f}s (ratings store: {args.ratings_store}, work dir: {_workdir})")
+    output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(open(os.devnull, 'w'))
+    start = time.monotonic()
+    with output:
+        with ThreadPoolExecutor(max_workers=args.players, thread_name_prefix="player") as pool:
+            players = [
+                pool.submit(run_player, stand_in['answers'], stats, start + args.duration, args.think)
+                for _ in range(args.players)
+            ]
+        elapsed = time.monotonic() - start
+        # Stop counting stand-in errors once the players are done
+        stand_in['client'].error_rate = 0.0
+        persisted = persisted_ratings(stand_in['client'])
+
+    print_report(stats, stand_in['client'], elapsed, persisted)
+    failed = [player.exception() for player in players if player.exception() is not None]
+    if failed:
+        print(f"\n{len(failed)} players stopped with an error, e.g. {type(failed[0]).__name__}: {failed[0]}")
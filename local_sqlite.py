@@ -0,0 +1,42 @@
+import os
+import sqlite3
+import threading
+from typing import Callable, Dict
+
+# Per-thread connections to the host-local SQLite files (the shared cache and
+# the ratings store). SQLite connections cannot be shared across threads, so
+# each thread opens its own, in autocommit and WAL mode so many processes can
+# read while one writes.
+
+_local = threading.local()
+
+def _create_file(path: str):
+    # Create the directory and file owner-only; SQLite gives its WAL and
+    # shared-memory files the same permissions as the database
+    directory = os.path.dirname(os.path.abspath(path))
+    if not os.path.isdir(directory):
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+    os.close(os.open(path, os.O_CREAT | os.O_RDWR, 0o600))
+
+def thread_connection(path: str, setup: Callable[[sqlite3.Connection], None]) -> sqlite3.Connection:
+    """
+    Get this thread's connection to a SQLite file, opening it on first use.
+
+    Args:
+        path (str): The database file; created owner-only if missing
+        setup (Callable): Creates or migrates the schema on a new connection
+
+    Returns:
+        sqlite3.Connection: The connection, in autocommit mode
+    """
+    connections: Dict[str, sqlite3.Connection] = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+    connection = connections.get(path)
+    if connection is None:
+        _create_file(path)
+        connection = sqlite3.connect(path, timeout=5, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        setup(connection)
+        connections[path] = connection
+    return connection
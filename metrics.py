@@ -0,0 +1,109 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator
+import background
+
+# In-process counters and latency samples, shared by every thread of the
+# app process. Latencies keep only the most recent samples per name so memory
+# stays bounded however long the process runs. The app prints a snapshot to
+# its log every METRICS_LOG_SECONDS (0 turns this off).
+LATENCY_WINDOW = 1024
+LATENCY_PERCENTILES = (50, 90, 99)
+METRICS_LOG_SECONDS = float(os.getenv('METRICS_LOG_SECONDS', '300'))
+
+_lock = threading.Lock()
+_counters: Dict[str, int] = {}
+_latencies: Dict[str, deque] = {}
+
+def _percentile(sorted_samples, q: float) -> float:
+    return sorted_samples[min(len(sorted_samples) - 1, int(len(sorted_samples) * q / 100.0))]
+
+def increment(name: str, amount: int = 1):
+    """
+    Add to a counter.
+
+    Args:
+        name (str): The counter name, e.g. 'ratings.cas_conflicts'
+        amount (int): How much to add
+    """
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+def observe(name: str, seconds: float):
+    """
+    Record one latency sample.
+
+    Args:
+        name (str): The timer name, e.g. 'ratings.cas_update'
+        seconds (float): The measured duration
+    """
+    with _lock:
+        samples = _latencies.get(name)
+        if samples is None:
+            samples = _latencies[name] = deque(maxlen=LATENCY_WINDOW)
+        samples.append(seconds)
+
+@contextmanager
+def timed(name: str) -> Iterator[None]:
+    """
+    Record the duration of a block as a latency sample, whether or not it raises.
+
+    Args:
+        name (str): The timer name
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start)
+
+def percentile(name: str, q: float) -> float:
+    """
+    Get a percentile of the recent latency samples for a timer.
+
+    Args:
+        name (str): The timer name
+        q (float): The percentile, 0-100
+
+    Returns:
+        float: The latency in seconds, or 0.0 if there are no samples
+    """
+    with _lock:
+        samples = sorted(_latencies.get(name, ()))
+    return _percentile(samples, q) if samples else 0.0
+
+def snapshot() -> Dict[str, Any]:
+    """
+    Get all counters and latency percentiles.
+
+    Returns:
+        Dict[str, Any]: {"counters": {...}, "latencies": {name: {"count": n, "p50": s, ...}}}
+    """
+    with _lock:
+        counters = dict(_counters)
+        latencies = {name: sorted(samples) for name, samples in _latencies.items()}
+
+    summary = {}
+    for name, samples in latencies.items():
+        if not samples:
+            continue
+        summary[name] = {"count": len(samples)}
+        for q in LATENCY_PERCENTILES:
+            summary[name][f"p{q}"] = _percentile(samples, q)
+    return {"counters": counters, "latencies": summary}
+
+def log_snapshot():
+    """Print all counters and latency percentiles as one JSON line."""
+    print(f"Metrics: {json.dumps(snapshot(), sort_keys=True, separators=(',', ':'))}")
+
+def start_report_thread():
+    """
+    Print the metrics every METRICS_LOG_SECONDS in a daemon thread, once per
+    process, and once more when the process exits. Safe to call on every rerun.
+    """
+    if METRICS_LOG_SECONDS > 0:
+        background.start_periodic('metrics-report', METRICS_LOG_SECONDS, log_snapshot)
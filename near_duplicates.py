@@ -0,0 +1,217 @@
+import argparse
+import datetime
+import re
+import zlib
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Set, Tuple
+import numpy as np
+import json_codec
+import s3_utils
+
+# Finds puzzles whose descriptions are near-duplicates of each other. Each
+# puzzle's four descriptions are reduced to a set of character shingles and a
+# MinHash signature; LSH banding over the signatures yields candidate pairs
+# without comparing every pair, and candidates are confirmed by their exact
+# shingle Jaccard similarity.
+SHINGLE_SIZE = 5
+NUM_PERMUTATIONS = 128
+BANDS = 32  # 4 rows per band: pairs above ~0.42 similarity are likely candidates
+SIMILARITY_THRESHOLD = 0.6
+FETCH_WORKERS = 16
+
+REPORT_KEY = 'analytics/near_duplicates.json'
+
+_MERSENNE_PRIME = (1 << 31) - 1
+
+def shingles(descriptions: Dict[str, str]) -> Set[int]:
+    """
+    Hash a puzzle's descriptions into a set of character shingles. Case,
+    punctuation and spacing are ignored, and shingles never span two
+    descriptions.
+
+    Args:
+        descriptions (Dict[str, str]): The puzzle's descriptions
+
+    Returns:
+        Set[int]: The shingle hashes
+    """
+    result = set()
+    for text in descriptions.values():
+        text = ' '.join(re.findall(r'\w+', text.lower()))
+        for i in range(max(len(text) - SHINGLE_SIZE + 1, 1)):
+            result.add(zlib.crc32(text[i:i + SHINGLE_SIZE].encode('utf-8')))
+    return result
+
+class MinHasher:
+    """
+    MinHash signatures from NUM_PERMUTATIONS random universal hash functions
+    h(x) = (a * x + b) mod p.
+    """
+
+    def __init__(self, num_permutations: int = NUM_PERMUTATIONS, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, _MERSENNE_PRIME, num_permutations, dtype=np.uint64)
+        self.b = rng.integers(0, _MERSENNE_PRIME, num_permutations, dtype=np.uint64)
+
+    def signature(self, shingle_set: Set[int]) -> np.ndarray:
+        """
+        Compute the signature of a shingle set.
+
+        Args:
+            shingle_set (Set[int]): The shingle hashes
+
+        Returns:
+            np.ndarray: The signature, one uint32 per permutation
+        """
+        if not shingle_set:
+            return np.full(len(self.a), _MERSENNE_PRIME, dtype=np.uint32)
+        values = np.fromiter(shingle_set, dtype=np.uint64, count=len(shingle_set)) % _MERSENNE_PRIME
+        # Both factors are below 2**31, so the products fit in 64 bits
+        hashed = (np.outer(values, self.a) + self.b) % _MERSENNE_PRIME
+        return hashed.min(axis=0).astype(np.uint32)
+
+def candidate_pairs(signatures: np.ndarray, bands: int = BANDS) -> Set[Tuple[int, int]]:
+    """
+    Find pairs of rows that agree on every value of at least one band.
+
+    Args:
+        signatures (np.ndarray): One MinHash signature per row
+        bands (int): Number of bands; must divide the signature length
+
+    Returns:
+        Set[Tuple[int, int]]: Candidate pairs of row indices, lower index first
+    """
+    rows = signatures.shape[1] // bands
+    pairs = set()
+    for band in range(bands):
+        buckets = defaultdict(list)
+        block = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows])
+        for index, row in enumerate(block):
+            buckets[row.tobytes()].append(index)
+        for members in buckets.values():
+            for i in range(len(members)):
+                for j in range(i + 1, len(members)):
+                    pairs.add((members[i], members[j]))
+    return pairs
+
+def find_near_duplicates(descriptions_by_id: Dict[str, Dict[str, str]],
+                         threshold: float = SIMILARITY_THRESHOLD) -> List[Tuple[str, str, float]]:
+    """
+    Find pairs of puzzles whose descriptions are at least threshold similar.
+
+    Args:
+        descriptions_by_id (Dict[str, Dict[str, str]]): Descriptions per puzzle ID
+        threshold (float): Minimum Jaccard similarity of the shingle sets
+
+    Returns:
+        List[Tuple[str, str, float]]: (puzzle_id, puzzle_id, similarity), most similar first
+    """
+    puzzle_ids = sorted(descriptions_by_id)
+    if len(puzzle_ids) < 2:
+        return []
+    shingle_sets = [shingles(descriptions_by_id[puzzle_id]) for puzzle_id in puzzle_ids]
+    hasher = MinHasher()
+    signatures = np.array([hasher.signature(s) for s in shingle_sets], dtype=np.uint32)
+
+    pairs = candidate_pairs(signatures)
+    print(f"{len(pairs)} candidate pairs among {len(puzzle_ids)} puzzles")
+
+    matches = []
+    for i, j in pairs:
+        union = len(shingle_sets[i] | shingle_sets[j])
+        similarity = len(shingle_sets[i] & shingle_sets[j]) / union if union else 1.0
+        if similarity >= threshold:
+            matches.append((puzzle_ids[i], puzzle_ids[j], round(similarity, 3)))
+    return sorted(matches, key=lambda match: match[2], reverse=True)
+
+def group_by_target_word(matches: List[Tuple[str, str, float]],
+                         target_words: Dict[str, str]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Merge matching pairs into clusters of near-duplicate puzzles, grouped by
+    target word. A cluster whose puzzles have different answers is grouped
+    under all of them, joined with ' / '.
+
+    Args:
+        matches (List[Tuple[str, str, float]]): Pairs from find_near_duplicates
+        target_words (Dict[str, str]): Target word per puzzle ID
+
+    Returns:
+        Dict[str, List[Dict[str, Any]]]: Clusters per target word
+    """
+    parent: Dict[str, str] = {}
+    def find(puzzle_id: str) -> str:
+        while parent.setdefault(puzzle_id, puzzle_id) != puzzle_id:
+            parent[puzzle_id] = parent[parent[puzzle_id]]
+            puzzle_id = parent[puzzle_id]
+        return puzzle_id
+
+    for a, b, _ in matches:
+        parent[find(a)] = find(b)
+
+    clusters = defaultdict(lambda: {"puzzle_ids": [], "pairs": []})
+    for a, b, similarity in matches:
+        clusters[find(a)]["pairs"].append({"a": a, "b": b, "similarity": similarity})
+    for puzzle_id in parent:
+        clusters[find(puzzle_id)]["puzzle_ids"].append(puzzle_id)
+
+    groups = defaultdict(list)
+    for cluster in clusters.values():
+        cluster["puzzle_ids"].sort()
+        words = sorted(set(target_words.get(puzzle_id, '') for puzzle_id in cluster["puzzle_ids"]))
+        groups[' / '.join(words)].append(cluster)
+    return dict(sorted(groups.items()))
+
+def load_catalog(workers: int = FETCH_WORKERS) -> Tuple[Dict[str, Dict[str, str]], Dict[str, str]]:
+    """
+    Fetch every puzzle's descriptions and target word from the puzzle bucket.
+
+    Args:
+        workers (int): Concurrent fetches
+
+    Returns:
+        Tuple[Dict[str, Dict[str, str]], Dict[str, str]]: Descriptions and target word per puzzle ID
+    """
+    def fetch(puzzle_id: str) -> Optional[Tuple[Dict[str, str], str]]:
+        try:
+            puzzle = s3_utils.read_json_object(s3_utils.puzzle_breaker, s3_utils.PUZZLE_BUCKET, f'puzzles/{puzzle_id}.json')
+            return puzzle.get('descriptions', {}), s3_utils.get_solution(puzzle_id)
+        except Exception as e:
+            print(f"Error loading puzzle {puzzle_id}: {type(e).__name__}: {str(e)}")
+            return None
+
+    descriptions_by_id, target_words = {}, {}
+    puzzle_ids = s3_utils.get_puzzle_ids()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="near-dup") as pool:
+        for puzzle_id, result in zip(puzzle_ids, pool.map(fetch, puzzle_ids)):
+            if result is not None:
+                descriptions_by_id[puzzle_id], target_words[puzzle_id] = result
+    return descriptions_by_id, target_words
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find near-duplicate puzzles by their descriptions.")
+    parser.add_argument('--threshold', type=float, default=SIMILARITY_THRESHOLD,
+                        help="Minimum description similarity (Jaccard, 0-1) to report")
+    parser.add_argument('--workers', type=int, default=FETCH_WORKERS, help="Concurrent puzzle fetches")
+    parser.add_argument('--dry-run', action='store_true', help=f"Print the report instead of writing {REPORT_KEY}")
+    args = parser.parse_args()
+
+    descriptions_by_id, target_words = load_catalog(args.workers)
+    matches = find_near_duplicates(descriptions_by_id, args.threshold)
+    groups = group_by_target_word(matches, target_words)
+    report = {
+        "generated_at": datetime.datetime.utcnow().isoformat(),
+        "puzzles": len(descriptions_by_id),
+        "threshold": args.threshold,
+        "groups": groups
+    }
+
+    for word, clusters in groups.items():
+        for cluster in clusters:
+            print(f"{word}: {', '.join(cluster['puzzle_ids'])}")
+    if args.dry_run:
+        print(json_codec.dumps(report))
+    else:
+        body, headers = json_codec.encode(report)
+        s3_utils.s3_client.put_object(Bucket=s3_utils.WEBAPP_BUCKET, Key=REPORT_KEY, Body=body, **headers)
+        print(f"Wrote {sum(len(c) for c in groups.values())} near-duplicate clusters to {REPORT_KEY}")
@@ -0,0 +1,147 @@
+import datetime
+import os
+import re
+import secrets
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Iterable, List, Optional
+import background
+import json_codec
+import s3_utils
+import shared_cache
+
+# Persistent player progress. Profiles are written through to the host's
+# shared cache at once, so a session resumes instantly after a restart or
+# deploy, and flushed to profiles/{key}.json in the webapp bucket in batches
+# every PROFILE_FLUSH_SECONDS (and at shutdown) rather than on every action.
+# A profile is only reachable through its key, a random token, so one player
+# cannot read or overwrite another's progress by guessing it.
+PROFILE_FLUSH_SECONDS = float(os.getenv('PROFILE_FLUSH_SECONDS', '30'))
+PROFILE_CACHE_TTL = float(os.getenv('PROFILE_CACHE_TTL', str(7 * 86400)))
+PROFILE_PREFIX = 'profiles/'
+
+# Profiles whose last saved copy is remembered per process, to skip
+# unchanged saves; the least recently saved are forgotten first
+MAX_TRACKED_PROFILES = 10000
+
+_KEY_PATTERN = re.compile(r'^[A-Za-z0-9_-]{22,64}$')
+
+_lock = threading.Lock()
+_dirty: Dict[str, Dict[str, Any]] = {}
+_last_saved: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+
+def new_profile_key() -> str:
+    """
+    Create the key a new profile is stored under.
+
+    Returns:
+        str: An unguessable token, safe to use in an S3 key and a URL
+    """
+    return secrets.token_urlsafe(24)
+
+def is_profile_key(key: Optional[str]) -> bool:
+    """Check that a key, e.g. from a URL, has the form new_profile_key gives."""
+    return bool(key) and _KEY_PATTERN.match(key) is not None
+
+def encode_seen(seen: Iterable[str]) -> List[str]:
+    """Encode the set of seen puzzle IDs for storage."""
+    return sorted(seen)
+
+def decode_seen(encoded: Any) -> set:
+    """
+    Decode the stored seen puzzle IDs. Profiles from before IDs were stored
+    held catalog positions, which differ between workers, so those are
+    dropped.
+    """
+    return set(encoded) if isinstance(encoded, list) else set()
+
+def load_profile(key: str) -> Optional[Dict[str, Any]]:
+    """
+    Load a profile, preferring this worker's unflushed copy, then the host's
+    shared cache, then the webapp bucket.
+
+    Args:
+        key (str): The profile key
+
+    Returns:
+        Dict[str, Any]: The profile, or None if there is none or the key is
+            not a profile key
+    """
+    if not is_profile_key(key):
+        return None
+    with _lock:
+        if key in _dirty:
+            return dict(_dirty[key])
+
+    def fetch():
+        try:
+            return s3_utils.read_json_object(s3_utils.profile_breaker, s3_utils.WEBAPP_BUCKET, f'{PROFILE_PREFIX}{key}.json')
+        except Exception as e:
+            if not s3_utils.is_s3_outage(e):
+                return None  # No saved profile
+            print(f"Error loading profile {key}: {type(e).__name__}: {str(e)}")
+            return None
+
+    return shared_cache.read_through('profiles', key, fetch, PROFILE_CACHE_TTL)
+
+def save_profile(key: str, profile: Dict[str, Any]):
+    """
+    Queue a profile for the next batched flush. Unchanged profiles are ignored,
+    so this is cheap to call on every rerun.
+
+    Args:
+        key (str): The profile key
+        profile (Dict[str, Any]): The profile, without 'updated_at'
+    """
+    with _lock:
+        if _last_saved.get(key) == profile:
+            _last_saved.move_to_end(key)
+            return
+        _last_saved[key] = profile
+        _last_saved.move_to_end(key)
+        if len(_last_saved) > MAX_TRACKED_PROFILES:
+            _last_saved.popitem(last=False)
+        _dirty[key] = dict(profile, updated_at=datetime.datetime.utcnow().isoformat())
+        stored = _dirty[key]
+
+    shared_cache.put('profiles', key, stored, PROFILE_CACHE_TTL)
+    start_flush_thread()
+
+def flush_profiles() -> int:
+    """
+    Write every queued profile to the webapp bucket. Profiles that fail to
+    write stay queued unless a newer version has been queued meanwhile.
+
+    Returns:
+        int: Number of profiles written
+    """
+    with _lock:
+        batch = dict(_dirty)
+        _dirty.clear()
+
+    written = 0
+    for key, profile in batch.items():
+        try:
+            body, headers = json_codec.encode(profile)
+            s3_utils.profile_breaker.call(lambda: s3_utils.s3_client.put_object(
+                Bucket=s3_utils.WEBAPP_BUCKET,
+                Key=f'{PROFILE_PREFIX}{key}.json',
+                Body=body,
+                **headers
+            ))
+            written += 1
+        except Exception as e:
+            print(f"Error saving profile {key}: {type(e).__name__}: {str(e)}")
+            with _lock:
+                _dirty.setdefault(key, profile)
+
+    if written:
+        print(f"Saved {written} player profiles")
+    return written
+
+def start_flush_thread():
+    """
+    Start the periodic profile flush in a daemon thread, once per process.
+    Queued profiles are also flushed when the process exits.
+    """
+    background.start_periodic('profile-flush', PROFILE_FLUSH_SECONDS, flush_profiles)
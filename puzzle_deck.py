@@ -0,0 +1,99 @@
+import random
+from array import array
+from typing import Iterable, Optional
+
+class PuzzleDeck:
+    """
+    A per-session shuffled deck of puzzle catalog indices.
+
+    The deck is a seeded permutation stored as a compact array of ints. Draws
+    walk through the permutation in O(1) and the deck reshuffles once every
+    puzzle has been served, so a player never sees a repeat until the whole
+    catalog is exhausted. Growth of the catalog is folded in incrementally
+    without disturbing the puzzles already drawn.
+    """
+
+    def __init__(self, seed: Optional[int] = None, catalog_size: int = 0):
+        """
+        Create a deck covering the first catalog_size catalog entries.
+
+        Args:
+            seed (int, optional): Seed for the deck's random generator
+            catalog_size (int): Number of catalog entries to start with
+        """
+        self._rng = random.Random(seed)
+        self._order = array('I')
+        self._position = 0
+        self.extend(catalog_size)
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    @property
+    def remaining(self) -> int:
+        """Number of draws left before the deck reshuffles."""
+        return len(self._order) - self._position
+
+    def extend(self, catalog_size: int):
+        """
+        Add catalog indices up to catalog_size to the undrawn part of the deck.
+
+        Each new index is swapped into a uniformly random undrawn slot (one
+        inside-out Fisher-Yates step), so the cost is O(new puzzles) rather
+        than a full reshuffle.
+
+        Args:
+            catalog_size (int): The current number of catalog entries
+        """
+        for index in range(len(self._order), catalog_size):
+            self._order.append(index)
+            swap = self._rng.randrange(self._position, len(self._order))
+            self._order[-1], self._order[swap] = self._order[swap], self._order[-1]
+
+    def mark_drawn(self, indices: Iterable[int]):
+        """
+        Move catalog indices into the drawn part of the deck, e.g. puzzles a
+        resumed player has already seen, so they are not served again before
+        the deck reshuffles.
+
+        Args:
+            indices (Iterable[int]): Catalog indices to treat as already drawn
+        """
+        slots = {index: slot for slot, index in enumerate(self._order) if slot >= self._position}
+        for index in indices:
+            slot = slots.pop(index, None)
+            if slot is None:
+                continue
+            # Swap into the first undrawn slot, then advance past it
+            moved = self._order[self._position]
+            self._order[self._position], self._order[slot] = index, moved
+            if moved != index:
+                slots[moved] = slot
+            self._position += 1
+
+    def draw(self) -> int:
+        """
+        Draw the next catalog index, reshuffling when the deck is exhausted.
+
+        Returns:
+            int: A catalog index
+        """
+        if not self._order:
+            raise IndexError("draw from an empty PuzzleDeck")
+
+        if self._position >= len(self._order):
+            self._reshuffle()
+
+        index = self._order[self._position]
+        self._position += 1
+        return index
+
+    def _reshuffle(self):
+        last_drawn = self._order[-1] if self._order else None
+        self._rng.shuffle(self._order)
+        self._position = 0
+
+        # Avoid serving the same puzzle twice in a row across the reshuffle
+        if len(self._order) > 1 and self._order[0] == last_drawn:
+            swap = self._rng.randrange(1, len(self._order))
+            self._order[0], self._order[swap] = self._order[swap], self._order[0]
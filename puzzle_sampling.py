@@ -0,0 +1,207 @@
+import random
+import threading
+from array import array
+from typing import Dict, Any, List, Optional
+from rating_aggregates import DIFFICULTY_KEYS
+
+# Share of served puzzles we aim for at each difficulty level
+DEFAULT_DIFFICULTY_MIX = {"easy": 0.3, "medium": 0.5, "hard": 0.2}
+
+# A puzzle is considered broken once it has at least this many issue reports
+# and this share of them are bad_images or bad_puzzle
+BROKEN_MIN_REPORTS = 5
+BROKEN_ISSUE_RATIO = 0.5
+
+class AliasTable:
+    """
+    Walker/Vose alias table for O(1) sampling from a fixed discrete distribution.
+    """
+
+    def __init__(self, weights: List[float]):
+        """
+        Build the table in O(n).
+
+        Args:
+            weights (List[float]): Non-negative weight per outcome
+        """
+        n = len(weights)
+        total = float(sum(weights))
+        self._prob = array('d', [1.0] * n)
+        self._alias = array('I', range(n))
+        self._size = n if total > 0 else 0
+
+        if not self._size:
+            return
+
+        scaled = [w * n / total for w in weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+
+        while small and large:
+            lesser = small.pop()
+            greater = large.pop()
+            self._prob[lesser] = scaled[lesser]
+            self._alias[lesser] = greater
+            scaled[greater] = (scaled[greater] + scaled[lesser]) - 1.0
+            if scaled[greater] < 1.0:
+                small.append(greater)
+            else:
+                large.append(greater)
+
+        # Whatever is left over is 1.0 up to floating point error
+        for i in small + large:
+            self._prob[i] = 1.0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def draw(self, rng: random.Random = random) -> int:
+        """
+        Draw an outcome index.
+
+        Args:
+            rng (random.Random): Random generator to use
+
+        Returns:
+            int: The sampled index
+        """
+        if not self._size:
+            raise IndexError("draw from an empty AliasTable")
+        column = rng.randrange(self._size)
+        return column if rng.random() < self._prob[column] else self._alias[column]
+
+def is_broken(ratings: Optional[Dict[str, Any]]) -> bool:
+    """
+    Check whether a puzzle's aggregates mark it as known-broken.
+
+    Args:
+        ratings (Dict[str, Any]): The puzzle's aggregate ratings, if any
+
+    Returns:
+        bool: True if the puzzle should not be served
+    """
+    if not ratings:
+        return False
+    issues = ratings.get('fun', {})  # The 'fun' field holds issue counts
+    bad = issues.get('bad_images', 0) + issues.get('bad_puzzle', 0)
+    reports = bad + issues.get('no_issues', 0)
+    return reports >= BROKEN_MIN_REPORTS and bad / reports >= BROKEN_ISSUE_RATIO
+
+def _quality(ratings: Optional[Dict[str, Any]]) -> float:
+    # Laplace-smoothed share of "no_issues" reports, 0.5 for unrated puzzles
+    if not ratings:
+        return 0.5
+    issues = ratings.get('fun', {})
+    clean = issues.get('no_issues', 0)
+    reports = clean + issues.get('bad_images', 0) + issues.get('bad_puzzle', 0)
+    return (clean + 1) / (reports + 2)
+
+def _difficulty_shares(ratings: Optional[Dict[str, Any]]) -> List[float]:
+    # Smoothed share of votes per difficulty level, uniform for unrated puzzles
+    counts = (ratings or {}).get('difficulty', {})
+    votes = [counts.get(level, 0) + 1 for level in DIFFICULTY_KEYS]
+    total = sum(votes)
+    return [v / total for v in votes]
+
+def compute_puzzle_weights(ratings_by_index: List[Optional[Dict[str, Any]]],
+                           difficulty_mix: Optional[Dict[str, float]] = None,
+                           excluded: Optional[List[bool]] = None) -> List[float]:
+    """
+    Turn aggregate ratings into sampling weights.
+
+    Broken and excluded puzzles get zero weight and the rest are weighted by
+    their share of clean reports. Weights are then normalised per difficulty
+    level so that the expected share of served puzzles at each level matches
+    difficulty_mix. If that leaves no weight at all (e.g. the mix only asks
+    for levels no puzzle has), the servable puzzles are weighted equally.
+
+    Args:
+        ratings_by_index (List[Optional[Dict[str, Any]]]): Aggregates per catalog index
+        difficulty_mix (Dict[str, float], optional): Target share per difficulty level
+        excluded (List[bool], optional): Per catalog index, whether the puzzle must not be served
+
+    Returns:
+        List[float]: One weight per catalog index, all zero if no puzzle is servable
+    """
+    mix = difficulty_mix or DEFAULT_DIFFICULTY_MIX
+    servable = [
+        not is_broken(r) and not (excluded and excluded[i])
+        for i, r in enumerate(ratings_by_index)
+    ]
+    quality = [_quality(r) if ok else 0.0 for r, ok in zip(ratings_by_index, servable)]
+    shares = [_difficulty_shares(r) for r in ratings_by_index]
+
+    # Total quality mass currently sitting at each difficulty level
+    mass = [sum(q * s[d] for q, s in zip(quality, shares)) for d in range(len(DIFFICULTY_KEYS))]
+
+    weights = []
+    for q, s in zip(quality, shares):
+        weight = 0.0
+        for d, level in enumerate(DIFFICULTY_KEYS):
+            if mass[d] > 0:
+                weight += mix.get(level, 0.0) * s[d] / mass[d]
+        weights.append(q * weight)
+
+    if not sum(weights):
+        return [1.0 if ok else 0.0 for ok in servable]
+    return weights
+
+class WeightedPuzzleSampler:
+    """
+    Rating-weighted puzzle sampler backed by an alias table.
+
+    The table is only rebuilt when the catalog size, the aggregates version or
+    the excluded puzzles change, so draws never rescan ratings.
+    """
+
+    def __init__(self, difficulty_mix: Optional[Dict[str, float]] = None, seed: Optional[int] = None):
+        self.difficulty_mix = difficulty_mix or DEFAULT_DIFFICULTY_MIX
+        self._rng = random.Random(seed)
+        self._table = AliasTable([])
+        self._catalog_size = 0
+        self._version = None
+        self._excluded: frozenset = frozenset()
+        self._lock = threading.Lock()
+
+    def refresh(self, catalog: List[str], ratings_by_id: Dict[str, Dict[str, Any]], version: int,
+                excluded: frozenset = frozenset()) -> bool:
+        """
+        Rebuild the alias table if the catalog, the aggregates or the excluded
+        puzzles have changed.
+
+        Args:
+            catalog (List[str]): Puzzle IDs indexed by catalog position
+            ratings_by_id (Dict[str, Dict[str, Any]]): Aggregate ratings keyed by puzzle ID
+            version (int): Version of ratings_by_id; a new value triggers a rebuild
+            excluded (frozenset): Puzzle IDs that must not be drawn
+
+        Returns:
+            bool: True if the table was rebuilt
+        """
+        with self._lock:
+            if len(catalog) == self._catalog_size and version == self._version and excluded == self._excluded:
+                return False
+
+            weights = compute_puzzle_weights(
+                [ratings_by_id.get(puzzle_id) for puzzle_id in catalog],
+                self.difficulty_mix,
+                [puzzle_id in excluded for puzzle_id in catalog]
+            )
+            self._table = AliasTable(weights)
+            self._catalog_size = len(catalog)
+            self._version = version
+            self._excluded = excluded
+            print(f"Rebuilt weighted sampler over {len(catalog)} puzzles")
+            return True
+
+    def draw(self) -> Optional[int]:
+        """
+        Draw a catalog index, or None if no puzzle is servable.
+
+        Returns:
+            Optional[int]: A catalog index
+        """
+        table = self._table
+        if not len(table):
+            return None
+        return table.draw(self._rng)
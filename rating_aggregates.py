@@ -0,0 +1,48 @@
+import datetime
+from typing import Dict, Any, Mapping, Optional
+
+# The aggregate ratings schema shared by ratings/{puzzle_id}.json, the local
+# ratings store, the rating buffer and the ratings snapshot:
+#   {"puzzle_id": str, "target_word": str,
+#    "difficulty": {DIFFICULTY_KEYS: int}, "fun": {ISSUE_KEYS: int},
+#    "total_ratings": int, "last_updated": ISO time}
+# Issue counts are stored under 'fun' for compatibility with older objects.
+DIFFICULTY_KEYS = ("easy", "medium", "hard")
+ISSUE_KEYS = ("bad_images", "bad_puzzle", "no_issues")
+
+def apply_counts(current_ratings: Optional[Dict[str, Any]], puzzle_id: str, target_word: str,
+                 difficulty: Mapping[str, int], issues: Mapping[str, int], total: int,
+                 last_updated: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Build the aggregates that result from adding counts to a puzzle's current
+    aggregates.
+
+    Args:
+        current_ratings (Dict[str, Any]): The current aggregates, or None to start from zero
+        puzzle_id (str): The puzzle ID
+        target_word (str): The solution word, used if the aggregates have none yet
+        difficulty (Mapping[str, int]): Counts to add per difficulty rating
+        issues (Mapping[str, int]): Counts to add per issue rating
+        total (int): Number of ratings to add
+        last_updated (str, optional): ISO time of the update; defaults to now
+
+    Returns:
+        Dict[str, Any]: The new aggregates
+    """
+    current_ratings = current_ratings or {}
+    difficulty_stats = dict(current_ratings.get('difficulty') or dict.fromkeys(DIFFICULTY_KEYS, 0))
+    issue_stats = dict(current_ratings.get('fun') or dict.fromkeys(ISSUE_KEYS, 0))
+
+    for key, count in difficulty.items():
+        difficulty_stats[key] = difficulty_stats.get(key, 0) + count
+    for key, count in issues.items():
+        issue_stats[key] = issue_stats.get(key, 0) + count
+
+    return {
+        "puzzle_id": puzzle_id,
+        "target_word": current_ratings.get('target_word') or target_word,
+        "difficulty": difficulty_stats,
+        "fun": issue_stats,
+        "total_ratings": current_ratings.get('total_ratings', 0) + total,
+        "last_updated": last_updated or datetime.datetime.utcnow().isoformat()
+    }
@@ -0,0 +1,131 @@
+import os
+import threading
+from typing import Dict, Any, Callable, Optional
+import background
+from rating_aggregates import DIFFICULTY_KEYS, ISSUE_KEYS, apply_counts
+
+# Per-worker accumulation of rating counts. Ratings only touch memory; every
+# RATING_FLUSH_SECONDS (and at shutdown) each dirty puzzle's deltas are merged
+# into ratings/{puzzle_id}.json with one conditional write, so a hot puzzle
+# costs one S3 write per flush interval per worker instead of one per rating.
+RATING_FLUSH_SECONDS = float(os.getenv('RATING_FLUSH_SECONDS', '10'))
+
+_lock = threading.Lock()
+_deltas: Dict[str, 'RatingDelta'] = {}
+
+class RatingDelta:
+    """Counts accumulated for one puzzle since its last flush."""
+
+    def __init__(self, target_word: str):
+        self.target_word = target_word
+        self.difficulty = dict.fromkeys(DIFFICULTY_KEYS, 0)
+        self.issues = dict.fromkeys(ISSUE_KEYS, 0)
+        self.total = 0
+
+    def add(self, difficulty_rating: str, issue_rating: str):
+        self.difficulty[difficulty_rating] += 1
+        self.issues[issue_rating] += 1
+        self.total += 1
+
+    def absorb(self, other: 'RatingDelta'):
+        for key, count in other.difficulty.items():
+            self.difficulty[key] += count
+        for key, count in other.issues.items():
+            self.issues[key] += count
+        self.total += other.total
+
+def merge_delta(current_ratings: Optional[Dict[str, Any]], puzzle_id: str, delta: RatingDelta) -> Dict[str, Any]:
+    """
+    Add accumulated counts to a puzzle's aggregates.
+
+    Args:
+        current_ratings (Dict[str, Any]): The current aggregates, or None if there are none yet
+        puzzle_id (str): The puzzle ID
+        delta (RatingDelta): The counts to add
+
+    Returns:
+        Dict[str, Any]: The merged aggregates, in the ratings/{puzzle_id}.json schema
+    """
+    return apply_counts(current_ratings, puzzle_id, delta.target_word, delta.difficulty, delta.issues, delta.total)
+
+def record_rating(puzzle_id: str, target_word: str, difficulty_rating: str, issue_rating: str):
+    """
+    Add one rating to this worker's pending deltas.
+
+    Args:
+        puzzle_id (str): The puzzle ID
+        target_word (str): The solution word
+        difficulty_rating (str): One of "easy", "medium", "hard"
+        issue_rating (str): One of "bad_images", "bad_puzzle", "no_issues"
+    """
+    if difficulty_rating not in DIFFICULTY_KEYS:
+        raise ValueError(f"Unknown difficulty rating: {difficulty_rating}")
+    if issue_rating not in ISSUE_KEYS:
+        raise ValueError(f"Unknown issue rating: {issue_rating}")
+
+    with _lock:
+        delta = _deltas.get(puzzle_id)
+        if delta is None:
+            delta = _deltas[puzzle_id] = RatingDelta(target_word)
+        delta.add(difficulty_rating, issue_rating)
+
+def pending_ratings(current_ratings: Optional[Dict[str, Any]], puzzle_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Overlay this worker's unflushed counts on a puzzle's aggregates, so players
+    see their own ratings before the next flush.
+
+    Args:
+        current_ratings (Dict[str, Any]): The aggregates as read from S3 or a cache
+        puzzle_id (str): The puzzle ID
+
+    Returns:
+        Dict[str, Any]: The aggregates including pending counts
+    """
+    with _lock:
+        delta = _deltas.get(puzzle_id)
+        if delta is None:
+            return current_ratings
+        return merge_delta(current_ratings, puzzle_id, delta)
+
+def flush(update_ratings: Callable[[str, Callable], Dict[str, Any]]) -> int:
+    """
+    Merge every pending delta into S3, one conditional write per dirty puzzle.
+    Deltas that fail to flush are kept for the next attempt.
+
+    Args:
+        update_ratings (Callable): s3_utils.update_puzzle_ratings
+
+    Returns:
+        int: Number of puzzles flushed
+    """
+    with _lock:
+        batch = dict(_deltas)
+        _deltas.clear()
+
+    flushed = 0
+    for puzzle_id, delta in batch.items():
+        try:
+            update_ratings(puzzle_id, lambda current, pid=puzzle_id, d=delta: merge_delta(current, pid, d))
+            flushed += 1
+        except Exception as e:
+            print(f"Error flushing ratings for puzzle {puzzle_id}: {type(e).__name__}: {str(e)}")
+            # Put the counts back, together with anything recorded meanwhile
+            with _lock:
+                newer = _deltas.get(puzzle_id)
+                _deltas[puzzle_id] = delta
+                if newer is not None:
+                    delta.absorb(newer)
+
+    if flushed:
+        print(f"Flushed buffered ratings for {flushed} puzzles")
+    return flushed
+
+def start_flush_thread(update_ratings: Callable[[str, Callable], Dict[str, Any]]):
+    """
+    Start the periodic flush in a daemon thread, once per process. Pending
+    deltas are also flushed when the process exits.
+
+    Args:
+        update_ratings (Callable): s3_utils.update_puzzle_ratings
+    """
+    background.start_periodic('ratings-flush', RATING_FLUSH_SECONDS, flush, update_ratings)
@@ -0,0 +1,185 @@
+import argparse
+import datetime
+from typing import Dict, Any, Iterable, List
+import numpy as np
+import s3_utils
+import json_codec
+import ratings_log_reader
+from rating_aggregates import DIFFICULTY_KEYS, ISSUE_KEYS
+
+DIFFICULTY_CODES = {key: code for code, key in enumerate(DIFFICULTY_KEYS)}
+ISSUE_CODES = {key: code for code, key in enumerate(ISSUE_KEYS)}
+SOLVE_TIME_PERCENTILES = (50, 90)
+
+SUMMARY_KEY = 'analytics/ratings_summary.json'
+
+class RatingsColumns:
+    """
+    Ratings log entries as columnar NumPy arrays, one row per entry.
+
+    Unknown difficulty or issue values are coded as -1, and missing solve
+    times as NaN.
+    """
+
+    def __init__(self, puzzle_ids: List[str], puzzle_index: np.ndarray, difficulty: np.ndarray,
+                 issue: np.ndarray, time_to_solve: np.ndarray, hints_used: np.ndarray,
+                 was_skipped: np.ndarray):
+        self.puzzle_ids = puzzle_ids
+        self.puzzle_index = puzzle_index
+        self.difficulty = difficulty
+        self.issue = issue
+        self.time_to_solve = time_to_solve
+        self.hints_used = hints_used
+        self.was_skipped = was_skipped
+
+    def __len__(self) -> int:
+        return len(self.puzzle_index)
+
+    @classmethod
+    def from_entries(cls, entries: Iterable[Dict[str, Any]]) -> 'RatingsColumns':
+        """
+        Build the columns from ratings log entries in a single pass.
+
+        Args:
+            entries (Iterable[Dict[str, Any]]): Entries as written by log_individual_rating
+
+        Returns:
+            RatingsColumns: The columnar data
+        """
+        positions: Dict[str, int] = {}
+        puzzle_index, difficulty, issue, times, hints, skipped = [], [], [], [], [], []
+
+        for entry in entries:
+            ratings = entry.get('ratings', {})
+            metadata = entry.get('metadata', {})
+            puzzle_index.append(positions.setdefault(entry.get('puzzle_id'), len(positions)))
+            difficulty.append(DIFFICULTY_CODES.get(ratings.get('difficulty'), -1))
+            issue.append(ISSUE_CODES.get(ratings.get('issue'), -1))
+            seconds = metadata.get('time_to_solve')
+            times.append(np.nan if seconds is None else seconds)
+            hints.append(bool(metadata.get('hints_used')))
+            skipped.append(bool(metadata.get('was_skipped')))
+
+        return cls(
+            puzzle_ids=list(positions),
+            puzzle_index=np.asarray(puzzle_index, dtype=np.int32),
+            difficulty=np.asarray(difficulty, dtype=np.int8),
+            issue=np.asarray(issue, dtype=np.int8),
+            time_to_solve=np.asarray(times, dtype=np.float64),
+            hints_used=np.asarray(hints, dtype=bool),
+            was_skipped=np.asarray(skipped, dtype=bool)
+        )
+
+def _grouped_percentiles(groups: np.ndarray, values: np.ndarray, n_groups: int,
+                         percentiles: Iterable[float]) -> Dict[float, np.ndarray]:
+    # Percentiles of values within each group, with linear interpolation, via
+    # one sort. Groups without values get NaN.
+    order = np.lexsort((values, groups))
+    sorted_values = values[order]
+    counts = np.bincount(groups, minlength=n_groups)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    has_values = counts > 0
+
+    result = {}
+    for q in percentiles:
+        position = starts + (np.maximum(counts, 1) - 1) * (q / 100.0)
+        lower = np.floor(position).astype(np.int64)
+        upper = np.ceil(position).astype(np.int64)
+        lower_values = sorted_values[np.minimum(lower, len(sorted_values) - 1)] if len(sorted_values) else np.zeros(n_groups)
+        upper_values = sorted_values[np.minimum(upper, len(sorted_values) - 1)] if len(sorted_values) else np.zeros(n_groups)
+        interpolated = lower_values + (upper_values - lower_values) * (position - lower)
+        result[q] = np.where(has_values, interpolated, np.nan)
+    return result
+
+def summarize(columns: RatingsColumns) -> Dict[str, Any]:
+    """
+    Compute per-puzzle statistics with vectorized group-bys.
+
+    For each puzzle: number of ratings, solve-time percentiles over solved
+    (not skipped) entries, skip rate, hint rate, issue ratios and the
+    difficulty vote distribution.
+
+    Args:
+        columns (RatingsColumns): The ratings log data
+
+    Returns:
+        Dict[str, Any]: Statistics keyed by puzzle ID
+    """
+    n = len(columns.puzzle_ids)
+    idx = columns.puzzle_index
+    counts = np.bincount(idx, minlength=n)
+    safe_counts = np.maximum(counts, 1)
+
+    skip_rate = np.bincount(idx, weights=columns.was_skipped, minlength=n) / safe_counts
+    hint_rate = np.bincount(idx, weights=columns.hints_used, minlength=n) / safe_counts
+
+    # Counts per (puzzle, code) as an n x k matrix
+    def code_counts(codes: np.ndarray, k: int) -> np.ndarray:
+        valid = codes >= 0
+        return np.bincount(idx[valid] * k + codes[valid], minlength=n * k).reshape(n, k)
+
+    issues = code_counts(columns.issue, len(ISSUE_CODES))
+    issue_ratio = issues / np.maximum(issues.sum(axis=1, keepdims=True), 1)
+    difficulty = code_counts(columns.difficulty, len(DIFFICULTY_CODES))
+
+    solved = ~columns.was_skipped & ~np.isnan(columns.time_to_solve)
+    solve_times = _grouped_percentiles(idx[solved], columns.time_to_solve[solved], n, SOLVE_TIME_PERCENTILES)
+
+    summary = {}
+    for i, puzzle_id in enumerate(columns.puzzle_ids):
+        summary[puzzle_id] = {
+            "ratings": int(counts[i]),
+            "solve_time": {
+                f"p{q}": None if np.isnan(solve_times[q][i]) else round(float(solve_times[q][i]), 2)
+                for q in SOLVE_TIME_PERCENTILES
+            },
+            "skip_rate": round(float(skip_rate[i]), 4),
+            "hint_rate": round(float(hint_rate[i]), 4),
+            "issue_ratio": {name: round(float(issue_ratio[i, code]), 4) for name, code in ISSUE_CODES.items()},
+            "difficulty": {name: int(difficulty[i, code]) for name, code in DIFFICULTY_CODES.items()}
+        }
+    return summary
+
+def build_summary(start: datetime.datetime, end: datetime.datetime) -> Dict[str, Any]:
+    """
+    Summarize all ratings logged between start and end (UTC, hour granularity).
+
+    Args:
+        start (datetime.datetime): First hour to include
+        end (datetime.datetime): Last hour to include
+
+    Returns:
+        Dict[str, Any]: The summary object
+    """
+    columns = RatingsColumns.from_entries(ratings_log_reader.iter_rating_events(start, end))
+    return {
+        "generated_at": datetime.datetime.utcnow().isoformat(),
+        "window": {"start": start.isoformat(), "end": end.isoformat()},
+        "entries": len(columns),
+        "puzzles": summarize(columns)
+    }
+
+def write_summary(summary: Dict[str, Any], key: str = SUMMARY_KEY):
+    """
+    Write a summary object to the webapp bucket.
+
+    Args:
+        summary (Dict[str, Any]): The summary from build_summary
+        key (str): Object key to write
+    """
+    body, headers = json_codec.encode(summary)
+    s3_utils.s3_client.put_object(
+        Bucket=s3_utils.WEBAPP_BUCKET,
+        Key=key,
+        Body=body,
+        **headers
+    )
+    print(f"Wrote ratings summary for {len(summary['puzzles'])} puzzles to {key}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize the ratings logs per puzzle.")
+    parser.add_argument('--days', type=int, default=30, help="How many days back to include")
+    args = parser.parse_args()
+
+    now = datetime.datetime.utcnow()
+    write_summary(build_summary(now - datetime.timedelta(days=args.days), now))
@@ -0,0 +1,102 @@
+import datetime
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Iterator, List
+import s3_utils
+
+LOG_READER_WORKERS = int(os.getenv('LOG_READER_WORKERS', '8'))
+
+HOUR_FORMAT = '%Y-%m-%d-%H'
+LOCAL_LOG_DIR = "local_rating_logs"
+
+def _hour_name(key: str) -> str:
+    # 'ratings_log/2024-03-24-12.json' -> '2024-03-24-12'
+    return key.split('/')[-1].replace('.json', '')
+
+def list_log_hours(start: datetime.datetime, end: datetime.datetime, strict: bool = False) -> List[datetime.datetime]:
+    """
+    List the hours between start and end that have a ratings log in the webapp
+    bucket or in the local fallback logs.
+
+    Args:
+        start (datetime.datetime): First hour to include (UTC)
+        end (datetime.datetime): Last hour to include (UTC)
+        strict (bool): Raise if the bucket cannot be listed, instead of
+            returning the hours found so far. Use this when the result is
+            saved as a complete count.
+
+    Returns:
+        List[datetime.datetime]: The hours, oldest first
+    """
+    first, last = start.strftime(HOUR_FORMAT), end.strftime(HOUR_FORMAT)
+    names = set()
+
+    # Log keys sort chronologically, so start listing at the first hour and
+    # stop as soon as we pass the last one
+    try:
+        paginator = s3_utils.s3_client.get_paginator('list_objects_v2')
+        pages = paginator.paginate(
+            Bucket=s3_utils.WEBAPP_BUCKET,
+            Prefix='ratings_log/',
+            StartAfter=f'ratings_log/{first}'
+        )
+        for page in pages:
+            past_end = False
+            for obj in page.get('Contents', []):
+                name = _hour_name(obj['Key'])
+                if name > last:
+                    past_end = True
+                    break
+                names.add(name)
+            if past_end:
+                break
+    except Exception as e:
+        if strict:
+            raise
+        print(f"Error listing ratings logs: {type(e).__name__}: {str(e)}")
+
+    if os.path.isdir(LOCAL_LOG_DIR):
+        for filename in os.listdir(LOCAL_LOG_DIR):
+            name = _hour_name(filename)
+            if filename.endswith('.json') and first <= name <= last:
+                names.add(name)
+
+    hours = []
+    for name in sorted(names):
+        try:
+            hours.append(datetime.datetime.strptime(name, HOUR_FORMAT))
+        except ValueError:
+            print(f"Skipping unexpected ratings log name: {name}")
+    return hours
+
+def iter_rating_events(start: datetime.datetime, end: datetime.datetime,
+                       max_workers: int = LOG_READER_WORKERS) -> Iterator[Dict[str, Any]]:
+    """
+    Stream every ratings log entry between start and end, oldest hour first.
+
+    Hourly logs are fetched concurrently, but at most max_workers of them are
+    in flight or buffered at any time, so memory stays constant however long
+    the range is.
+
+    Args:
+        start (datetime.datetime): First hour to include (UTC)
+        end (datetime.datetime): Last hour to include (UTC)
+        max_workers (int): Maximum number of concurrent fetches
+
+    Yields:
+        Dict[str, Any]: Log entries as written by log_individual_rating
+    """
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ratings-log") as pool:
+        pending = deque()
+        try:
+            for hour in list_log_hours(start, end):
+                pending.append(pool.submit(s3_utils.get_rating_logs, hour))
+                if len(pending) >= max_workers:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+        finally:
+            # Don't start fetches nobody will read if the consumer stops early
+            for future in pending:
+                future.cancel()
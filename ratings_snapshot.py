@@ -0,0 +1,180 @@
+import argparse
+import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
+import json_codec
+from rating_aggregates import DIFFICULTY_KEYS, ISSUE_KEYS, apply_counts
+
+# All puzzles' aggregate ratings in one object, ratings/_snapshot in the
+# webapp bucket, so a worker loads every aggregate with a single GET instead
+# of one per puzzle. Rows are parallel arrays indexed by position in
+# "puzzle_ids"; each row of "counts" holds COUNT_COLUMNS.
+SNAPSHOT_FORMAT = 1
+COUNT_COLUMNS = DIFFICULTY_KEYS + ISSUE_KEYS + ("total_ratings",)
+SNAPSHOT_READ_WORKERS = 16
+
+def encode_snapshot(aggregates: Dict[str, Dict[str, Any]], etags: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Encode aggregate ratings as a snapshot object.
+
+    Args:
+        aggregates (Dict[str, Dict[str, Any]]): ratings/{puzzle_id}.json objects by puzzle ID
+        etags (Dict[str, str]): The ETag each aggregate was read at, so the next
+            snapshot only re-reads changed objects
+
+    Returns:
+        Dict[str, Any]: The snapshot object
+    """
+    puzzle_ids = sorted(aggregates)
+    counts = []
+    for puzzle_id in puzzle_ids:
+        ratings = aggregates[puzzle_id]
+        difficulty, issues = ratings.get('difficulty', {}), ratings.get('fun', {})  # 'fun' holds issue counts
+        counts.append([difficulty.get(key, 0) for key in DIFFICULTY_KEYS] +
+                      [issues.get(key, 0) for key in ISSUE_KEYS] +
+                      [ratings.get('total_ratings', 0)])
+    return {
+        "format": SNAPSHOT_FORMAT,
+        "generated_at": datetime.datetime.utcnow().isoformat(),
+        "columns": list(COUNT_COLUMNS),
+        "puzzle_ids": puzzle_ids,
+        "target_words": [aggregates[puzzle_id].get('target_word', '') for puzzle_id in puzzle_ids],
+        "etags": [etags.get(puzzle_id, '') for puzzle_id in puzzle_ids],
+        "counts": counts
+    }
+
+class RatingsTable:
+    """
+    Read-only in-memory table of every puzzle's aggregate ratings, loaded from
+    a snapshot object.
+    """
+
+    def __init__(self, snapshot: Dict[str, Any]):
+        self.generated_at = datetime.datetime.fromisoformat(snapshot['generated_at'])
+        self.puzzle_ids: List[str] = snapshot['puzzle_ids']
+        self.target_words: List[str] = snapshot['target_words']
+        self.etags: List[str] = snapshot['etags']
+        columns = snapshot.get('columns', list(COUNT_COLUMNS))
+        counts = np.array(snapshot['counts'], dtype=np.int64).reshape(len(self.puzzle_ids), len(columns))
+        # Reorder to COUNT_COLUMNS in case a newer writer added or moved columns
+        self.counts = counts[:, [columns.index(column) for column in COUNT_COLUMNS]]
+        self.counts.setflags(write=False)
+        self._rows = {puzzle_id: row for row, puzzle_id in enumerate(self.puzzle_ids)}
+        self._all: Optional[Dict[str, Dict[str, Any]]] = None
+
+    def __len__(self) -> int:
+        return len(self.puzzle_ids)
+
+    def __contains__(self, puzzle_id: str) -> bool:
+        return puzzle_id in self._rows
+
+    def age_seconds(self) -> float:
+        """Seconds since the snapshot was generated."""
+        return (datetime.datetime.utcnow() - self.generated_at).total_seconds()
+
+    def get(self, puzzle_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a puzzle's aggregates.
+
+        Args:
+            puzzle_id (str): The puzzle ID
+
+        Returns:
+            Dict[str, Any]: The aggregates in the ratings/{puzzle_id}.json schema,
+                or None if the puzzle had no ratings when the snapshot was taken
+        """
+        row = self._rows.get(puzzle_id)
+        if row is None:
+            return None
+        counts = self.counts[row].tolist()
+        return apply_counts(
+            None, puzzle_id, self.target_words[row],
+            dict(zip(DIFFICULTY_KEYS, counts[:len(DIFFICULTY_KEYS)])),
+            dict(zip(ISSUE_KEYS, counts[len(DIFFICULTY_KEYS):-1])),
+            counts[-1], self.generated_at.isoformat()
+        )
+
+    def etag_of(self, puzzle_id: str) -> Optional[str]:
+        """Get the ETag a puzzle's aggregates were read at."""
+        row = self._rows.get(puzzle_id)
+        return None if row is None else self.etags[row]
+
+    def as_dict(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get every puzzle's aggregates, built once per table.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Aggregates keyed by puzzle ID
+        """
+        if self._all is None:
+            self._all = {puzzle_id: self.get(puzzle_id) for puzzle_id in self.puzzle_ids}
+        return self._all
+
+def write_ratings_snapshot() -> int:
+    """
+    Write ratings/_snapshot from the per-puzzle aggregates. Only aggregates
+    whose ETag differs from the previous snapshot's are read; one that fails
+    to read keeps its previous row and ETag, so it is read again next time.
+
+    Returns:
+        int: Number of puzzles in the snapshot
+    """
+    # s3_utils reads snapshots with RatingsTable, so import it here, not at the top
+    import s3_utils
+
+    try:
+        previous = RatingsTable(s3_utils.read_json_object(
+            s3_utils.ratings_breaker, s3_utils.WEBAPP_BUCKET, s3_utils.RATINGS_SNAPSHOT_KEY))
+    except Exception as e:
+        if s3_utils.is_s3_outage(e):
+            raise
+        previous = None
+
+    etags = s3_utils.list_rating_etags()
+    aggregates: Dict[str, Dict[str, Any]] = {}
+    changed = []
+    for puzzle_id, etag in etags.items():
+        if previous is not None and previous.etag_of(puzzle_id) == etag:
+            aggregates[puzzle_id] = previous.get(puzzle_id)
+        else:
+            changed.append(puzzle_id)
+
+    def read(puzzle_id: str) -> Optional[Tuple[Any, Optional[str]]]:
+        try:
+            return s3_utils.fetch_json_object(
+                s3_utils.ratings_breaker, s3_utils.WEBAPP_BUCKET, f'ratings/{puzzle_id}.json')
+        except Exception as e:
+            print(f"Error reading ratings for puzzle {puzzle_id}: {type(e).__name__}: {str(e)}")
+            return None
+
+    failed = 0
+    with ThreadPoolExecutor(max_workers=SNAPSHOT_READ_WORKERS, thread_name_prefix="snapshot") as pool:
+        for puzzle_id, result in zip(changed, pool.map(read, changed)):
+            if result is not None:
+                aggregates[puzzle_id], etags[puzzle_id] = result[0], result[1] or etags[puzzle_id]
+                continue
+            failed += 1
+            if previous is not None and puzzle_id in previous:
+                aggregates[puzzle_id], etags[puzzle_id] = previous.get(puzzle_id), previous.etag_of(puzzle_id)
+
+    body, headers = json_codec.encode(encode_snapshot(aggregates, etags))
+    s3_utils.s3_client.put_object(Bucket=s3_utils.WEBAPP_BUCKET, Key=s3_utils.RATINGS_SNAPSHOT_KEY, Body=body, **headers)
+    print(f"Wrote ratings snapshot of {len(aggregates)} puzzles ({len(changed)} re-read, {failed} failed)")
+    return len(aggregates)
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Write ratings/_snapshot from the per-puzzle aggregates.")
+    parser.add_argument('--every', type=float, default=None, help="Keep running, writing a snapshot every this many seconds")
+    args = parser.parse_args()
+
+    while True:
+        try:
+            write_ratings_snapshot()
+        except Exception as e:
+            print(f"Error writing ratings snapshot: {type(e).__name__}: {str(e)}")
+        if args.every is None:
+            break
+        time.sleep(args.every)
@@ -0,0 +1,163 @@
+import datetime
+import os
+import sqlite3
+from typing import Dict, Any, Callable, Optional
+import background
+import local_sqlite
+from rating_aggregates import DIFFICULTY_KEYS, ISSUE_KEYS, apply_counts
+
+# Local aggregation store for puzzle ratings. Every rating is a single atomic
+# UPDATE, so concurrent workers on this host can never lose an increment the
+# way the S3 read-modify-write can. Each row holds the puzzle's counts as this
+# host sees them and the increments not yet exported; every
+# RATINGS_EXPORT_SECONDS the pending increments are added to
+# ratings/{puzzle_id}.json with a conditional write, so several hosts can
+# export the same puzzle without overwriting each other's counts.
+RATINGS_STORE_PATH = os.getenv('RATINGS_STORE_PATH', 'local_ratings.sqlite3')
+RATINGS_EXPORT_SECONDS = float(os.getenv('RATINGS_EXPORT_SECONDS', '60'))
+
+COUNT_COLUMNS = DIFFICULTY_KEYS + ISSUE_KEYS + ('total_ratings',)
+PENDING_COLUMNS = tuple(f'pending_{column}' for column in COUNT_COLUMNS)
+
+def _create_schema(connection: sqlite3.Connection):
+    connection.row_factory = sqlite3.Row
+    connection.execute(
+        "CREATE TABLE IF NOT EXISTS ratings ("
+        " puzzle_id TEXT PRIMARY KEY,"
+        " target_word TEXT,"
+        + "".join(f" {column} INTEGER NOT NULL DEFAULT 0," for column in COUNT_COLUMNS + PENDING_COLUMNS) +
+        " last_updated TEXT"
+        ")"
+    )
+    columns = [row[1] for row in connection.execute("PRAGMA table_info(ratings)")]
+    for column in PENDING_COLUMNS:
+        if column not in columns:
+            # Stores created before increments were exported as deltas
+            connection.execute(f"ALTER TABLE ratings ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0")
+
+def _connection() -> sqlite3.Connection:
+    return local_sqlite.thread_connection(RATINGS_STORE_PATH, _create_schema)
+
+def _seed(puzzle_id: str, target_word: str, seed: Optional[Dict[str, Any]]):
+    # Insert the puzzle's starting counts; if another worker got there first
+    # its row wins and this is a no-op
+    difficulty = (seed or {}).get('difficulty', {})
+    issues = (seed or {}).get('fun', {})
+    values = [difficulty.get(c, 0) for c in DIFFICULTY_KEYS] + [issues.get(c, 0) for c in ISSUE_KEYS]
+    _connection().execute(
+        f"INSERT OR IGNORE INTO ratings (puzzle_id, target_word, {', '.join(COUNT_COLUMNS)}) "
+        f"VALUES (?, ?, {', '.join('?' for _ in COUNT_COLUMNS)})",
+        [puzzle_id, target_word] + values + [(seed or {}).get('total_ratings', 0)]
+    )
+
+def record_rating(puzzle_id: str, target_word: str, difficulty_rating: str, issue_rating: str,
+                  load_seed: Callable[[], Optional[Dict[str, Any]]]):
+    """
+    Apply one rating to the local store.
+
+    Args:
+        puzzle_id (str): The puzzle ID
+        target_word (str): The solution word
+        difficulty_rating (str): One of "easy", "medium", "hard"
+        issue_rating (str): One of "bad_images", "bad_puzzle", "no_issues"
+        load_seed (Callable): Loads the puzzle's existing S3 aggregates (None if
+            there are none), called only the first time this store sees the
+            puzzle. If it raises, the rating is not recorded.
+    """
+    if difficulty_rating not in DIFFICULTY_KEYS:
+        raise ValueError(f"Unknown difficulty rating: {difficulty_rating}")
+    if issue_rating not in ISSUE_KEYS:
+        raise ValueError(f"Unknown issue rating: {issue_rating}")
+
+    connection = _connection()
+    known = connection.execute("SELECT 1 FROM ratings WHERE puzzle_id = ?", (puzzle_id,)).fetchone()
+    if not known:
+        _seed(puzzle_id, target_word, load_seed())
+
+    # Column names were checked against DIFFICULTY_KEYS and ISSUE_KEYS above
+    increments = ", ".join(
+        f"{column} = {column} + 1, pending_{column} = pending_{column} + 1"
+        for column in (difficulty_rating, issue_rating, 'total_ratings')
+    )
+    connection.execute(
+        f"UPDATE ratings SET {increments}, last_updated = ? WHERE puzzle_id = ?",
+        (datetime.datetime.utcnow().isoformat(), puzzle_id)
+    )
+
+def _to_ratings(row: sqlite3.Row) -> Dict[str, Any]:
+    # Same schema as ratings/{puzzle_id}.json
+    return apply_counts(
+        None, row['puzzle_id'], row['target_word'],
+        {column: row[column] for column in DIFFICULTY_KEYS},
+        {column: row[column] for column in ISSUE_KEYS},
+        row['total_ratings'], row['last_updated']
+    )
+
+def get_ratings(puzzle_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Get a puzzle's aggregates from the local store.
+
+    Args:
+        puzzle_id (str): The puzzle ID
+
+    Returns:
+        Dict[str, Any]: The aggregates, or None if the store has not seen the puzzle
+    """
+    try:
+        row = _connection().execute("SELECT * FROM ratings WHERE puzzle_id = ?", (puzzle_id,)).fetchone()
+        return _to_ratings(row) if row else None
+    except Exception as e:
+        print(f"Error reading local ratings for puzzle {puzzle_id}: {type(e).__name__}: {str(e)}")
+        return None
+
+def export_changed_ratings(update_ratings: Callable[[str, Callable], Dict[str, Any]]) -> int:
+    """
+    Add every puzzle's pending increments to its S3 aggregates, then rebase the
+    local counts on what S3 holds, so they include other hosts' ratings.
+    Increments that fail to export stay pending.
+
+    Args:
+        update_ratings (Callable): s3_utils.update_puzzle_ratings
+
+    Returns:
+        int: Number of puzzles exported
+    """
+    connection = _connection()
+    rows = connection.execute("SELECT * FROM ratings WHERE pending_total_ratings > 0").fetchall()
+
+    exported = 0
+    for row in rows:
+        puzzle_id = row['puzzle_id']
+        pending = {column: row[f'pending_{column}'] for column in COUNT_COLUMNS}
+        try:
+            written = update_ratings(puzzle_id, lambda current, pid=puzzle_id, word=row['target_word'], p=pending: apply_counts(
+                current, pid, word,
+                {key: p[key] for key in DIFFICULTY_KEYS}, {key: p[key] for key in ISSUE_KEYS}, p['total_ratings']
+            ))
+            counts = dict(written['difficulty'], **written['fun'], total_ratings=written['total_ratings'])
+            # Ratings recorded since the row was read stay pending on top of S3's counts
+            connection.execute(
+                "UPDATE ratings SET " + ", ".join(
+                    f"{column} = ? + pending_{column} - ?, pending_{column} = pending_{column} - ?"
+                    for column in COUNT_COLUMNS
+                ) + " WHERE puzzle_id = ?",
+                [value for column in COUNT_COLUMNS for value in (counts.get(column, 0), pending[column], pending[column])]
+                + [puzzle_id]
+            )
+            exported += 1
+        except Exception as e:
+            print(f"Error exporting ratings for puzzle {puzzle_id}: {type(e).__name__}: {str(e)}")
+
+    if exported:
+        print(f"Exported ratings for {exported} puzzles")
+    return exported
+
+def start_export_thread(update_ratings: Callable[[str, Callable], Dict[str, Any]]):
+    """
+    Start the periodic export in a daemon thread, once per process. Pending
+    changes are also exported when the process exits.
+
+    Args:
+        update_ratings (Callable): s3_utils.update_puzzle_ratings
+    """
+    background.start_periodic('ratings-export', RATINGS_EXPORT_SECONDS, export_changed_ratings, update_ratings)
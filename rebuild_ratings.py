@@ -0,0 +1,255 @@
+import argparse
+import datetime
+import multiprocessing
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
+from botocore.exceptions import ClientError
+import json_codec
+import ratings_log_reader
+import ratings_snapshot
+import s3_utils
+from rating_aggregates import DIFFICULTY_KEYS, ISSUE_KEYS, apply_counts
+from rating_buffer import RatingDelta, merge_delta
+
+# Recomputes every ratings/{puzzle_id}.json from the ratings logs. Each day's
+# logs are deduplicated by log_id and counted per puzzle in a worker process;
+# completed days are saved as rollups under ROLLUP_PREFIX, so later rebuilds
+# only read the hourly logs of days without one. A day whose logs cannot all
+# be read fails the rebuild instead of being saved short. Each aggregate is
+# corrected by the difference between its rebuilt and current counts inside a
+# compare-and-swap, so ratings saved while it is written are kept; ratings
+# logged between listing the logs and reading the aggregate are still undone,
+# so run it in a quiet period.
+ROLLUP_PREFIX = 'ratings_rollup/'
+DAY_FORMAT = '%Y-%m-%d'
+REBUILD_WRITE_WORKERS = 16
+
+# Counts per puzzle as plain dicts, so they can cross process boundaries:
+# {puzzle_id: {"target_word": str, "difficulty": {...}, "fun": {...}, "total_ratings": int}}
+Counts = Dict[str, Dict[str, Any]]
+
+def _to_delta(counts: Dict[str, Any]) -> RatingDelta:
+    delta = RatingDelta(counts.get('target_word', ''))
+    delta.difficulty.update({key: counts['difficulty'].get(key, 0) for key in DIFFICULTY_KEYS})
+    delta.issues.update({key: counts['fun'].get(key, 0) for key in ISSUE_KEYS})
+    delta.total = counts['total_ratings']
+    return delta
+
+def _to_counts(delta: RatingDelta) -> Dict[str, Any]:
+    return {
+        "target_word": delta.target_word,
+        "difficulty": dict(delta.difficulty),
+        "fun": dict(delta.issues),
+        "total_ratings": delta.total
+    }
+
+def rollup_day(day: str, hours: List[datetime.datetime], save_checkpoint: bool) -> Counts:
+    """
+    Count one day's ratings per puzzle from its hourly logs, counting each
+    log_id once. Runs in a worker process.
+
+    Raises if any of the day's logs cannot be read, so a partial count is
+    never saved as the day's rollup.
+
+    Args:
+        day (str): The day, YYYY-MM-DD
+        hours (List[datetime.datetime]): The day's hours that have logs
+        save_checkpoint (bool): Whether to save the result as the day's rollup
+
+    Returns:
+        Counts: The day's counts per puzzle
+    """
+    seen = set()
+    deltas: Dict[str, RatingDelta] = {}
+    skipped = 0
+
+    for hour in hours:
+        for entry in s3_utils.get_rating_logs(hour, strict=True):
+            log_id = entry.get('log_id')
+            if log_id is not None:
+                if log_id in seen:
+                    continue
+                seen.add(log_id)
+
+            ratings = entry.get('ratings', {})
+            puzzle_id = entry.get('puzzle_id')
+            if not puzzle_id or ratings.get('difficulty') not in DIFFICULTY_KEYS or ratings.get('issue') not in ISSUE_KEYS:
+                skipped += 1
+                continue
+            delta = deltas.get(puzzle_id)
+            if delta is None:
+                delta = deltas[puzzle_id] = RatingDelta(entry.get('target_word', ''))
+            delta.add(ratings['difficulty'], ratings['issue'])
+
+    counts = {puzzle_id: _to_counts(delta) for puzzle_id, delta in deltas.items()}
+    if skipped:
+        print(f"{day}: skipped {skipped} malformed log entries")
+
+    if save_checkpoint:
+        body, headers = json_codec.encode({"day": day, "entries": len(seen), "puzzles": counts})
+        s3_utils.s3_client.put_object(
+            Bucket=s3_utils.WEBAPP_BUCKET,
+            Key=f'{ROLLUP_PREFIX}{day}.json',
+            Body=body,
+            **headers
+        )
+    return counts
+
+def load_rollup(day: str) -> Optional[Counts]:
+    """
+    Load a day's rollup checkpoint.
+
+    Args:
+        day (str): The day, YYYY-MM-DD
+
+    Returns:
+        Counts: The day's counts per puzzle, or None if there is no rollup
+    """
+    try:
+        response = s3_utils.s3_client.get_object(Bucket=s3_utils.WEBAPP_BUCKET, Key=f'{ROLLUP_PREFIX}{day}.json')
+        return json_codec.decode_response(response)['puzzles']
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') not in ('NoSuchKey', '404'):
+            raise
+        return None
+
+def list_rollup_days() -> List[str]:
+    """
+    List the days that have a rollup checkpoint.
+
+    Returns:
+        List[str]: The days, YYYY-MM-DD, oldest first
+    """
+    paginator = s3_utils.s3_client.get_paginator('list_objects_v2')
+    days = []
+    for page in paginator.paginate(Bucket=s3_utils.WEBAPP_BUCKET, Prefix=ROLLUP_PREFIX):
+        for obj in page.get('Contents', []):
+            days.append(obj['Key'][len(ROLLUP_PREFIX):].replace('.json', ''))
+    return sorted(days)
+
+def collect_counts(start: datetime.datetime, end: datetime.datetime, workers: int,
+                   use_checkpoints: bool = True) -> Counts:
+    """
+    Count every rating logged between start and end, per puzzle.
+
+    Days with a rollup are loaded from it; the others are counted from their
+    hourly logs on a process pool, one day per task. Days before today get a
+    new rollup.
+
+    Args:
+        start (datetime.datetime): First hour to include (UTC)
+        end (datetime.datetime): Last hour to include (UTC)
+        workers (int): Worker processes
+        use_checkpoints (bool): Whether to read existing rollups
+
+    Returns:
+        Counts: Counts per puzzle over the whole range
+
+    Raises:
+        RuntimeError: If the logs could not be listed or any day's logs could not be read
+    """
+    try:
+        log_hours = ratings_log_reader.list_log_hours(start, end, strict=True)
+    except Exception as e:
+        raise RuntimeError(f"Could not list the ratings logs: {type(e).__name__}: {str(e)}") from e
+
+    hours_by_day = defaultdict(list)
+    for hour in log_hours:
+        hours_by_day[hour.strftime(DAY_FORMAT)].append(hour)
+
+    first_day, last_day = start.strftime(DAY_FORMAT), end.strftime(DAY_FORMAT)
+    rollup_days = set(day for day in list_rollup_days() if first_day <= day <= last_day) if use_checkpoints else set()
+    today = datetime.datetime.utcnow().strftime(DAY_FORMAT)
+
+    totals: Dict[str, RatingDelta] = {}
+    def add(counts: Counts):
+        for puzzle_id, puzzle_counts in counts.items():
+            delta = _to_delta(puzzle_counts)
+            if puzzle_id in totals:
+                totals[puzzle_id].absorb(delta)
+            else:
+                totals[puzzle_id] = delta
+
+    for day in sorted(rollup_days):
+        add(load_rollup(day) or {})
+
+    pending = sorted(day for day in hours_by_day if day not in rollup_days)
+    print(f"Loaded {len(rollup_days)} daily rollups; counting {len(pending)} days from hourly logs")
+    # boto3 clients are not fork-safe, so workers start fresh and make their own
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        futures = {day: pool.submit(rollup_day, day, hours_by_day[day], day < today) for day in pending}
+        failed = []
+        for day, future in futures.items():
+            try:
+                add(future.result())
+            except Exception as e:
+                print(f"Error counting ratings for {day}: {type(e).__name__}: {str(e)}")
+                failed.append(day)
+
+    if failed:
+        raise RuntimeError(f"Could not read the ratings logs of {len(failed)} days ({', '.join(failed)}); rerun to retry them")
+
+    return {puzzle_id: _to_counts(delta) for puzzle_id, delta in totals.items()}
+
+def write_aggregates(counts: Counts, dry_run: bool = False) -> Dict[str, int]:
+    """
+    Correct each puzzle's aggregates to its rebuilt counts, in parallel.
+    Puzzles whose aggregates already match are not rewritten. For the others
+    the difference between the rebuilt counts and the aggregates as read is
+    added with update_puzzle_ratings, so ratings saved after the read are kept.
+
+    Args:
+        counts (Counts): Counts per puzzle from collect_counts
+        dry_run (bool): Report drift without writing
+
+    Returns:
+        Dict[str, int]: How many puzzles were unchanged, drifted and failed to write
+    """
+    def rebuild(puzzle_id: str) -> str:
+        try:
+            current = s3_utils.read_puzzle_ratings(puzzle_id) or {}
+            rebuilt = merge_delta(None, puzzle_id, _to_delta(counts[puzzle_id]))
+            if all(current.get(key) == rebuilt[key] for key in ('difficulty', 'fun', 'total_ratings')):
+                return 'unchanged'
+            print(f"{puzzle_id}: {current.get('total_ratings', 0)} -> {rebuilt['total_ratings']} ratings")
+            if not dry_run:
+                difficulty, issues = current.get('difficulty', {}), current.get('fun', {})
+                correction = (
+                    {key: rebuilt['difficulty'][key] - difficulty.get(key, 0) for key in DIFFICULTY_KEYS},
+                    {key: rebuilt['fun'][key] - issues.get(key, 0) for key in ISSUE_KEYS},
+                    rebuilt['total_ratings'] - current.get('total_ratings', 0)
+                )
+                s3_utils.update_puzzle_ratings(
+                    puzzle_id, lambda latest: apply_counts(latest, puzzle_id, rebuilt['target_word'], *correction)
+                )
+            return 'drifted'
+        except Exception as e:
+            print(f"Error rebuilding ratings for puzzle {puzzle_id}: {type(e).__name__}: {str(e)}")
+            return 'failed'
+
+    results = {'unchanged': 0, 'drifted': 0, 'failed': 0}
+    with ThreadPoolExecutor(max_workers=REBUILD_WRITE_WORKERS, thread_name_prefix="rebuild") as pool:
+        for outcome in pool.map(rebuild, sorted(counts)):
+            results[outcome] += 1
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild ratings/{puzzle_id}.json from the ratings logs.")
+    parser.add_argument('--since', default='2024-01-01', help="First day to include, YYYY-MM-DD")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 4, help="Worker processes for counting")
+    parser.add_argument('--no-checkpoints', action='store_true', help="Ignore existing daily rollups and recount every day")
+    parser.add_argument('--dry-run', action='store_true', help="Report drifted aggregates without writing them")
+    args = parser.parse_args()
+
+    start = datetime.datetime.strptime(args.since, DAY_FORMAT)
+    try:
+        counts = collect_counts(start, datetime.datetime.utcnow(), args.workers, use_checkpoints=not args.no_checkpoints)
+    except RuntimeError as e:
+        raise SystemExit(f"Error rebuilding ratings: {str(e)}; no aggregates were written")
+    results = write_aggregates(counts, dry_run=args.dry_run)
+    if not args.dry_run and results['drifted']:
+        ratings_snapshot.write_ratings_snapshot()
+    print(f"Rebuilt {len(counts)} puzzles: {results['drifted']} drifted"
+          f"{' (not written)' if args.dry_run else ''}, {results['unchanged']} unchanged, {results['failed']} failed")
@@ -0,0 +1,194 @@
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, List, Optional
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+# Opt-in timing of Streamlit reruns. Each rerun (including the button
+# callbacks that run before the script body, and fragment-only reruns) becomes
+# one trace of nested spans: app phases, game_logic calls and s3_utils calls.
+RENDER_PROFILER = os.getenv('RENDER_PROFILER', 'false').lower() == 'true'
+
+# Completed traces kept for the sidebar and export
+TRACE_HISTORY = 100
+
+APP = "app"
+
+_local = threading.local()
+_lock = threading.Lock()
+_traces: deque = deque(maxlen=TRACE_HISTORY)
+_totals: Dict[str, List[float]] = {}  # span name -> [count, total seconds, max seconds]
+
+class _Trace:
+    def __init__(self):
+        self.started_at = time.time()
+        self.origin = time.perf_counter()
+        self.thread_id = threading.get_ident()
+        self.spans: List[Dict[str, Any]] = []
+        self.stack: List[str] = []  # categories of the open spans
+
+def _active_trace(create: bool) -> Optional[_Trace]:
+    trace = getattr(_local, 'trace', None)
+    # Only the script thread records; background threads calling s3_utils
+    # (exports, rebuilds) never belong to a rerun
+    if trace is None and create and get_script_run_ctx(suppress_warning=True) is not None:
+        trace = _local.trace = _Trace()
+    return trace
+
+@contextmanager
+def span(name: str, category: str = APP) -> Iterator[None]:
+    """
+    Time a block as part of the current rerun's trace. A no-op unless
+    RENDER_PROFILER is on and the block runs on the script thread. Also usable
+    as a decorator.
+
+    When an app phase closes with nothing else open (the end of main, or of a
+    fragment rerun), the trace is complete and is recorded.
+
+    Args:
+        name (str): Span name, e.g. 'display_puzzle_images'
+        category (str): 'app', or the module the call belongs to
+    """
+    trace = _active_trace(create=True) if RENDER_PROFILER else None
+    if trace is None:
+        yield
+        return
+
+    # Only the outermost span of a category counts towards its total, so a
+    # nested s3_utils call is not counted twice
+    outermost = category not in trace.stack
+    depth = len(trace.stack)
+    trace.stack.append(category)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        trace.stack.pop()
+        trace.spans.append({
+            "name": name, "category": category, "depth": depth, "outermost": outermost,
+            "start": start - trace.origin, "duration": duration
+        })
+        if category == APP and not trace.stack:
+            _finish(trace)
+
+def _finish(trace: _Trace):
+    _local.trace = None
+    totals: Dict[str, float] = {}
+    for s in trace.spans:
+        if s['outermost']:
+            totals[s['category']] = totals.get(s['category'], 0.0) + s['duration']
+    record = {
+        "started_at": trace.started_at,
+        "duration": max(s['start'] + s['duration'] for s in trace.spans),
+        "thread_id": trace.thread_id,
+        "totals": totals,
+        "spans": sorted(trace.spans, key=lambda s: s['start'])
+    }
+
+    with _lock:
+        _traces.append(record)
+        for s in trace.spans:
+            key = f"{s['category']}.{s['name']}" if s['category'] != APP else s['name']
+            entry = _totals.setdefault(key, [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += s['duration']
+            entry[2] = max(entry[2], s['duration'])
+
+def instrument(module: Any, category: str):
+    """
+    Wrap every public function of a module so calls to it are recorded as
+    spans. Safe to call on every rerun; functions are only wrapped once.
+
+    Args:
+        module: The module, e.g. s3_utils
+        category (str): Span category, usually the module name
+    """
+    if not RENDER_PROFILER:
+        return
+    for name, fn in list(vars(module).items()):
+        if name.startswith('_') or not inspect.isfunction(fn) or fn.__module__ != module.__name__:
+            continue
+        if getattr(fn, '__profiled__', False):
+            continue
+
+        def wrap(fn=fn, name=name):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if getattr(_local, 'trace', None) is None and get_script_run_ctx(suppress_warning=True) is None:
+                    return fn(*args, **kwargs)
+                with span(name, category):
+                    return fn(*args, **kwargs)
+            wrapper.__profiled__ = True
+            return wrapper
+
+        setattr(module, name, wrap())
+
+def summary() -> List[Dict[str, Any]]:
+    """
+    Get per-span timings aggregated over this process's reruns.
+
+    Returns:
+        List[Dict[str, Any]]: One row per span name, slowest total first
+    """
+    with _lock:
+        rows = [
+            {"span": key, "calls": int(count), "total_ms": round(total * 1000, 1),
+             "mean_ms": round(total * 1000 / count, 1), "max_ms": round(worst * 1000, 1)}
+            for key, (count, total, worst) in _totals.items()
+        ]
+    return sorted(rows, key=lambda row: row['total_ms'], reverse=True)
+
+def export_trace() -> str:
+    """
+    Export the recent reruns in Chrome trace event format, which chrome://tracing
+    and Perfetto can open.
+
+    Returns:
+        str: The trace JSON
+    """
+    with _lock:
+        traces = list(_traces)
+
+    events = []
+    for trace in traces:
+        base_us = trace['started_at'] * 1e6
+        for s in trace['spans']:
+            events.append({
+                "name": s['name'], "cat": s['category'], "ph": "X",
+                "ts": round(base_us + s['start'] * 1e6), "dur": round(s['duration'] * 1e6),
+                "pid": os.getpid(), "tid": trace['thread_id']
+            })
+    return json.dumps({"traceEvents": events, "displayTimeUnit": "ms"})
+
+def render_sidebar():
+    """Show the last completed rerun and the per-process aggregates in the sidebar."""
+    if not RENDER_PROFILER:
+        return
+
+    with _lock:
+        last = _traces[-1] if _traces else None
+
+    with st.sidebar.expander("Render profiler", expanded=True):
+        if last is None:
+            st.caption("No completed reruns yet.")
+            return
+
+        st.caption(f"Last rerun: {last['duration'] * 1000:.0f} ms")
+        totals = last['totals']
+        app_time = totals.get(APP, 0.0)
+        st.text(
+            f"game_logic: {totals.get('game_logic', 0.0) * 1000:.0f} ms\n"
+            f"s3_utils:   {totals.get('s3_utils', 0.0) * 1000:.0f} ms\n"
+            f"callbacks:  {(last['duration'] - app_time) * 1000:.0f} ms outside app phases"
+        )
+        st.dataframe(summary()[:20], hide_index=True)
+        st.download_button(
+            "Download trace", data=export_trace(), file_name="render_trace.json", mime="application/json"
+        )
@@ -0,0 +1,253 @@
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, List, Optional
+
+# Replays the sessions session_trace.py recorded on one day against this build,
+# so a candidate build can be measured on real player behaviour. Importing
+# load_test first keeps caches and local fallback files in a temporary
+# directory.
+import load_test
+import game_logic
+import guess_limiter
+import metrics
+import s3_utils
+import session_trace
+
+REPLAY_WORKERS = 256
+
+_local = threading.local()
+_load_next_puzzle = game_logic.load_next_puzzle
+
+def _replayed_next_puzzle(state: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    # Serve the puzzle the player was given in the recording, so every replay
+    # of a trace fetches the same puzzles; selection itself is random
+    puzzle_id = getattr(_local, 'puzzle_id', None)
+    if not puzzle_id:
+        return _load_next_puzzle(state)
+    puzzle = s3_utils.get_puzzle_by_id(puzzle_id)
+    if puzzle:
+        puzzle['show_hints'] = False
+        puzzle['start_time'] = time.time()
+    return puzzle
+
+def _resume(state, args):
+    # Profile keys are not recorded, so start a fresh game on the puzzle the
+    # player resumed on; the profile read itself is not replayed
+    state = game_logic.initialize_game_state()
+    state['current_puzzle'] = game_logic.load_next_puzzle(state)
+    return state
+
+def _load_next(state, args):
+    state['current_puzzle'] = game_logic.load_next_puzzle(state)
+    return state
+
+def _check_answer(state, args):
+    try:
+        game_logic.check_answer(args.get('puzzle_id', ''), args.get('user_guess', ''), args.get('session_id'))
+    except guess_limiter.GuessRateLimitedError:
+        pass  # Counted in guesses.rate_limited
+    return state
+
+# How each traced call is re-executed: (state, recorded args) -> new state
+REPLAY_ACTIONS: Dict[str, Callable[[Optional[Dict[str, Any]], Dict[str, Any]], Dict[str, Any]]] = {
+    'initialize_game_state': lambda state, args: game_logic.initialize_game_state(),
+    'resume_game_state': _resume,
+    'load_next_puzzle': _load_next,
+    'check_answer': _check_answer,
+    'reveal_hints': lambda state, args: game_logic.reveal_hints(state),
+    'skip_puzzle': lambda state, args: game_logic.skip_puzzle(state)[0],
+    'solve_puzzle': lambda state, args: game_logic.solve_puzzle(state, args.get('user_guess', '')),
+    'submit_rating': lambda state, args: game_logic.submit_rating(
+        state, args.get('difficulty_rating', 'medium'), args.get('issue_rating', 'no_issues')),
+    'skip_rating': lambda state, args: game_logic.skip_rating(state)
+}
+
+def replay_session(events: List[Dict[str, Any]], origin: float, started_at: float, speed: float):
+    """
+    Re-execute one session's calls, waiting between them as the player did,
+    divided by speed. Each call's latency is observed in metrics as
+    replay.{call}.
+
+    Args:
+        events (List[Dict[str, Any]]): The session's events in time order
+        origin (float): Recorded time of the day's first event
+        started_at (float): time.monotonic() when the replay started
+        speed (float): Time compression factor; 0 replays without waiting
+    """
+    state = None
+    for event in events:
+        if speed > 0:
+            delay = started_at + (event['t'] - origin) / speed - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+        action = REPLAY_ACTIONS.get(event['call'])
+        if action is None or (state is None and event['call'] not in ('initialize_game_state', 'resume_game_state')):
+            metrics.increment('replay.skipped')
+            continue
+        if state is not None and state['current_puzzle'] is None and event['call'] != 'load_next_puzzle':
+            metrics.increment('replay.skipped')
+            continue
+
+        _local.puzzle_id = event.get('puzzle_id')
+        start = time.perf_counter()
+        try:
+            state = action(state, event.get('args', {}))
+        except Exception as e:
+            metrics.increment('replay.errors')
+            print(f"Error replaying {event['call']}: {type(e).__name__}: {str(e)}")
+            continue
+        metrics.observe(f"replay.{event['call']}", time.perf_counter() - start)
+        if event.get('puzzle_id') and (state['current_puzzle'] or {}).get('id') != event['puzzle_id']:
+            metrics.increment('replay.puzzle_mismatch')
+
+def count_s3_requests(client: Any) -> Counter:
+    """
+    Count the S3 requests a client makes, by operation.
+
+    Args:
+        client: A boto3 S3 client, or the load_test stand-in
+
+    Returns:
+        Counter: Requests per operation, updated as they are made
+    """
+    if isinstance(client, load_test.InMemoryS3):
+        return client.requests
+    requests = Counter()
+    client.meta.events.register('before-call.s3', lambda model, **kwargs: requests.update([model.name]))
+    return requests
+
+def seed_stand_in(sessions: Dict[str, List[Dict[str, Any]]], **options) -> load_test.InMemoryS3:
+    """
+    Install a load_test stand-in holding every puzzle the traces served. A
+    puzzle's answer is the guess its player solved it with.
+
+    Args:
+        sessions (Dict[str, List[Dict[str, Any]]]): Events per session
+        **options: InMemoryS3 latency and error options
+
+    Returns:
+        load_test.InMemoryS3: The stand-in, installed as the app's S3 client
+    """
+    client = load_test.InMemoryS3(**options)
+    answers: Dict[str, str] = {}
+    for events in sessions.values():
+        current = None
+        for event in events:
+            if event['call'] == 'solve_puzzle' and current:
+                answers[current] = event['args'].get('user_guess', '')
+            current = event.get('puzzle_id') or current
+            if current:
+                answers.setdefault(current, f"answer-{current}")
+
+    for puzzle_id, answer in answers.items():
+        client.seed(s3_utils.PUZZLE_BUCKET, f'puzzles/{puzzle_id}.json', {
+            "descriptions": {str(n): f"Image {n} of puzzle {puzzle_id}" for n in range(1, 5)},
+            "image_urls": {str(n): f"{puzzle_id}_{n}.png" for n in range(1, 5)}
+        })
+        client.seed(s3_utils.PUZZLE_BUCKET, f'solutions_by_id/{puzzle_id}.json', {"target_word": answer})
+    s3_utils.s3_client = client
+    return client
+
+def build_report(label: str, events: int, elapsed: float, requests: Counter) -> Dict[str, Any]:
+    """Summarize a replay's per-call latencies and S3 requests."""
+    snapshot = metrics.snapshot()
+    calls = {
+        name[len('replay.'):]: {f'p{q}_ms': round(timing[f'p{q}'] * 1000, 2) for q in metrics.LATENCY_PERCENTILES}
+        for name, timing in snapshot['latencies'].items() if name.startswith('replay.')
+    }
+    return {
+        "build": label,
+        "events": events,
+        "elapsed": round(elapsed, 2),
+        "calls": calls,
+        "s3_requests": dict(requests),
+        "s3_requests_per_event": round(sum(requests.values()) / max(events, 1), 3),
+        "counters": {name: value for name, value in snapshot['counters'].items() if name.startswith(('replay.', 'guesses.'))}
+    }
+
+def print_comparison(report: Dict[str, Any], baseline: Optional[Dict[str, Any]]):
+    """Print a replay report, with the change from a baseline report if given."""
+    def delta(value: float, base: Optional[float]) -> str:
+        if base is None:
+            return ""
+        return f" ({value - base:+.1f}, {(value - base) / base * 100:+.0f}%)" if base else f" ({value - base:+.1f})"
+
+    other = baseline or {}
+    print(f"\nBuild {report['build']}" + (f" vs {other.get('build')}" if baseline else "") +
+          f": {report['events']} events in {report['elapsed']:.1f}s")
+    print("\nLatency (ms)")
+    for call, timing in sorted(report['calls'].items()):
+        base_timing = other.get('calls', {}).get(call, {})
+        print(f"  {call:<24}" + "  ".join(
+            f"{key}={value:.1f}{delta(value, base_timing.get(key))}" for key, value in timing.items()
+        ))
+
+    print(f"\nS3 requests per event: {report['s3_requests_per_event']:.3f}"
+          f"{delta(report['s3_requests_per_event'], other.get('s3_requests_per_event'))}")
+    for operation in sorted(set(report['s3_requests']) | set(other.get('s3_requests', {}))):
+        count = report['s3_requests'].get(operation, 0)
+        print(f"  {operation:<24}{count:>8}{delta(count, other.get('s3_requests', {}).get(operation, 0) if baseline else None)}")
+    for name, value in sorted(report['counters'].items()):
+        print(f"  {name:<24}{value:>8}")
+
+if __name__ == "__main__":
+    yesterday = (datetime.datetime.utcnow() - datetime.timedelta(days=1)).strftime('%Y-%m-%d')
+    parser = argparse.ArgumentParser(description="Replay recorded player sessions and report latency and S3 requests.")
+    parser.add_argument('--day', default=yesterday, help="Day of traces to replay, YYYY-MM-DD (default: yesterday)")
+    parser.add_argument('--speed', type=float, default=1.0, help="Time compression; 1 is real time, 0 is no waiting")
+    parser.add_argument('--sessions', type=int, default=None, help="Replay at most this many sessions")
+    parser.add_argument('--backend', choices=('stand-in', 's3'), default='stand-in',
+                        help="Replay against the in-memory stand-in, or the configured buckets (this writes ratings)")
+    parser.add_argument('--ratings-store', choices=('s3', 'buffered', 'sqlite'), default=s3_utils.RATINGS_STORE)
+    parser.add_argument('--latency-ms', type=float, default=20, help="Stand-in mean request latency")
+    parser.add_argument('--label', default='candidate', help="Name of this build in the report")
+    parser.add_argument('--output', help="Write the report as JSON to this file")
+    parser.add_argument('--baseline', help="A report from an earlier build to compare against")
+    parser.add_argument('--verbose', action='store_true', help="Show the app's own output")
+    args = parser.parse_args()
+
+    sessions = session_trace.load_traces(args.day)
+    if args.sessions:
+        sessions = dict(sorted(sessions.items(), key=lambda item: item[1][0]['t'])[:args.sessions])
+    total_events = sum(len(events) for events in sessions.values())
+    if not sessions:
+        raise SystemExit(f"No session traces recorded on {args.day}")
+
+    output_path = os.path.abspath(args.output) if args.output else None
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+    os.chdir(load_test._workdir)  # Local fallback files land here
+    s3_utils.RATINGS_STORE = args.ratings_store
+    if args.backend == 'stand-in':
+        seed_stand_in(sessions, latency_ms=args.latency_ms)
+    requests = count_s3_requests(s3_utils.s3_client)
+    requests.clear()
+    game_logic.load_next_puzzle = _replayed_next_puzzle
+
+    print(f"Replaying {len(sessions)} sessions ({total_events} events) from {args.day} at speed {args.speed:g} "
+          f"against {args.backend} (ratings store: {args.ratings_store})")
+    origin = min(events[0]['t'] for events in sessions.values())
+    output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(open(os.devnull, 'w'))
+    start = time.monotonic()
+    with output:
+        with ThreadPoolExecutor(max_workers=min(len(sessions), REPLAY_WORKERS), thread_name_prefix="replay") as pool:
+            for events in sorted(sessions.values(), key=lambda events: events[0]['t']):
+                pool.submit(replay_session, events, origin, start, args.speed)
+    report = build_report(args.label, total_events, time.monotonic() - start, requests)
+
+    baseline = None
+    if baseline_path:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+    print_comparison(report, baseline)
+    if output_path:
+        with open(output_path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote report to {output_path}")
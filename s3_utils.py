@@ -4,10 +4,27 @@ import random
 import os
 import uuid
 import datetime
-from typing import Dict, Any, List, Optional
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, List, Optional, Tuple
 from dotenv import load_dotenv
+from botocore.config import Config
 from botocore.exceptions import ClientError
 import logging
+import fallback_puzzles
+import hedged_read
+import json_codec
+from circuit_breaker import CircuitBreaker
+import metrics
+import rating_buffer
+import ratings_store
+import shared_cache
+from answer_matching import AnswerIndex
+from puzzle_deck import PuzzleDeck
+from puzzle_sampling import WeightedPuzzleSampler
+from rating_aggregates import apply_counts
+from ratings_snapshot import RatingsTable
 
 # Load environment variables
 load_dotenv()
@@ -22,15 +39,162 @@ AWS_SECRET_ACCESS_KEY = os.getenv('AWS_SECRET_ACCESS_KEY')
 AWS_DEFAULT_REGION = os.getenv('AWS_DEFAULT_REGION', 'us-east-1')
 PUZZLE_BUCKET = os.getenv('PUZZLE_S3_BUCKET_NAME', 'word-puzzle-421')
 WEBAPP_BUCKET = os.getenv('WEBAPP_S3_BUCKET_NAME', 'word-puzzle-421-webapp')
+MAX_DRAW_ATTEMPTS = 3
+
+# Puzzle selection: 'deck' draws uniformly without repeats, 'weighted' favours
+# well-rated puzzles and a target difficulty mix
+SELECTION_MODE = os.getenv('PUZZLE_SELECTION_MODE', 'deck')
+SAMPLER_REFRESH_SECONDS = float(os.getenv('SAMPLER_REFRESH_SECONDS', '300'))
+
+# Where rating aggregates are updated: 's3' (conditional read-modify-write per
+# rating), 'buffered' (per-worker counts merged into S3 every few seconds) or
+# 'sqlite' (local ratings store, exported to S3 periodically)
+RATINGS_STORE = os.getenv('RATINGS_STORE', 's3')
+
+# Retries for conditional aggregate writes that lose a race with another worker
+RATINGS_CAS_MAX_ATTEMPTS = int(os.getenv('RATINGS_CAS_MAX_ATTEMPTS', '8'))
+RATINGS_CAS_BASE_DELAY = 0.05
+RATINGS_CAS_MAX_DELAY = 1.0
+
+# S3 error codes for a conditional write whose precondition no longer holds
+CAS_CONFLICT_CODES = ('PreconditionFailed', 'ConditionalRequestConflict', '412', '409')
+
+# S3 error codes for a conditional GET whose object has not changed
+NOT_MODIFIED_CODES = ('NotModified', '304')
+
+# Keep each S3 call short so an outage trips the circuit breakers quickly
+# instead of stacking long timeouts and retries on every click
+S3_CONNECT_TIMEOUT = float(os.getenv('S3_CONNECT_TIMEOUT', '2'))
+S3_READ_TIMEOUT = float(os.getenv('S3_READ_TIMEOUT', '5'))
+S3_MAX_ATTEMPTS = int(os.getenv('S3_MAX_ATTEMPTS', '2'))
 
 # Initialize S3 client
 s3_client = boto3.client(
     's3',
     aws_access_key_id=AWS_ACCESS_KEY_ID,
     aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-    region_name=AWS_DEFAULT_REGION
+    region_name=AWS_DEFAULT_REGION,
+    config=Config(
+        connect_timeout=S3_CONNECT_TIMEOUT,
+        read_timeout=S3_READ_TIMEOUT,
+        retries={'max_attempts': S3_MAX_ATTEMPTS, 'mode': 'standard'}
+    )
 )
 
+def is_s3_outage(error: Exception) -> bool:
+    """
+    Whether an S3 error means the service is unhealthy, as opposed to an
+    expected answer such as a missing key or a lost conditional write.
+    
+    Args:
+        error (Exception): The error raised by an S3 call
+        
+    Returns:
+        bool: True if the error should count against a circuit breaker
+    """
+    if isinstance(error, ClientError):
+        return error.response.get('Error', {}).get('Code') not in ('NoSuchKey', '404') + CAS_CONFLICT_CODES + NOT_MODIFIED_CODES
+    return True
+
+# One breaker per operation class, so failing rating writes don't stop
+# puzzles from loading and vice versa
+puzzle_breaker = CircuitBreaker('puzzles', is_failure=is_s3_outage)
+solution_breaker = CircuitBreaker('solutions', is_failure=is_s3_outage)
+ratings_breaker = CircuitBreaker('ratings', is_failure=is_s3_outage)
+profile_breaker = CircuitBreaker('profiles', is_failure=is_s3_outage)
+
+def fetch_json_object(breaker: CircuitBreaker, bucket: str, key: str,
+                      etag: Optional[str] = None) -> Optional[Tuple[Any, Optional[str]]]:
+    """
+    Read and decode a JSON object through an operation class's circuit breaker.
+    
+    Slow requests are hedged with a duplicate, and the read gives up at its
+    deadline (see hedged_read). With an ETag the GET is conditional, and an
+    unchanged object costs no body transfer.
+    
+    Args:
+        breaker (CircuitBreaker): The breaker for the object's operation class
+        bucket (str): The bucket name
+        key (str): The object key
+        etag (str, optional): ETag of the copy the caller already has
+        
+    Returns:
+        Tuple[Any, Optional[str]]: The parsed object and its ETag, or None if it
+            still matches etag
+    """
+    def fetch():
+        params = {'Bucket': bucket, 'Key': key}
+        if etag:
+            params['IfNoneMatch'] = etag
+        try:
+            response = s3_client.get_object(**params)
+        except ClientError as e:
+            if etag and e.response.get('Error', {}).get('Code') in NOT_MODIFIED_CODES:
+                return None
+            raise
+        return json_codec.decode_response(response), response.get('ETag')
+    
+    return breaker.call(lambda: hedged_read.call(breaker.name, fetch))
+
+def read_json_object(breaker: CircuitBreaker, bucket: str, key: str) -> Any:
+    """
+    Read and decode a JSON object, see fetch_json_object.
+    
+    Args:
+        breaker (CircuitBreaker): The breaker for the object's operation class
+        bucket (str): The bucket name
+        key (str): The object key
+        
+    Returns:
+        Any: The parsed object
+    """
+    return fetch_json_object(breaker, bucket, key)[0]
+
+def read_cached_json_object(namespace: str, cache_key: str, breaker: CircuitBreaker, bucket: str, key: str,
+                            ttl: float, revalidate: bool = False) -> Any:
+    """
+    Read a JSON object through the host's shared cache.
+    
+    Fresh entries are served as they are. Expired entries are revalidated with
+    a conditional GET on their ETag: a 304 just extends their lifetime. If S3
+    cannot be reached, an expired entry is served rather than failing. Hits,
+    revalidations and misses (body downloads) are counted in metrics under
+    cache.{namespace}.
+    
+    Args:
+        namespace (str): The shared cache namespace, e.g. 'puzzles'
+        cache_key (str): The key within the namespace
+        breaker (CircuitBreaker): The breaker for the object's operation class
+        bucket (str): The bucket name
+        key (str): The object key
+        ttl (float): Seconds a fetched or revalidated entry stays fresh
+        revalidate (bool): Check with S3 even if the entry is fresh
+        
+    Returns:
+        Any: The parsed object
+    """
+    entry = shared_cache.get_entry(namespace, cache_key)
+    if entry is not None and entry[2] and not revalidate:
+        metrics.increment(f'cache.{namespace}.hit')
+        return entry[0]
+    
+    try:
+        result = fetch_json_object(breaker, bucket, key, entry[1] if entry else None)
+    except Exception as e:
+        if entry is None or revalidate or not is_s3_outage(e):
+            raise
+        metrics.increment(f'cache.{namespace}.stale')
+        return entry[0]
+    
+    if result is None:
+        metrics.increment(f'cache.{namespace}.revalidated')
+        shared_cache.touch(namespace, cache_key, ttl)
+        return entry[0]
+    
+    metrics.increment(f'cache.{namespace}.miss')
+    shared_cache.put(namespace, cache_key, result[0], ttl, etag=result[1])
+    return result[0]
+
 def check_aws_configuration():
     """
     Check if AWS credentials and bucket configuration are valid.
@@ -80,19 +244,19 @@ def get_puzzle_ids() -> List[str]:
         List[str]: A list of puzzle IDs
     """
     try:
-        # List all objects in the puzzles/ directory of the puzzle bucket
-        response = s3_client.list_objects_v2(
-            Bucket=PUZZLE_BUCKET,
-            Prefix='puzzles/'
-        )
+        # List all objects in the puzzles/ directory of the puzzle bucket,
+        # following continuation tokens past the 1000-key page limit
+        paginator = s3_client.get_paginator('list_objects_v2')
+        pages = puzzle_breaker.call(lambda: list(paginator.paginate(Bucket=PUZZLE_BUCKET, Prefix='puzzles/')))
         
         # Extract puzzle IDs from the filenames
         puzzle_ids = []
-        for obj in response.get('Contents', []):
-            key = obj['Key']
-            if key.endswith('.json'):
-                puzzle_id = key.split('/')[-1].replace('.json', '')
-                puzzle_ids.append(puzzle_id)
+        for page in pages:
+            for obj in page.get('Contents', []):
+                key = obj['Key']
+                if key.endswith('.json'):
+                    puzzle_id = key.split('/')[-1].replace('.json', '')
+                    puzzle_ids.append(puzzle_id)
         
         if not puzzle_ids:
             print(f"Warning: No puzzle files found in puzzle bucket '{PUZZLE_BUCKET}' under 'puzzles/' prefix")
@@ -112,24 +276,275 @@ def get_puzzle_ids() -> List[str]:
         
         return []
 
-def get_random_puzzle() -> Optional[Dict[str, Any]]:
+# Process-wide puzzle catalog. The list is append-only so that positions stay
+# valid as indices for every session's PuzzleDeck.
+CATALOG_REFRESH_SECONDS = float(os.getenv('CATALOG_REFRESH_SECONDS', '300'))
+_catalog: List[str] = []
+_catalog_positions: Dict[str, int] = {}
+_catalog_refreshed_at = 0.0
+_catalog_lock = threading.Lock()
+
+def get_puzzle_catalog() -> List[str]:
+    """
+    Get the cached puzzle catalog, relisting the bucket at most once per
+    CATALOG_REFRESH_SECONDS.
+    
+    New puzzle IDs are appended to the end of the catalog, so an index handed
+    out earlier always refers to the same puzzle.
+    
+    Returns:
+        List[str]: The puzzle IDs, indexed by catalog position
+    """
+    global _catalog_refreshed_at
+    with _catalog_lock:
+        if _catalog and (time.time() - _catalog_refreshed_at < CATALOG_REFRESH_SECONDS or puzzle_breaker.is_open()):
+            return _catalog
+        
+        puzzle_ids = get_puzzle_ids()
+        if puzzle_ids:
+            for puzzle_id in sorted(puzzle_ids):
+                if puzzle_id not in _catalog_positions:
+                    _catalog_positions[puzzle_id] = len(_catalog)
+                    _catalog.append(puzzle_id)
+            _catalog_refreshed_at = time.time()
+        return _catalog
+
+def get_catalog_position(puzzle_id: str) -> Optional[int]:
+    """
+    Get a puzzle's position in the catalog.
+    
+    Args:
+        puzzle_id (str): The puzzle ID
+        
+    Returns:
+        int: The catalog index, or None if the puzzle is not in the catalog
+    """
+    with _catalog_lock:
+        return _catalog_positions.get(puzzle_id)
+
+# Puzzles whose images the image scan found broken or blank (see image_scan.py)
+EXCLUDED_PUZZLES_KEY = 'image_index/excluded_puzzles.json'
+_excluded_puzzles: frozenset = frozenset()
+_excluded_refreshed_at = 0.0
+_excluded_lock = threading.Lock()
+
+def get_excluded_puzzles() -> frozenset:
+    """
+    Get the puzzles selection should skip, re-reading the image scan's list at
+    most once per CATALOG_REFRESH_SECONDS.
+    
+    Returns:
+        frozenset: The excluded puzzle IDs
+    """
+    global _excluded_puzzles, _excluded_refreshed_at
+    with _excluded_lock:
+        if time.time() - _excluded_refreshed_at < CATALOG_REFRESH_SECONDS:
+            return _excluded_puzzles
+        
+        try:
+            data = read_cached_json_object(
+                'catalog', 'excluded_puzzles', puzzle_breaker, WEBAPP_BUCKET, EXCLUDED_PUZZLES_KEY,
+                CATALOG_REFRESH_SECONDS
+            )
+            _excluded_puzzles = frozenset(data.get('puzzle_ids', []))
+        except Exception as e:
+            # No scan has been written yet, or S3 is down: keep the last list
+            if is_s3_outage(e):
+                print(f"Error loading excluded puzzles: {type(e).__name__}: {str(e)}")
+        _excluded_refreshed_at = time.time()
+        return _excluded_puzzles
+
+def list_rating_etags() -> Dict[str, str]:
+    """
+    List the ETag of every per-puzzle aggregate ratings object in the webapp bucket.
+    
+    Returns:
+        Dict[str, str]: ETags keyed by puzzle ID
+    """
+    etags = {}
+    paginator = s3_client.get_paginator('list_objects_v2')
+    pages = ratings_breaker.call(lambda: list(paginator.paginate(Bucket=WEBAPP_BUCKET, Prefix='ratings/')))
+    for page in pages:
+        for obj in page.get('Contents', []):
+            key = obj['Key']
+            # Skip ratings/_snapshot and any other non-puzzle objects
+            if key.endswith('.json') and not key.startswith('ratings/_'):
+                etags[key.split('/')[-1].replace('.json', '')] = obj['ETag']
+    return etags
+
+# All aggregates in one object (see ratings_snapshot.py). Each process keeps the
+# latest snapshot as a read-only table, revalidating it by ETag at most once
+# per RATINGS_SNAPSHOT_REFRESH_SECONDS, and ignores snapshots older than
+# RATINGS_SNAPSHOT_MAX_AGE_SECONDS (e.g. if the generator has stopped).
+RATINGS_SNAPSHOT_KEY = 'ratings/_snapshot'
+RATINGS_SNAPSHOT_REFRESH_SECONDS = float(os.getenv('RATINGS_SNAPSHOT_REFRESH_SECONDS', '60'))
+RATINGS_SNAPSHOT_MAX_AGE_SECONDS = float(os.getenv('RATINGS_SNAPSHOT_MAX_AGE_SECONDS', '3600'))
+_snapshot_table: Optional[RatingsTable] = None
+_snapshot_etag: Optional[str] = None
+_snapshot_checked_at = 0.0
+_snapshot_lock = threading.Lock()
+
+def get_ratings_snapshot() -> Optional[RatingsTable]:
+    """
+    Get the current ratings snapshot table.
+    
+    Returns:
+        RatingsTable: The table, or None if there is no usable snapshot
+    """
+    global _snapshot_table, _snapshot_etag, _snapshot_checked_at
+    with _snapshot_lock:
+        if time.time() - _snapshot_checked_at >= RATINGS_SNAPSHOT_REFRESH_SECONDS:
+            _snapshot_checked_at = time.time()
+            try:
+                result = fetch_json_object(ratings_breaker, WEBAPP_BUCKET, RATINGS_SNAPSHOT_KEY, _snapshot_etag)
+                if result is not None:
+                    _snapshot_table = RatingsTable(result[0])
+                    _snapshot_etag = result[1]
+                    metrics.increment('ratings.snapshot_loaded')
+            except Exception as e:
+                # No snapshot written yet, or S3 is down: keep the last table
+                if is_s3_outage(e):
+                    print(f"Error loading ratings snapshot: {type(e).__name__}: {str(e)}")
+        
+        if _snapshot_table is None or _snapshot_table.age_seconds() > RATINGS_SNAPSHOT_MAX_AGE_SECONDS:
+            return None
+        return _snapshot_table
+
+# Process-wide copy of every aggregate ratings object, used when there is no
+# usable snapshot and refreshed incrementally by ETag in a background thread,
+# AGGREGATE_READ_WORKERS objects at a time. The dicts are replaced, never
+# changed, so callers can keep the ones they were given. The version number
+# changes whenever any aggregate changes.
+AGGREGATE_READ_WORKERS = 16
+_aggregates: Dict[str, Dict[str, Any]] = {}
+_aggregate_etags: Dict[str, str] = {}
+_aggregates_version = 0
+_aggregates_checked_at = 0.0
+_aggregates_refreshing = False
+_aggregates_table: Optional[RatingsTable] = None
+_aggregates_lock = threading.Lock()
+
+def _refresh_aggregates():
+    global _aggregates, _aggregate_etags, _aggregates_version, _aggregates_refreshing
+    try:
+        etags = list_rating_etags()
+        with _aggregates_lock:
+            known = _aggregate_etags
+        changed = [puzzle_id for puzzle_id, etag in etags.items() if known.get(puzzle_id) != etag]
+        with ThreadPoolExecutor(max_workers=AGGREGATE_READ_WORKERS, thread_name_prefix="aggregates") as pool:
+            fetched = list(zip(changed, pool.map(lambda puzzle_id: get_puzzle_ratings(puzzle_id, use_cache=False), changed)))
+        
+        with _aggregates_lock:
+            aggregates = {puzzle_id: ratings for puzzle_id, ratings in _aggregates.items() if puzzle_id in etags}
+            aggregate_etags = {puzzle_id: etag for puzzle_id, etag in _aggregate_etags.items() if puzzle_id in etags}
+            for puzzle_id, ratings in fetched:
+                if ratings is None:
+                    continue  # Retried on the next check
+                aggregates[puzzle_id] = ratings
+                aggregate_etags[puzzle_id] = etags[puzzle_id]
+            if aggregate_etags != _aggregate_etags:
+                _aggregates, _aggregate_etags = aggregates, aggregate_etags
+                _aggregates_version += 1
+        print(f"Refreshed aggregate ratings: {len(changed)} of {len(etags)} puzzles re-read")
+    except Exception as e:
+        print(f"Error refreshing aggregate ratings: {type(e).__name__}: {str(e)}")
+    finally:
+        with _aggregates_lock:
+            _aggregates_refreshing = False
+
+def get_all_puzzle_ratings() -> Tuple[Dict[str, Dict[str, Any]], int]:
+    """
+    Get the aggregate ratings of every puzzle from the ratings snapshot or,
+    without one, from this process's copy of the per-puzzle objects.
+    
+    The copy is checked for changes at most once per SAMPLER_REFRESH_SECONDS,
+    in a background thread that re-fetches only changed objects. Callers never
+    wait for it; until the first check finishes every puzzle looks unrated, so
+    weighted and adaptive draws are uniform.
+    
+    Returns:
+        Tuple[Dict[str, Dict[str, Any]], int]: Aggregates keyed by puzzle ID, and a
+            version number that changes whenever the aggregates do
+    """
+    global _aggregates_version, _aggregates_checked_at, _aggregates_refreshing, _aggregates_table
+    table = get_ratings_snapshot()
+    with _aggregates_lock:
+        if table is not None:
+            if table is not _aggregates_table:
+                _aggregates_table = table
+                _aggregates_version += 1
+            return table.as_dict(), _aggregates_version
+        
+        if not _aggregates_refreshing and time.time() - _aggregates_checked_at >= SAMPLER_REFRESH_SECONDS:
+            _aggregates_refreshing = True
+            _aggregates_checked_at = time.time()
+            threading.Thread(target=_refresh_aggregates, name="aggregates-refresh", daemon=True).start()
+        return _aggregates, _aggregates_version
+
+_weighted_sampler = WeightedPuzzleSampler()
+
+def get_weighted_sampler() -> WeightedPuzzleSampler:
+    """
+    Get the process-wide weighted sampler, rebuilt whenever the catalog, the
+    aggregate ratings or the excluded puzzles change.
+    
+    Returns:
+        WeightedPuzzleSampler: The sampler
+    """
+    ratings_by_id, version = get_all_puzzle_ratings()
+    _weighted_sampler.refresh(get_puzzle_catalog(), ratings_by_id, version, get_excluded_puzzles())
+    return _weighted_sampler
+
+def get_random_puzzle(deck: Optional[PuzzleDeck] = None, mode: Optional[str] = None) -> Optional[Dict[str, Any]]:
     """
     Get a random puzzle from the puzzle bucket.
     
+    Args:
+        deck (PuzzleDeck, optional): The session's deck. When given, puzzles are
+            drawn from it without repeats until the whole catalog has been seen.
+        mode (str, optional): 'deck' or 'weighted'; defaults to SELECTION_MODE
+    
     Returns:
         Dict[str, Any]: A puzzle dictionary with images and descriptions
     """
     try:
-        puzzle_ids = get_puzzle_ids()
-        if not puzzle_ids:
+        # While the puzzle bucket is unreachable, serve puzzles this host has cached
+        if puzzle_breaker.is_open():
+            for cached_id in shared_cache.sample_keys('puzzles', MAX_DRAW_ATTEMPTS):
+                if cached_id in get_excluded_puzzles():
+                    continue
+                puzzle = get_puzzle_by_id(cached_id)
+                if puzzle:
+                    return puzzle
+            return load_example_puzzle()
+        
+        mode = mode or SELECTION_MODE
+        catalog = get_puzzle_catalog()
+        if not catalog:
             print("No puzzle IDs found in S3, falling back to example puzzle")
             return load_example_puzzle()
         
-        # Select a random puzzle ID
-        random_id = random.choice(puzzle_ids)
-        print(f"Selected random puzzle ID: {random_id}")
+        # Puzzles removed from the bucket keep their catalog slot, and puzzles
+        # with broken images are skipped, so retry a few draws before giving up
+        for _ in range(MAX_DRAW_ATTEMPTS):
+            index = None
+            if mode == 'weighted':
+                index = get_weighted_sampler().draw()
+                if index is None:
+                    break  # Every puzzle is broken or excluded
+            elif deck is not None:
+                deck.extend(len(catalog))
+                index = deck.draw()
+            random_id = catalog[index] if index is not None else random.choice(catalog)
+            if random_id in get_excluded_puzzles():
+                continue
+            print(f"Selected random puzzle ID: {random_id}")
+            
+            puzzle = get_puzzle_by_id(random_id)
+            if puzzle:
+                return puzzle
         
-        return get_puzzle_by_id(random_id)
+        return load_example_puzzle()
     except Exception as e:
         print(f"Error in get_random_puzzle: {type(e).__name__}: {str(e)}")
         import traceback
@@ -146,15 +561,20 @@ def get_puzzle_by_id(puzzle_id: str) -> Optional[Dict[str, Any]]:
     Returns:
         Dict[str, Any]: The puzzle data
     """
+    fallback = fallback_puzzles.get_puzzle(puzzle_id)
+    if fallback is not None:
+        return fallback
+    
     try:
-        # Get the puzzle JSON file from the puzzle bucket
-        response = s3_client.get_object(
-            Bucket=PUZZLE_BUCKET,
-            Key=f'puzzles/{puzzle_id}.json'
+        # Get the puzzle JSON, from the host's shared cache when another
+        # process has already fetched it from the puzzle bucket
+        puzzle_data = read_cached_json_object(
+            'puzzles', puzzle_id, puzzle_breaker, PUZZLE_BUCKET, f'puzzles/{puzzle_id}.json',
+            shared_cache.PUZZLE_CACHE_TTL
         )
         
-        # Parse the JSON
-        puzzle_data = json.loads(response['Body'].read().decode('utf-8'))
+        # Pre-signed URLs expire, so they are generated per load rather than cached
+        puzzle_data = dict(puzzle_data, image_urls=dict(puzzle_data.get('image_urls', {})))
         
         # Add the puzzle ID to the data
         puzzle_data['id'] = puzzle_id
@@ -168,45 +588,61 @@ def get_puzzle_by_id(puzzle_id: str) -> Optional[Dict[str, Any]]:
         print(f"Error getting puzzle {puzzle_id}: {e}")
         return None
 
-def validate_answer(puzzle_id: str, guess: str) -> bool:
+# Solutions rarely change, so each process keeps the ones it has fetched and
+# indexes their normalized answers for matching
+_solution_cache: Dict[str, Dict[str, Any]] = {}
+answer_index = AnswerIndex()
+
+def get_solution_data(puzzle_id: str) -> Dict[str, Any]:
+    """
+    Get the solution record for a puzzle, fetching it from the puzzle bucket
+    only the first time.
+    
+    Args:
+        puzzle_id (str): The puzzle ID
+        
+    Returns:
+        Dict[str, Any]: The solution data
+    """
+    if puzzle_id in _solution_cache:
+        return _solution_cache[puzzle_id]
+    
+    # Fallback puzzles are answered from the in-memory corpus
+    solution_data = fallback_puzzles.get_solution(puzzle_id)
+    if solution_data is None:
+        # Normal S3 solution path - check in solutions_by_id folder in puzzle bucket
+        solution_data = read_cached_json_object(
+            'solutions', puzzle_id, solution_breaker, PUZZLE_BUCKET, f'solutions_by_id/{puzzle_id}.json',
+            shared_cache.SOLUTION_CACHE_TTL
+        )
+    
+    _solution_cache[puzzle_id] = solution_data
+    answer_index.add_solution(puzzle_id, solution_data)
+    return solution_data
+
+def validate_answer(puzzle_id: str, guess: str, strict: bool = False) -> bool:
     """
     Validate the user's guess against the correct answer from the puzzle bucket.
     
+    Accents, case, spacing and plurals are ignored, and small typos are
+    accepted according to the puzzle's answer matching settings.
+    
     Args:
         puzzle_id (str): The puzzle ID
         guess (str): The user's guess
+        strict (bool): Raise if the answer cannot be looked up, instead of
+            treating the guess as wrong. Use this when the result is kept.
         
     Returns:
         bool: True if the guess is correct, False otherwise
     """
     try:
-        # Special handling for fallback puzzles
-        if puzzle_id == "dummy-puzzle":
-            return guess.lower() == "apple"
-        
-        # Try to load from example solution for the example puzzle
-        if puzzle_id == "2d5a7f8e-9b3c-4d12-a8f6-1e2c3b4d5e6f":
-            try:
-                with open("example_solution.json", 'r') as f:
-                    solution_data = json.load(f)
-                return solution_data.get('target_word', '').lower() == guess.lower()
-            except:
-                # Hardcoded fallback for the example puzzle
-                return guess.lower() == "base"
-        
-        # Normal S3 solution path - check in solutions_by_id folder in puzzle bucket
-        # Get the solution JSON file
-        response = s3_client.get_object(
-            Bucket=PUZZLE_BUCKET,
-            Key=f'solutions_by_id/{puzzle_id}.json'
-        )
-        
-        # Parse the JSON
-        solution_data = json.loads(response['Body'].read().decode('utf-8'))
-        
-        # Compare the guess with the target word (case-insensitive)
-        return solution_data.get('target_word', '').lower() == guess.lower()
+        if puzzle_id not in answer_index:
+            get_solution_data(puzzle_id)
+        return answer_index.match(puzzle_id, guess)
     except Exception as e:
+        if strict:
+            raise
         print(f"Error validating answer for puzzle {puzzle_id}: {type(e).__name__}: {str(e)}")
         # For unknown puzzles, always return false
         return False
@@ -222,31 +658,7 @@ def get_solution(puzzle_id: str) -> Optional[str]:
         str: The target word
     """
     try:
-        # Special handling for fallback puzzles
-        if puzzle_id == "dummy-puzzle":
-            return "apple"
-            
-        # Try to load from example solution for the example puzzle
-        if puzzle_id == "2d5a7f8e-9b3c-4d12-a8f6-1e2c3b4d5e6f":
-            try:
-                with open("example_solution.json", 'r') as f:
-                    solution_data = json.load(f)
-                return solution_data.get('target_word', 'base')
-            except:
-                # Hardcoded fallback for the example puzzle
-                return "base"
-        
-        # Normal S3 path - check in solutions_by_id folder in puzzle bucket
-        # Get the solution JSON file
-        response = s3_client.get_object(
-            Bucket=PUZZLE_BUCKET,
-            Key=f'solutions_by_id/{puzzle_id}.json'
-        )
-        
-        # Parse the JSON
-        solution_data = json.loads(response['Body'].read().decode('utf-8'))
-        
-        return solution_data.get('target_word', '')
+        return get_solution_data(puzzle_id).get('target_word', '')
     except Exception as e:
         print(f"Error getting solution for puzzle {puzzle_id}: {type(e).__name__}: {str(e)}")
         return "unknown"
@@ -278,91 +690,178 @@ def generate_image_url(image_name: str) -> str:
 
 def load_example_puzzle() -> Dict[str, Any]:
     """
-    Load the example puzzle as a fallback when S3 is not available.
+    Get a random puzzle from the bundled fallback corpus, for when S3 is not
+    available. The corpus and its images are held in memory.
     
     Returns:
-        Dict[str, Any]: The example puzzle data
-    """
-    try:
-        # Path to example puzzle file
-        example_puzzle_path = "example_puzzle.json"
-        
-        # Check if the file exists
-        if not os.path.exists(example_puzzle_path):
-            print(f"Error: Example puzzle file not found at {example_puzzle_path}")
-            return create_dummy_puzzle()
-        
-        # Load the example puzzle
-        with open(example_puzzle_path, 'r') as f:
-            puzzle_data = json.load(f)
-        
-        # Add placeholder URLs for images (locally served images)
-        for key in puzzle_data.get('image_urls', {}):
-            # Use placeholders that would be valid in Streamlit
-            puzzle_data['image_urls'][key] = f"https://via.placeholder.com/300?text=Example+Image+{key}"
-        
-        print("Successfully loaded example puzzle as fallback")
-        return puzzle_data
-    except Exception as e:
-        print(f"Error loading example puzzle: {type(e).__name__}: {str(e)}")
-        return create_dummy_puzzle()
-
-def create_dummy_puzzle() -> Dict[str, Any]:
+        Dict[str, Any]: A fallback puzzle, with image bytes in 'image_urls'
     """
-    Create a dummy puzzle as a last resort fallback.
-    
-    Returns:
-        Dict[str, Any]: A simple dummy puzzle
-    """
-    print("Creating dummy puzzle as ultimate fallback")
-    return {
-        "id": "dummy-puzzle",
-        "descriptions": {
-            "1": "A round fruit with red or green skin",
-            "2": "A tech company with a fruit logo",
-            "3": "A famous city nicknamed 'The Big Apple'",
-            "4": "The fruit mentioned in the story of Adam and Eve"
-        },
-        "image_urls": {
-            "1": "https://via.placeholder.com/300?text=Apple+Fruit",
-            "2": "https://via.placeholder.com/300?text=Apple+Company",
-            "3": "https://via.placeholder.com/300?text=New+York",
-            "4": "https://via.placeholder.com/300?text=Garden+of+Eden"
-        }
-    }
+    puzzle_data = fallback_puzzles.random_puzzle()
+    print(f"Serving fallback puzzle {puzzle_data['id']}")
+    return puzzle_data
 
 # Rating Functions
 
-def get_puzzle_ratings(puzzle_id: str) -> Optional[Dict[str, Any]]:
+def get_puzzle_ratings(puzzle_id: str, use_cache: bool = True) -> Optional[Dict[str, Any]]:
     """
     Get ratings for a puzzle from the webapp bucket.
     
     Args:
         puzzle_id (str): The puzzle ID
+        use_cache (bool): Whether a recent copy from the shared cache is acceptable.
+            Pass False before a read-modify-write.
         
     Returns:
         Dict[str, Any]: The ratings data, or None if no ratings exist
     """
+    ratings_data = None
     try:
-        # Get the ratings JSON file from the webapp bucket
-        response = s3_client.get_object(
-            Bucket=WEBAPP_BUCKET,
-            Key=f'ratings/{puzzle_id}.json'
-        )
+        # The local ratings store has this host's latest counts
+        if RATINGS_STORE == 'sqlite':
+            ratings_data = ratings_store.get_ratings(puzzle_id)
+            if ratings_data is not None:
+                return ratings_data
         
-        # Parse the JSON
-        ratings_data = json.loads(response['Body'].read().decode('utf-8'))
-        return ratings_data
+        # Reads that tolerate some staleness come from the snapshot table;
+        # puzzles missing from it had no ratings when it was taken
+        table = get_ratings_snapshot() if use_cache else None
+        if table is not None:
+            ratings_data = table.get(puzzle_id)
+        else:
+            # Get the ratings JSON file from the webapp bucket, or confirm the
+            # cached copy is current
+            ratings_data = read_cached_json_object(
+                'ratings', puzzle_id, ratings_breaker, WEBAPP_BUCKET, f'ratings/{puzzle_id}.json',
+                shared_cache.RATINGS_CACHE_TTL, revalidate=not use_cache
+            )
     except Exception as e:
         print(f"Info: No ratings found for puzzle {puzzle_id}: {type(e).__name__}: {str(e)}")
+    
+    # Include this worker's ratings that have not been flushed yet
+    if RATINGS_STORE == 'buffered':
+        ratings_data = rating_buffer.pending_ratings(ratings_data, puzzle_id)
+    return ratings_data
+
+def read_puzzle_ratings(puzzle_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Read a puzzle's aggregates straight from the webapp bucket, with no cache
+    and no local store.
+    
+    Args:
+        puzzle_id (str): The puzzle ID
+        
+    Returns:
+        Dict[str, Any]: The aggregates, or None only if the puzzle has none
+        
+    Raises:
+        Exception: Any error other than the object not existing
+    """
+    try:
+        return read_json_object(ratings_breaker, WEBAPP_BUCKET, f'ratings/{puzzle_id}.json')
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') not in ('NoSuchKey', '404'):
+            raise
         return None
 
+def apply_rating(current_ratings: Optional[Dict[str, Any]], puzzle_id: str, target_word: str,
+                 difficulty_rating: str, issue_rating: str) -> Dict[str, Any]:
+    """
+    Build the aggregate ratings object that results from adding one rating.
+    
+    Args:
+        current_ratings (Dict[str, Any]): The current aggregates, or None if there are none yet
+        puzzle_id (str): The puzzle ID
+        target_word (str): The solution word
+        difficulty_rating (str): One of "easy", "medium", "hard"
+        issue_rating (str): One of "bad_images", "bad_puzzle", "no_issues"
+        
+    Returns:
+        Dict[str, Any]: The updated aggregates
+    """
+    return apply_counts(current_ratings, puzzle_id, target_word, {difficulty_rating: 1}, {issue_rating: 1}, 1)
+
+def update_json_object(breaker: CircuitBreaker, bucket: str, key: str, update: Callable[[Optional[Any]], Any],
+                       metric: str) -> Tuple[Any, Optional[str]]:
+    """
+    Atomically replace a JSON object using ETag compare-and-swap.
+    
+    The object is read with its ETag and written back with If-Match (or
+    If-None-Match for a new object), so a concurrent write from another worker
+    makes ours fail instead of silently overwriting it. On conflict the update
+    is re-applied to the fresh object after a jittered backoff.
+    
+    Args:
+        breaker (CircuitBreaker): The breaker for the object's operation class
+        bucket (str): The bucket name
+        key (str): The object key
+        update (Callable): Builds the new object from the current one (None if
+            there is none yet). May be called more than once.
+        metric (str): Prefix of the metrics recorded, e.g. 'ratings'
+        
+    Returns:
+        Tuple[Any, Optional[str]]: The object that was written, and its ETag
+    """
+    with metrics.timed(f'{metric}.cas_update'):
+        for attempt in range(RATINGS_CAS_MAX_ATTEMPTS):
+            try:
+                response = breaker.call(lambda: s3_client.get_object(Bucket=bucket, Key=key))
+                current = json_codec.decode_response(response)
+                condition = {'IfMatch': response['ETag']}
+            except ClientError as e:
+                if e.response.get('Error', {}).get('Code') not in ('NoSuchKey', '404'):
+                    raise
+                current = None
+                condition = {'IfNoneMatch': '*'}
+            
+            updated = update(current)
+            body, headers = json_codec.encode(updated)
+            metrics.increment(f'{metric}.cas_attempts')
+            try:
+                response = breaker.call(
+                    lambda: s3_client.put_object(Bucket=bucket, Key=key, Body=body, **headers, **condition)
+                )
+            except ClientError as e:
+                if e.response.get('Error', {}).get('Code') not in CAS_CONFLICT_CODES:
+                    raise
+                metrics.increment(f'{metric}.cas_conflicts')
+                # Full jitter keeps workers that collided from colliding again
+                time.sleep(random.uniform(0, min(RATINGS_CAS_MAX_DELAY, RATINGS_CAS_BASE_DELAY * 2 ** attempt)))
+                continue
+            return updated, response.get('ETag')
+    
+    metrics.increment(f'{metric}.cas_exhausted')
+    raise RuntimeError(f"Gave up updating {key} after {RATINGS_CAS_MAX_ATTEMPTS} conflicting writes")
+
+def update_puzzle_ratings(puzzle_id: str,
+                          update: Callable[[Optional[Dict[str, Any]]], Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Atomically replace a puzzle's aggregate ratings, see update_json_object.
+    
+    Args:
+        puzzle_id (str): The puzzle ID
+        update (Callable): Builds the new aggregates from the current ones
+            (None if there are none yet). May be called more than once.
+        
+    Returns:
+        Dict[str, Any]: The aggregates that were written
+    """
+    updated_ratings, etag = update_json_object(
+        ratings_breaker, WEBAPP_BUCKET, f'ratings/{puzzle_id}.json', update, 'ratings'
+    )
+    shared_cache.put('ratings', puzzle_id, updated_ratings, shared_cache.RATINGS_CACHE_TTL, etag=etag)
+    return updated_ratings
+
 def submit_puzzle_rating(puzzle_id: str, target_word: str, difficulty_rating: str, issue_rating: str, 
                         time_to_solve: float, hints_used: bool, session_id: str, was_skipped: bool = False,
                         player_name: str = None) -> bool:
     """
     Submit a rating for a puzzle and update aggregate ratings in the webapp bucket.
     
+    With RATINGS_STORE=buffered the counts are accumulated in memory and merged
+    into the webapp bucket every RATING_FLUSH_SECONDS. With RATINGS_STORE=sqlite
+    the aggregates are updated in the local ratings store instead and exported
+    to the webapp bucket periodically.
+    
     Args:
         puzzle_id (str): The puzzle ID
         target_word (str): The solution word
@@ -391,58 +890,25 @@ def submit_puzzle_rating(puzzle_id: str, target_word: str, difficulty_rating: st
             player_name=player_name
         )
         
-        # Then update the aggregate ratings
-        # Get current ratings if they exist
-        current_ratings = get_puzzle_ratings(puzzle_id)
+        if RATINGS_STORE == 'sqlite':
+            ratings_store.record_rating(
+                puzzle_id, target_word, difficulty_rating, issue_rating,
+                load_seed=lambda: read_puzzle_ratings(puzzle_id)
+            )
+            ratings_store.start_export_thread(update_puzzle_ratings)
+            print(f"Recorded rating for puzzle {puzzle_id} in the local ratings store")
+            return True
         
-        if current_ratings:
-            # Update existing ratings
-            difficulty_stats = current_ratings['difficulty']
-            issue_stats = current_ratings['fun']  # We'll use the 'fun' field for issue tracking
-            total = current_ratings['total_ratings']
-            
-            # Update difficulty stats
-            difficulty_stats[difficulty_rating] = difficulty_stats.get(difficulty_rating, 0) + 1
-            
-            # Update issue stats
-            issue_stats[issue_rating] = issue_stats.get(issue_rating, 0) + 1
-            
-            # Create updated ratings object
-            updated_ratings = {
-                "puzzle_id": puzzle_id,
-                "target_word": target_word,
-                "difficulty": difficulty_stats,
-                "fun": issue_stats,  # Using 'fun' field for issue tracking
-                "total_ratings": total + 1,
-                "last_updated": datetime.datetime.utcnow().isoformat()
-            }
-        else:
-            # Create new ratings object
-            updated_ratings = {
-                "puzzle_id": puzzle_id,
-                "target_word": target_word,
-                "difficulty": {
-                    difficulty_rating: 1,
-                    "easy": 0,
-                    "medium": 0,
-                    "hard": 0
-                },
-                "fun": {  # Using 'fun' field for issue tracking
-                    issue_rating: 1,
-                    "bad_images": 0,
-                    "bad_puzzle": 0,
-                    "no_issues": 0
-                },
-                "total_ratings": 1,
-                "last_updated": datetime.datetime.utcnow().isoformat()
-            }
+        if RATINGS_STORE == 'buffered':
+            rating_buffer.record_rating(puzzle_id, target_word, difficulty_rating, issue_rating)
+            rating_buffer.start_flush_thread(update_puzzle_ratings)
+            print(f"Buffered rating for puzzle {puzzle_id}")
+            return True
         
-        # Save the updated ratings to the webapp bucket
-        s3_client.put_object(
-            Bucket=WEBAPP_BUCKET,
-            Key=f'ratings/{puzzle_id}.json',
-            Body=json.dumps(updated_ratings, indent=2),
-            ContentType='application/json'
+        # Then update the aggregate ratings, retrying if another worker wins the race
+        update_puzzle_ratings(
+            puzzle_id,
+            lambda current: apply_rating(current, puzzle_id, target_word, difficulty_rating, issue_rating)
         )
         
         print(f"Successfully updated ratings for puzzle {puzzle_id}")
@@ -456,49 +922,8 @@ def submit_puzzle_rating(puzzle_id: str, target_word: str, difficulty_rating: st
             os.makedirs(ratings_dir, exist_ok=True)
             
             with open(f"{ratings_dir}/{puzzle_id}.json", 'w') as f:
-                if current_ratings:
-                    # Update existing ratings
-                    difficulty_stats = current_ratings['difficulty']
-                    issue_stats = current_ratings['fun']  # We'll use the 'fun' field for issue tracking
-                    total = current_ratings['total_ratings']
-                    
-                    # Update difficulty stats
-                    difficulty_stats[difficulty_rating] = difficulty_stats.get(difficulty_rating, 0) + 1
-                    
-                    # Update issue stats
-                    issue_stats[issue_rating] = issue_stats.get(issue_rating, 0) + 1
-                    
-                    # Create updated ratings object
-                    updated_ratings = {
-                        "puzzle_id": puzzle_id,
-                        "target_word": target_word,
-                        "difficulty": difficulty_stats,
-                        "fun": issue_stats,  # Using 'fun' field for issue tracking
-                        "total_ratings": total + 1,
-                        "last_updated": datetime.datetime.utcnow().isoformat()
-                    }
-                else:
-                    # Create new ratings object
-                    updated_ratings = {
-                        "puzzle_id": puzzle_id,
-                        "target_word": target_word,
-                        "difficulty": {
-                            difficulty_rating: 1,
-                            "easy": 0,
-                            "medium": 0,
-                            "hard": 0
-                        },
-                        "fun": {  # Using 'fun' field for issue tracking
-                            issue_rating: 1,
-                            "bad_images": 0,
-                            "bad_puzzle": 0,
-                            "no_issues": 0
-                        },
-                        "total_ratings": 1,
-                        "last_updated": datetime.datetime.utcnow().isoformat()
-                    }
-                
-                json.dump(updated_ratings, f, indent=2)
+                updated_ratings = apply_rating(get_puzzle_ratings(puzzle_id), puzzle_id, target_word, difficulty_rating, issue_rating)
+                f.write(json_codec.dumps(updated_ratings))
             print(f"Saved ratings to local file as fallback for puzzle {puzzle_id}")
         except Exception as local_err:
             print(f"Error saving ratings locally: {local_err}")
@@ -554,34 +979,11 @@ def log_individual_rating(puzzle_id: str, target_word: str, difficulty_rating: s
             }
         }
         
-        # Try to get existing log file from the webapp bucket
-        try:
-            response = s3_client.get_object(
-                Bucket=WEBAPP_BUCKET,
-                Key=log_key
-            )
-            
-            # Parse existing logs
-            existing_logs = json.loads(response['Body'].read().decode('utf-8'))
-            
-            # Append new log
-            existing_logs.append(log_entry)
-            
-            # Save updated logs to the webapp bucket
-            s3_client.put_object(
-                Bucket=WEBAPP_BUCKET,
-                Key=log_key,
-                Body=json.dumps(existing_logs, indent=2),
-                ContentType='application/json'
-            )
-        except:
-            # File doesn't exist, create new log file with single entry in the webapp bucket
-            s3_client.put_object(
-                Bucket=WEBAPP_BUCKET,
-                Key=log_key,
-                Body=json.dumps([log_entry], indent=2),
-                ContentType='application/json'
-            )
+        # Append to the hour's log with a conditional write, so concurrent
+        # ratings never overwrite each other's entries
+        update_json_object(
+            ratings_breaker, WEBAPP_BUCKET, log_key, lambda logs: (logs or []) + [log_entry], 'ratings_log'
+        )
         
         print(f"Successfully logged individual rating for puzzle {puzzle_id}")
         return True
@@ -628,13 +1030,58 @@ def log_individual_rating(puzzle_id: str, target_word: str, difficulty_rating: s
                 existing_logs.append(log_entry)
                 
                 with open(log_file, 'w') as f:
-                    json.dump(existing_logs, f, indent=2)
+                    f.write(json_codec.dumps(existing_logs))
             else:
                 with open(log_file, 'w') as f:
-                    json.dump([log_entry], f, indent=2)
+                    f.write(json_codec.dumps([log_entry]))
                     
             print(f"Saved rating log to local file as fallback")
         except Exception as local_err:
             print(f"Error saving rating log locally: {local_err}")
         
-        return False 
\ No newline at end of file
+        return False 
+
+def get_rating_logs(hour: datetime.datetime, strict: bool = False) -> List[Dict[str, Any]]:
+    """
+    Get the individual rating log entries for one hour, from the webapp
+    bucket and from the local fallback logs.
+    
+    Args:
+        hour (datetime.datetime): Any time within the hour (UTC)
+        strict (bool): Raise if a log exists but cannot be read, instead of
+            returning the entries read so far. Use this when the result is
+            saved as a complete count.
+        
+    Returns:
+        List[Dict[str, Any]]: The log entries, empty if nothing was logged
+    """
+    hour_key = hour.strftime('%Y-%m-%d-%H')
+    entries = []
+    
+    try:
+        response = s3_client.get_object(
+            Bucket=WEBAPP_BUCKET,
+            Key=f"ratings_log/{hour_key}.json"
+        )
+        entries.extend(json_codec.decode_response(response))
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') not in ('NoSuchKey', '404'):
+            if strict:
+                raise
+            print(f"Error reading rating log {hour_key}: {type(e).__name__}: {str(e)}")
+    except Exception as e:
+        if strict:
+            raise
+        print(f"Error reading rating log {hour_key}: {type(e).__name__}: {str(e)}")
+    
+    local_path = f"local_rating_logs/{hour_key}.json"
+    if os.path.exists(local_path):
+        try:
+            with open(local_path, 'r') as f:
+                entries.extend(json.load(f))
+        except Exception as e:
+            if strict:
+                raise
+            print(f"Error reading local rating log {local_path}: {e}")
+    
+    return entries
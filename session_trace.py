@@ -0,0 +1,187 @@
+import datetime
+import functools
+import inspect
+import os
+import threading
+import time
+import uuid
+from typing import Dict, Any, List, Optional
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+import background
+import json_codec
+import metrics
+import s3_utils
+
+# Opt-in recording of each browser session's game_logic calls, for replay
+# with replay_sessions.py. Events are buffered per worker and written to
+# session_traces/{YYYY-MM-DD}/ in the webapp bucket every
+# SESSION_TRACE_FLUSH_SECONDS (and at shutdown).
+SESSION_TRACE = os.getenv('SESSION_TRACE', 'false').lower() == 'true'
+SESSION_TRACE_FLUSH_SECONDS = float(os.getenv('SESSION_TRACE_FLUSH_SECONDS', '60'))
+# Events buffered per worker; while S3 is unreachable the oldest are dropped
+# and counted in session_trace.dropped
+SESSION_TRACE_MAX_BUFFERED = int(os.getenv('SESSION_TRACE_MAX_BUFFERED', '50000'))
+TRACE_PREFIX = 'session_traces/'
+
+# The player actions a replay re-executes
+TRACED_CALLS = (
+    'initialize_game_state', 'resume_game_state', 'load_next_puzzle', 'check_answer',
+    'reveal_hints', 'skip_puzzle', 'solve_puzzle', 'submit_rating', 'skip_rating'
+)
+# Arguments that are credentials and are never recorded: a profile key is all
+# it takes to resume someone's game
+REDACTED_ARGS = frozenset(('key',))
+
+_local = threading.local()
+_lock = threading.Lock()
+_events: List[Dict[str, Any]] = []
+
+def served_puzzle_id(result: Any) -> Optional[str]:
+    """
+    Get the ID of the puzzle a game_logic call left the player on.
+
+    Args:
+        result: The call's return value: a game state, a (state, answer)
+            tuple, a puzzle, or anything else
+
+    Returns:
+        str: The puzzle ID, or None if the result does not carry one
+    """
+    if isinstance(result, tuple) and result:
+        result = result[0]
+    if not isinstance(result, dict):
+        return None
+    if 'descriptions' in result:
+        return result.get('id')
+    return (result.get('current_puzzle') or {}).get('id')
+
+def _trim_events():
+    # Caller holds _lock
+    excess = len(_events) - SESSION_TRACE_MAX_BUFFERED
+    if excess > 0:
+        del _events[:excess]
+        metrics.increment('session_trace.dropped', excess)
+
+def record(session: str, call: str, args: Dict[str, Any], puzzle_id: Optional[str],
+           started_at: float, duration: float):
+    """
+    Buffer one traced call.
+
+    Args:
+        session (str): The browser session ID
+        call (str): The game_logic function name
+        args (Dict[str, Any]): Its plain (str, number, bool) arguments by name,
+            without REDACTED_ARGS
+        puzzle_id (str): The puzzle the player was on afterwards
+        started_at (float): time.time() when the call started, which replays pace by
+        duration (float): Seconds the call took
+    """
+    event = {
+        "session": session, "t": started_at, "call": call, "args": args,
+        "puzzle_id": puzzle_id, "ms": round(duration * 1000, 2)
+    }
+    with _lock:
+        _events.append(event)
+        _trim_events()
+    start_flush_thread()
+
+def instrument(module: Any):
+    """
+    Wrap the module's TRACED_CALLS so calls made on a Streamlit script thread
+    are recorded. Calls nested in another traced call (e.g. the
+    load_next_puzzle inside skip_puzzle) are not recorded separately. Safe to
+    call on every rerun; functions are only wrapped once.
+
+    Args:
+        module: The game_logic module
+    """
+    if not SESSION_TRACE:
+        return
+    for name in TRACED_CALLS:
+        fn = getattr(module, name)
+        if getattr(fn, '__traced__', False):
+            continue
+
+        def wrap(fn=fn, name=name):
+            signature = inspect.signature(fn)
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                ctx = get_script_run_ctx(suppress_warning=True)
+                if ctx is None or getattr(_local, 'depth', 0):
+                    return fn(*args, **kwargs)
+
+                _local.depth = 1
+                started_at = time.time()
+                start = time.perf_counter()
+                try:
+                    result = fn(*args, **kwargs)
+                finally:
+                    _local.depth = 0
+                duration = time.perf_counter() - start
+                bound = signature.bind(*args, **kwargs).arguments
+                plain = {
+                    key: value for key, value in bound.items()
+                    if key not in REDACTED_ARGS and isinstance(value, (str, int, float, bool))
+                }
+                record(ctx.session_id, name, plain, served_puzzle_id(result), started_at, duration)
+                return result
+            wrapper.__traced__ = True
+            return wrapper
+
+        setattr(module, name, wrap())
+
+def flush_traces() -> int:
+    """
+    Write the buffered events to the webapp bucket as one object. Events that
+    fail to write are kept for the next flush, up to SESSION_TRACE_MAX_BUFFERED.
+
+    Returns:
+        int: Number of events written
+    """
+    with _lock:
+        batch = list(_events)
+        _events.clear()
+    if not batch:
+        return 0
+
+    now = datetime.datetime.utcnow()
+    key = f"{TRACE_PREFIX}{now:%Y-%m-%d}/{now:%H%M%S}-{uuid.uuid4().hex}.json"
+    try:
+        body, headers = json_codec.encode(batch)
+        s3_utils.s3_client.put_object(Bucket=s3_utils.WEBAPP_BUCKET, Key=key, Body=body, **headers)
+        return len(batch)
+    except Exception as e:
+        print(f"Error saving session traces: {type(e).__name__}: {str(e)}")
+        with _lock:
+            _events[:0] = batch
+            _trim_events()
+        return 0
+
+def start_flush_thread():
+    """
+    Start the periodic trace flush in a daemon thread, once per process.
+    Buffered events are also flushed when the process exits.
+    """
+    background.start_periodic('session-trace-flush', SESSION_TRACE_FLUSH_SECONDS, flush_traces)
+
+def load_traces(day: str) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Load one day's recorded events, grouped by session.
+
+    Args:
+        day (str): The day, YYYY-MM-DD (UTC)
+
+    Returns:
+        Dict[str, List[Dict[str, Any]]]: Each session's events in time order
+    """
+    sessions: Dict[str, List[Dict[str, Any]]] = {}
+    paginator = s3_utils.s3_client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=s3_utils.WEBAPP_BUCKET, Prefix=f'{TRACE_PREFIX}{day}/'):
+        for obj in page.get('Contents', []):
+            response = s3_utils.s3_client.get_object(Bucket=s3_utils.WEBAPP_BUCKET, Key=obj['Key'])
+            for event in json_codec.decode_response(response):
+                sessions.setdefault(event['session'], []).append(event)
+    for events in sessions.values():
+        events.sort(key=lambda event: event['t'])
+    return sessions
@@ -0,0 +1,186 @@
+import json
+import os
+import random
+import sqlite3
+import time
+from typing import Any, Callable, List, Optional, Tuple
+import local_sqlite
+
+# Host-local cache shared by every app process on the machine. SQLite in WAL
+# mode lets many processes read concurrently while one writes. The cache holds
+# solutions, so it lives in a directory only the app's user can open, by
+# default under the user's cache directory rather than the shared temp one.
+SHARED_CACHE_ENABLED = os.getenv('SHARED_CACHE_ENABLED', 'true').lower() == 'true'
+SHARED_CACHE_PATH = os.getenv(
+    'SHARED_CACHE_PATH',
+    os.path.join(os.getenv('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'), 'quadrality', 'cache.sqlite3')
+)
+
+# Default time-to-live per namespace, in seconds
+PUZZLE_CACHE_TTL = float(os.getenv('PUZZLE_CACHE_TTL', '86400'))
+SOLUTION_CACHE_TTL = float(os.getenv('SOLUTION_CACHE_TTL', '86400'))
+RATINGS_CACHE_TTL = float(os.getenv('RATINGS_CACHE_TTL', '60'))
+
+# Expired rows are kept this long so their ETags can be revalidated with a
+# conditional GET instead of downloading the object again
+STALE_RETENTION_SECONDS = float(os.getenv('STALE_RETENTION_SECONDS', str(7 * 86400)))
+
+# Roughly one write in this many also purges long-expired rows
+PURGE_EVERY_WRITES = 1000
+
+def _create_schema(connection: sqlite3.Connection):
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.execute(
+        "CREATE TABLE IF NOT EXISTS cache ("
+        " namespace TEXT NOT NULL,"
+        " key TEXT NOT NULL,"
+        " value TEXT NOT NULL,"
+        " expires_at REAL NOT NULL,"
+        " etag TEXT,"
+        " PRIMARY KEY (namespace, key)"
+        ") WITHOUT ROWID"
+    )
+    columns = [row[1] for row in connection.execute("PRAGMA table_info(cache)")]
+    if 'etag' not in columns:
+        # Cache files created before ETags were stored
+        connection.execute("ALTER TABLE cache ADD COLUMN etag TEXT")
+
+def _connection() -> sqlite3.Connection:
+    return local_sqlite.thread_connection(SHARED_CACHE_PATH, _create_schema)
+
+def get(namespace: str, key: str) -> Optional[Any]:
+    """
+    Get an unexpired value from the shared cache.
+
+    Args:
+        namespace (str): The cache namespace, e.g. 'puzzles'
+        key (str): The key within the namespace
+
+    Returns:
+        Any: The cached value, or None on a miss
+    """
+    if not SHARED_CACHE_ENABLED:
+        return None
+    try:
+        row = _connection().execute(
+            "SELECT value FROM cache WHERE namespace = ? AND key = ? AND expires_at > ?",
+            (namespace, key, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+    except Exception as e:
+        print(f"Error reading shared cache {namespace}/{key}: {type(e).__name__}: {str(e)}")
+        return None
+
+def get_entry(namespace: str, key: str) -> Optional[Tuple[Any, Optional[str], bool]]:
+    """
+    Get a cached value even if it has expired, with its ETag.
+
+    Args:
+        namespace (str): The cache namespace
+        key (str): The key within the namespace
+
+    Returns:
+        Tuple[Any, Optional[str], bool]: The value, its ETag (None if unknown) and
+            whether it is still fresh; None if nothing is cached
+    """
+    if not SHARED_CACHE_ENABLED:
+        return None
+    try:
+        row = _connection().execute(
+            "SELECT value, etag, expires_at FROM cache WHERE namespace = ? AND key = ?",
+            (namespace, key)
+        ).fetchone()
+        return (json.loads(row[0]), row[1], row[2] > time.time()) if row else None
+    except Exception as e:
+        print(f"Error reading shared cache {namespace}/{key}: {type(e).__name__}: {str(e)}")
+        return None
+
+def put(namespace: str, key: str, value: Any, ttl: float, etag: Optional[str] = None):
+    """
+    Store a value in the shared cache.
+
+    Args:
+        namespace (str): The cache namespace
+        key (str): The key within the namespace
+        value (Any): A JSON-serializable value
+        ttl (float): Seconds until the value expires
+        etag (str, optional): The ETag of the S3 object the value came from
+    """
+    if not SHARED_CACHE_ENABLED:
+        return
+    try:
+        connection = _connection()
+        connection.execute(
+            "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at, etag) VALUES (?, ?, ?, ?, ?)",
+            (namespace, key, json.dumps(value, separators=(',', ':')), time.time() + ttl, etag)
+        )
+        if random.randrange(PURGE_EVERY_WRITES) == 0:
+            connection.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time() - STALE_RETENTION_SECONDS,))
+    except Exception as e:
+        print(f"Error writing shared cache {namespace}/{key}: {type(e).__name__}: {str(e)}")
+
+def touch(namespace: str, key: str, ttl: float):
+    """
+    Extend a cached value's lifetime, e.g. after S3 confirmed it is unchanged.
+
+    Args:
+        namespace (str): The cache namespace
+        key (str): The key within the namespace
+        ttl (float): Seconds from now until the value expires
+    """
+    if not SHARED_CACHE_ENABLED:
+        return
+    try:
+        _connection().execute(
+            "UPDATE cache SET expires_at = ? WHERE namespace = ? AND key = ?",
+            (time.time() + ttl, namespace, key)
+        )
+    except Exception as e:
+        print(f"Error refreshing shared cache {namespace}/{key}: {type(e).__name__}: {str(e)}")
+
+def sample_keys(namespace: str, count: int) -> List[str]:
+    """
+    Pick random keys from a namespace, including recently expired ones, e.g.
+    to serve cached puzzles while S3 is unavailable.
+
+    Args:
+        namespace (str): The cache namespace
+        count (int): Maximum number of keys to return
+
+    Returns:
+        List[str]: Up to count keys, in random order
+    """
+    if not SHARED_CACHE_ENABLED:
+        return []
+    try:
+        rows = _connection().execute(
+            "SELECT key FROM cache WHERE namespace = ? ORDER BY RANDOM() LIMIT ?",
+            (namespace, count)
+        ).fetchall()
+        return [row[0] for row in rows]
+    except Exception as e:
+        print(f"Error sampling shared cache {namespace}: {type(e).__name__}: {str(e)}")
+        return []
+
+def read_through(namespace: str, key: str, loader: Callable[[], Optional[Any]], ttl: float) -> Optional[Any]:
+    """
+    Get a value from the shared cache, calling loader and caching its result
+    on a miss. None results are not cached.
+
+    Args:
+        namespace (str): The cache namespace
+        key (str): The key within the namespace
+        loader (Callable): Loads the value from the source of truth
+        ttl (float): Seconds until a newly loaded value expires
+
+    Returns:
+        Any: The cached or freshly loaded value
+    """
+    value = get(namespace, key)
+    if value is not None:
+        return value
+
+    value = loader()
+    if value is not None:
+        put(namespace, key, value, ttl)
+    return value